@@ -1,12 +1,27 @@
+import math
+import time
 from functools import lru_cache
 
-from flask import Flask, Response
+from zlib import crc32
+
+from flask import Flask, Response, request, stream_with_context
 
 from iss_kml.adapters.iss_track_adapter import IssTrackAdapter
-from iss_kml.interactors import IssInteractor
-from iss_kml.services import WhereTheIssAt
+from iss_kml.compression import (KMZ, RenderCache, compress,
+                                 negotiate_encoding)
+from iss_kml.http_cache import apply_cache_headers, get_max_age, make_etag
+from iss_kml.domain.simplification import tolerance_from_view
+from iss_kml.domain.viewport import BBox
+from iss_kml.interactors import IssInteractor, KmlTemplate
+from iss_kml.services import (GroundTrackPredictor, HedgedIssPosService,
+                              IssPosPoller, LastKnownIssPosService,
+                              SingleFlightIssPosService,
+                              TlePropagationService, WhereTheIssAt)
 from iss_kml.settings import Settings
 
+KML_CONTENT_TYPE = 'application/vnd.google-earth.kml+xml'
+KMZ_CONTENT_TYPE = 'application/vnd.google-earth.kmz'
+
 app = Flask(__name__)
 
 
@@ -18,16 +33,298 @@ def get_kml_template():
     return kml
 
 
-@app.route('/iss')
-def iss():
-    kml_template = get_kml_template()
-    iss_pos_service = WhereTheIssAt()
+@lru_cache(maxsize=1)
+def get_kml_renderer():
+    return KmlTemplate(get_kml_template())
+
+
+@lru_cache(maxsize=1)
+def get_tle_service():
+    return TlePropagationService(
+        Settings.TLE_PATH,
+        tle_source=WhereTheIssAt().get_tle,
+        refresh_interval=Settings.TLE_REFRESH_SECONDS)
+
+
+@lru_cache(maxsize=1)
+def get_track_predictor():
+    if not Settings.PREDICTED_ORBITS:
+        return None
+    return GroundTrackPredictor(
+        get_tle_service(),
+        orbits=Settings.PREDICTED_ORBITS,
+        step_seconds=Settings.PREDICTION_STEP_SECONDS,
+        epoch_seconds=Settings.PREDICTION_EPOCH_SECONDS)
+
+
+POSITION_PROVIDERS = {
+    'wheretheiss': WhereTheIssAt,
+    'tle': get_tle_service,
+}
+
+
+def get_position_source():
+    providers = [POSITION_PROVIDERS[name]()
+                 for name in Settings.POSITION_PROVIDERS]
+    source = providers[0] if len(providers) == 1 else HedgedIssPosService(
+        providers,
+        hedge_percentile=Settings.HEDGE_PERCENTILE,
+        timeout=Settings.POSITION_TIMEOUT_SECONDS)
+    return LastKnownIssPosService(source, Settings.LAST_POSITION_PATH)
+
+
+@lru_cache(maxsize=1)
+def get_iss_pos_service():
+    return SingleFlightIssPosService(
+        get_position_source(), window=Settings.SINGLE_FLIGHT_WINDOW_SECONDS)
+
+
+def store_position(iss_pos):
     iss_track_adapter = IssTrackAdapter(Settings.DB_PATH)
+    IssInteractor(iss_track_adapter, None, None).ingest(iss_pos)
+
+
+@lru_cache(maxsize=1)
+def get_poller():
+    poller = IssPosPoller(get_iss_pos_service(),
+                          interval=Settings.POLL_INTERVAL_SECONDS,
+                          lock_path=Settings.POLLER_LOCK_PATH)
+    poller.add_listener(store_position)
+    poller.start()
+    return poller
+
+
+@lru_cache(maxsize=1)
+def get_render_cache():
+    return RenderCache(max_entries=Settings.RENDER_CACHE_ENTRIES)
+
+
+def get_render_params():
+    return (crc32(get_kml_template().encode()),
+            IssInteractor.MAX_TRACK_POINTS)
+
+
+def get_lod_params():
+    """
+    Nível de detalhe pedido: max_points (pontos do track) e tolerance (km),
+    ou a tolerância de um pixel da vista de um NetworkLink, com
+    viewFormat=lookatRange=[lookatRange]&horizPixels=[horizPixels]. Com
+    BBOX=[bboxWest],[bboxSouth],[bboxEast],[bboxNorth], o track é recortado
+    pela região visível (uma BBOX inválida é ignorada).
+    """
+    max_points = request.args.get('max_points', type=int)
+    tolerance = request.args.get('tolerance', type=float)
+    view_range = request.args.get('lookatRange', type=float)
+    pixels = request.args.get('horizPixels', type=int)
+    if tolerance is None and view_range and pixels:
+        tolerance = tolerance_from_view(view_range, pixels)
+    return dict(max_points=max_points, tolerance=tolerance,
+                bbox=get_bbox())
+
+
+def get_bbox():
+    text = request.args.get('BBOX')
+    if text is None:
+        return None
+    try:
+        return BBox.parse(text)
+    except ValueError:
+        return None
+
+
+def get_time_range():
+    """
+    Intervalo do track pedido: at=<timestamp> (o track como estava naquele
+    instante) ou from=<timestamp>&to=<timestamp>, inclusive. Valores
+    inválidos são ignorados.
+    """
+    until = request.args.get('at', type=int)
+    if until is None:
+        until = request.args.get('to', type=int)
+    return dict(since=request.args.get('from', type=int), until=until)
+
+
+def get_extrapolation_timestamp(last_timestamp, now=None):
+    """
+    Instante para o qual a posição é estimada (dead reckoning): o início do
+    passo de DEAD_RECKONING_STEP_SECONDS atual, enquanto não passar de
+    DEAD_RECKONING_MAX_SECONDS depois da última posição gravada (ou a última
+    posição for tão antiga que a estimativa não vale mais: None)
+    """
+    step = Settings.DEAD_RECKONING_STEP_SECONDS
+    if step is None:
+        return None
+    now = time.time() if now is None else now
+    extrapolate_to = int(now - now % step)
+    if not 0 < extrapolate_to - last_timestamp <= \
+            Settings.DEAD_RECKONING_MAX_SECONDS:
+        return None
+    return extrapolate_to
+
+
+def render_kml(iss_track_adapter, **params):
     interactor = IssInteractor(iss_track_adapter,
-                               iss_pos_service,
-                               kml_template)
-    kml = interactor.run()
-    return Response(kml, content_type='application/vnd.google-earth.kml+xml')
+                               get_iss_pos_service(),
+                               get_kml_renderer(),
+                               track_predictor=get_track_predictor(),
+                               **params)
+    if Settings.USE_POLLER:
+        return interactor.render_latest()
+    return interactor.run()
+
+
+def wants_stream():
+    stream = request.args.get('stream', type=int)
+    return Settings.STREAM_KML if stream is None else bool(stream)
+
+
+def stream_kml(iss_track_adapter, **params):
+    interactor = IssInteractor(iss_track_adapter,
+                               get_iss_pos_service(),
+                               get_kml_renderer(),
+                               track_predictor=get_track_predictor(),
+                               **params)
+    return Response(stream_with_context(interactor.stream_latest()),
+                    content_type=KML_CONTENT_TYPE)
+
+
+def make_kml_response(body, variant):
+    if body is None:
+        # a renderização falhou (o erro já foi registrado)
+        return Response(status=503)
+
+    if variant == KMZ:
+        return Response(body, content_type=KMZ_CONTENT_TYPE)
+
+    response = Response(body, content_type=KML_CONTENT_TYPE)
+    if variant is not None:
+        response.content_encoding = variant
+    return response
+
+
+def serve_kml(variant):
+    iss_track_adapter = IssTrackAdapter(Settings.DB_PATH)
+    params = dict(get_lod_params(), **get_time_range())
+    if params['since'] is not None or params['until'] is not None:
+        return serve_history(iss_track_adapter, variant, params)
+
+    last_timestamp = None
+    if Settings.USE_POLLER:
+        get_poller()
+        last_timestamp = iss_track_adapter.latest_timestamp(
+            IssInteractor.TRACK_ID)
+
+    if last_timestamp is None:
+        kml = render_kml(iss_track_adapter, **params)
+        body = None if kml is None else compress(kml, variant)
+        return make_kml_response(body, variant)
+
+    now = time.time()
+    params['extrapolate_to'] = get_extrapolation_timestamp(last_timestamp,
+                                                           now)
+    return serve_cached_kml(iss_track_adapter, variant, params,
+                            last_timestamp,
+                            get_live_max_age(last_timestamp, now))
+
+
+def get_live_max_age(last_timestamp, now):
+    """
+    max-age do KML ao vivo: até a próxima posição esperada ou, enquanto a
+    posição é estimada (dead reckoning), até o próximo passo da estimativa
+    """
+    max_age = get_max_age(last_timestamp, Settings.POLL_INTERVAL_SECONDS, now)
+    step = Settings.DEAD_RECKONING_STEP_SECONDS
+    if step is None or \
+            now - last_timestamp >= Settings.DEAD_RECKONING_MAX_SECONDS:
+        return max_age
+    return min(max_age, math.ceil(step - now % step))
+
+
+def serve_history(iss_track_adapter, variant, params):
+    """
+    KML de um instante ou intervalo passado. A última posição do intervalo
+    é achada pelo índice de timestamp e identifica a renderização: instantes
+    entre as mesmas duas posições compartilham o KML em cache. Um intervalo
+    que termina antes da última posição gravada não muda mais. Um intervalo
+    (from) é servido inteiro, até IssInteractor.MAX_WINDOW_POINTS posições
+    (X-Track-Positions e X-Track-Truncated informam o corte).
+    """
+    last_timestamp = iss_track_adapter.latest_timestamp(
+        IssInteractor.TRACK_ID, params['since'], params['until'])
+    if last_timestamp is None:
+        return Response(status=404)
+
+    live_timestamp = iss_track_adapter.latest_timestamp(
+        IssInteractor.TRACK_ID)
+    if params['until'] is not None and params['until'] < live_timestamp:
+        max_age = Settings.HISTORY_MAX_AGE_SECONDS
+    else:
+        max_age = get_max_age(live_timestamp, Settings.POLL_INTERVAL_SECONDS)
+    response = serve_cached_kml(iss_track_adapter, variant, params,
+                                last_timestamp, max_age)
+    if params['since'] is not None:
+        add_range_headers(response, iss_track_adapter, params)
+    return response
+
+
+def add_range_headers(response, iss_track_adapter, params):
+    """
+    Quantidade de posições do intervalo e, se ele passar de
+    IssInteractor.MAX_WINDOW_POINTS, o aviso de que só as últimas foram
+    incluídas no track
+    """
+    total = iss_track_adapter.count_positions(
+        IssInteractor.TRACK_ID, params['since'], params['until'])
+    response.headers['X-Track-Positions'] = str(total)
+    if total > IssInteractor.MAX_WINDOW_POINTS:
+        response.headers['X-Track-Truncated'] = \
+            str(IssInteractor.MAX_WINDOW_POINTS)
+
+
+def serve_cached_kml(iss_track_adapter, variant, params, last_timestamp,
+                     max_age):
+    # o valor de until não entra na chave (last_timestamp já é a última
+    # posição até ele), mas sim se o KML é histórico: sem o track previsto
+    render_params = (*get_render_params(), params['max_points'],
+                     params['tolerance'], params['bbox'], params['since'],
+                     params['until'] is not None,
+                     params.get('extrapolate_to'))
+    etag = make_etag(last_timestamp, *render_params, variant)
+    if request.if_none_match.contains(etag):
+        return apply_cache_headers(Response(status=304), etag, max_age)
+
+    # o track é lido até last_timestamp: o corpo corresponde ao ETag mesmo
+    # que o poller grave outra posição durante a renderização
+    params = dict(params, as_of=last_timestamp)
+    if variant is None and wants_stream():
+        return apply_cache_headers(stream_kml(iss_track_adapter, **params),
+                                   etag, max_age)
+
+    body = get_render_cache().get(
+        (last_timestamp, render_params), variant,
+        lambda: render_kml(iss_track_adapter, **params))
+    response = make_kml_response(body, variant)
+    if body is None:
+        return response
+
+    return apply_cache_headers(response, etag, max_age)
+
+
+@app.route('/iss')
+def iss():
+    variant = None
+    if not wants_stream():
+        variant = negotiate_encoding(request.accept_encodings)
+    response = serve_kml(variant)
+    # em todas as respostas (304 e streaming inclusive): caches
+    # compartilhados não devem misturar as variantes
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+@app.route('/iss.kmz')
+def iss_kmz():
+    return serve_kml(KMZ)
 
 
 if __name__ == '__main__':
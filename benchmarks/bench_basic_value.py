@@ -0,0 +1,47 @@
+"""
+Compara o codec compilado de BasicValue com o caminho do marshmallow
+(Schema().load/dump) na serialização de um IssTrack.
+
+Uso: python -m benchmarks.bench_basic_value [quantidade de posições]
+"""
+import sys
+from timeit import timeit
+
+from iss_kml.domain.iss_track.iss_track import IssPos, IssTrack
+
+
+def make_track(size):
+    positions = [IssPos(latitude=i * 0.001,
+                        longitude=i * 0.002,
+                        altitude=420000.0,
+                        speed=27600.0,
+                        footprint=4500.0,
+                        timestamp=1684980256 + i)
+                 for i in range(size)]
+    return IssTrack(entity_id='1', positions=positions)
+
+
+def bench(name, fn, number):
+    seconds = timeit(fn, number=number) / number
+    print(f'{name:<28}{seconds * 1000:10.2f} ms')
+    return seconds
+
+
+def main(size=20000, number=5):
+    track = make_track(size)
+    data = track.to_json()
+    print(f'IssTrack com {size} posições')
+
+    load_mm = bench('load marshmallow',
+                    lambda: IssTrack.Schema().load(data), number)
+    load_codec = bench('load codec', lambda: IssTrack.from_json(data), number)
+    dump_mm = bench('dump marshmallow',
+                    lambda: IssTrack.Schema().dump(track), number)
+    dump_codec = bench('dump codec', lambda: track.to_json(), number)
+
+    print(f'speedup load: {load_mm / load_codec:.1f}x')
+    print(f'speedup dump: {dump_mm / dump_codec:.1f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,63 @@
+"""
+Compara a renderização do KML com str.format sobre o template e com o
+KmlTemplate pré-compilado (segmentos em bytes num único buffer), para
+tracks de 2k, 20k e 200k pontos.
+
+Uso: python -m benchmarks.bench_kml_render [quantidade de pontos ...]
+"""
+import sys
+from timeit import timeit
+
+from iss_kml.domain.iss_track.iss_track import IssPos, IssTrack
+from iss_kml.interactors import KmlTemplate
+
+TEMPLATE_PATH = 'templates/iss_kml_template.kml'
+
+
+def make_values(size):
+    positions = [IssPos(latitude=i * 0.001,
+                        longitude=i * 0.002,
+                        altitude=420000.0,
+                        speed=27600.0,
+                        footprint=4500.0,
+                        timestamp=1684980256 + i)
+                 for i in range(size)]
+    track = IssTrack(entity_id='1', positions=positions)
+    return dict(latitude=positions[-1].latitude,
+                longitude=positions[-1].longitude,
+                altitude=positions[-1].altitude,
+                footprint='1.0,2.0,0 ' * 129,
+                track=track.get_track_coordinates_kml(),
+                yt_iss_live='1.0,2.0,0 ' * 5,
+                predicted_track='1.0,2.0,0 ' * 370)
+
+
+def bench(name, fn, number):
+    seconds = timeit(fn, number=number) / number
+    print(f'{name:<28}{seconds * 1000:10.3f} ms')
+    return seconds
+
+
+def main(*sizes):
+    with open(TEMPLATE_PATH, 'r') as f:
+        template = f.read()
+    kml_template = KmlTemplate(template)
+
+    for size in sizes or (2000, 20000, 200000):
+        values = make_values(size)
+        number = max(1, 200000 // size)
+        if kml_template.render(**values) != \
+                template.format(**values).encode('utf-8'):
+            raise RuntimeError('KmlTemplate output differs from str.format')
+
+        print(f'Track com {size} pontos')
+        legacy = bench('str.format + encode',
+                       lambda: template.format(**values).encode('utf-8'),
+                       number)
+        compiled = bench('KmlTemplate.render',
+                         lambda: kml_template.render(**values), number)
+        print(f'speedup: {legacy / compiled:.1f}x')
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
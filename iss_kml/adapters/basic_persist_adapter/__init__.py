@@ -1,3 +1,4 @@
 from .basic_persist_adapter import BasicPersistAdapter
+from .page import Page
 
-__all__ = ['BasicPersistAdapter']
+__all__ = ['BasicPersistAdapter', 'Page']
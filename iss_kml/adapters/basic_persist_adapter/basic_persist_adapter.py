@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 import logging
+from functools import reduce
 from typing import List
 
 from iss_kml.domain.basic_domain import BasicEntity
@@ -30,6 +32,13 @@ class BasicPersistAdapter(ABC):
     def list_all(self):
         raise NotImplementedError
 
+    def iter_all(self, batch_size=None):
+        """
+        Gerador com todos os objetos. Implementações que suportam cursores
+        leem os dados em lotes de batch_size; por padrão usa list_all.
+        """
+        yield from self.list_all()
+
     @abstractmethod
     def get_by_id(self, item_id):
         raise NotImplementedError
@@ -50,6 +59,15 @@ class BasicPersistAdapter(ABC):
     def delete_many(self, entity_ids: List[str]):
         raise NotImplementedError
 
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Agrupa as gravações feitas dentro do bloco. Implementações que
+        suportam transações gravam tudo de uma vez na saída; por padrão as
+        operações são executadas imediatamente.
+        """
+        yield self
+
     @staticmethod
     def filter_and(*args, **kwargs):
         raise NotImplementedError
@@ -59,7 +77,7 @@ class BasicPersistAdapter(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def filter(self, *args, **kwargs):
+    def filter(self, *args, order_by=None, limit=None, **kwargs):
         """
         Filtra objetos de acordo com o critério especificado.
         Para especificar o critérios, que por default são concatenados
@@ -101,10 +119,94 @@ Um exmeplo mais complexo
        [begins_with, between, contains, eq, exists, gt, gte, is_in, lt,
         lte, ne, not_exists]
 
+:param order_by: Campo ou sequência de campos para ordenar o resultado;
+    o prefixo '-' indica ordem decrescente (ex.: order_by='-timestamp')
+:param limit: Quantidade máxima de objetos retornados
 :return: Lista de objetos
         """
         raise NotImplementedError
 
+    def page(self, *args, order_by=None, limit=100, cursor=None, **kwargs):
+        """
+        Uma página de objetos, opcionalmente filtrados (mesmos critérios de
+        filter) e ordenados por order_by. Para ler a página seguinte, repita
+        a chamada passando o cursor da página atual.
+
+.. code-block:: python
+
+            page = adapter.page(track_id__eq='1', order_by='timestamp')
+            while page.cursor:
+                page = adapter.page(track_id__eq='1', order_by='timestamp',
+                                    cursor=page.cursor)
+
+:param limit: Quantidade máxima de objetos na página
+:param cursor: Cursor retornado na página anterior
+:raises ValueError: se o cursor for inválido
+:return: Page com os objetos e o cursor da próxima página (None na última)
+        """
+        raise NotImplementedError
+
+    def iter_filter(self, *args, batch_size=None, **kwargs):
+        """
+        Gerador com os objetos de filter(*args, **kwargs). Implementações
+        que suportam cursores leem os dados em lotes de batch_size; por
+        padrão usa filter.
+        """
+        yield from self.filter(*args, **kwargs)
+
+    def _iter_matching(self, args, kwargs):
+        if args or kwargs:
+            return self.iter_filter(*args, **kwargs)
+        return self.iter_all()
+
+    def count(self, *args, **kwargs):
+        """
+        Quantidade de objetos que atendem aos critérios (mesmos de filter),
+        ou de todos os objetos, se nenhum critério for informado.
+        Implementações com banco de dados fazem a contagem sem instanciar
+        objetos; por padrão os objetos são percorridos.
+        """
+        return sum(1 for _ in self._iter_matching(args, kwargs))
+
+    def exists(self, *args, **kwargs):
+        """
+        Indica se algum objeto atende aos critérios (mesmos de filter)
+        """
+        return next(iter(self._iter_matching(args, kwargs)), None) is not None
+
+    def aggregate(self, function, field, *args, **kwargs):
+        """
+        Agregação de um campo sobre os objetos que atendem aos critérios
+        (mesmos de filter). Campos aninhados usam '_dot_', como em filter.
+
+.. code-block:: python
+
+            newest = adapter.aggregate('max', 'timestamp', track_id__eq='1')
+
+:param function: Uma das funções: avg, max, min, sum
+:param field: Nome do campo
+:raises ValueError: se a função não for suportada
+:return: Valor agregado ou None, se nenhum objeto atender aos critérios
+        """
+        functions = {'avg': lambda v: sum(v) / len(v), 'max': max,
+                     'min': min, 'sum': sum}
+        if function not in functions:
+            raise ValueError(f'invalid aggregate: {function}')
+
+        path = field.split('_dot_')
+        values = [reduce(getattr, path, obj)
+                  for obj in self._iter_matching(args, kwargs)]
+        return functions[function](values) if values else None
+
+    def min_value(self, field, *args, **kwargs):
+        return self.aggregate('min', field, *args, **kwargs)
+
+    def max_value(self, field, *args, **kwargs):
+        return self.aggregate('max', field, *args, **kwargs)
+
+    def avg_value(self, field, *args, **kwargs):
+        return self.aggregate('avg', field, *args, **kwargs)
+
     @abstractmethod
     def lock_row(self, entity_id):
         """
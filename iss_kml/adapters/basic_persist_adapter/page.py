@@ -0,0 +1,19 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class Page:
+    """
+    Uma página de resultados de BasicPersistAdapter.page. O cursor é opaco
+    e deve ser repassado para obter a página seguinte; é None quando não
+    há mais páginas.
+    """
+    items: List = field(default_factory=list)
+    cursor: Optional[str] = None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
@@ -1,22 +1,37 @@
 import json
-from sqlite3 import connect, OperationalError
+from collections import Counter
+from contextlib import contextmanager
+from sqlite3 import OperationalError
 from typing import List
 from uuid import uuid4
 
-from ..basic_persist_adapter import BasicPersistAdapter
+from ..basic_persist_adapter import BasicPersistAdapter, Page
 
-from .definers import DmlStatements, DdlStatements, get_ops
+from .connection_pool import get_pool
+from .definers import (DmlStatements, DdlStatements, DEFAULT_PRAGMAS,
+                       get_aggregates, get_ops)
+from .pagination import (compile_keyset, compile_order, decode_cursor,
+                         encode_cursor, keyset_order, parse_order)
 from .exceptions import (SQLiteAdapterSaveException,
                          SQLiteAdapterDeleteException)
+from .query_compiler import (Group, Term, compile_expression,
+                             expression_fields, field_expression)
 from ...domain.basic_domain import BasicEntity
 
+_DELETED = object()
 
-class BasicSQLiteAdapter(BasicPersistAdapter):
-    def save_many(self, entity_list: List[BasicEntity]):
-        raise NotImplementedError
 
-    def delete_many(self, entity_ids: List[str]):
-        raise NotImplementedError
+class BasicSQLiteAdapter(BasicPersistAdapter):
+    PRAGMAS = DEFAULT_PRAGMAS
+    # Campos do JSON (ou tuplas de campos) com índice de expressão
+    INDEXED_FIELDS = ()
+    # Cria índices para campos usados em LEARN_INDEX_THRESHOLD filtros
+    LEARN_INDEXES = False
+    LEARN_INDEX_THRESHOLD = 10
+    # Linhas lidas do cursor por vez em iter_all/iter_filter
+    FETCH_BATCH_SIZE = 500
+    _ensured_indexes = set()
+    _observed_fields = {}
 
     def lock_row(self, entity_id):
         raise NotImplementedError
@@ -39,22 +54,38 @@ class BasicSQLiteAdapter(BasicPersistAdapter):
         self._db = self._get_db(database)
         self.DmlStatements = dml_statements
         self.DdlStatements = ddl_statements
+        self._pending = None
+        self._unique_index_ready = False
+        if self.INDEXED_FIELDS:
+            self._try_ensure_indexes()
 
-    @staticmethod
-    def _get_db(database):
-        return connect(database)
+    @classmethod
+    def _get_db(cls, database):
+        return get_pool(database, cls.PRAGMAS).connection()
 
-    def _execute_statement(self, statement):
+    def _execute_statement(self, statement, *args):
         cur = self._db.cursor()
-        cur.execute(statement)
+        cur.execute(statement, *args)
         self._db.commit()
 
-    def _query_statement(self, statement):
+    def _query_statement(self, statement, *args):
         cur = self._db.cursor()
-        cur.execute(statement)
+        cur.execute(statement, *args)
 
         return cur.fetchall()
 
+    def _iter_statement(self, statement, *args, batch_size=None):
+        cur = self._db.cursor()
+        cur.execute(statement, *args)
+        batch_size = batch_size or self.FETCH_BATCH_SIZE
+        try:
+            rows = cur.fetchmany(batch_size)
+            while rows:
+                yield from rows
+                rows = cur.fetchmany(batch_size)
+        finally:
+            cur.close()
+
     def _instantiate_object(self, item: dict):
         obj = self._class.from_json(item)
         obj.set_adapter(self)
@@ -71,6 +102,22 @@ class BasicSQLiteAdapter(BasicPersistAdapter):
                    for row in rows]
         return objects
 
+    def iter_all(self, batch_size=None, order_by=None, limit=None):
+        """
+        Como list_all, mas lendo as linhas em lotes de batch_size (fetchmany)
+        e instanciando cada objeto só quando ele é consumido
+        """
+        self.logger.info(f'Streaming {self._table_name}...')
+
+        statement = self.DmlStatements.SELECT_ALL.format('data',
+                                                         self._table_name)
+        statement, params = self._order_and_limit(
+            statement, (), parse_order(order_by), limit)
+
+        for row in self._iter_statement(statement, params,
+                                        batch_size=batch_size):
+            yield self._instantiate_object(json.loads(row[0]))
+
     def get_by_id(self, item_id):
         self.logger.info(f'Searching id: {item_id} in {self._table_name}...')
 
@@ -109,6 +156,17 @@ class BasicSQLiteAdapter(BasicPersistAdapter):
             'entity_id')
         self._execute_statement(statement)
 
+        self._create_unique_index()
+        self.ensure_indexes()
+
+    def _create_unique_index(self):
+        statement = self.DdlStatements.CREATE_UNIQUE_INDEX.format(
+            f"undx_{self._table_name}_entity_id",
+            self._table_name,
+            'entity_id')
+        self._execute_statement(statement)
+        self._unique_index_ready = True
+
     def _save_to_database(self, entity_id, json_data):
         json_str = json.dumps(json_data)
         entity = self.get_by_id(entity_id)
@@ -167,6 +225,11 @@ class BasicSQLiteAdapter(BasicPersistAdapter):
         return entity_id
 
     def save(self, json_data):
+        if self._pending is not None:
+            entity_id = self._resolve_entity_id(json_data)
+            self._pending[entity_id] = json_data
+            return entity_id
+
         for _ in range(3):
             result = self._try_save(json_data)
             if result:
@@ -178,6 +241,10 @@ class BasicSQLiteAdapter(BasicPersistAdapter):
         raise SQLiteAdapterSaveException(msg)
 
     def delete(self, entity_id):
+        if self._pending is not None:
+            self._pending[entity_id] = _DELETED
+            return entity_id
+
         self._logger.info(f'Deleting id: {entity_id} in {self._table_name}...')
         conditions = f"entity_id='{entity_id}'"
         statement = self.DmlStatements.DELETE.format(
@@ -192,6 +259,150 @@ class BasicSQLiteAdapter(BasicPersistAdapter):
                 SQLiteAdapterDeleteException)
         return entity_id
 
+    def _write_batch(self, upsert_rows, delete_ids):
+        if upsert_rows and not self._unique_index_ready:
+            self._create_unique_index()
+
+        upsert = self.DmlStatements.UPSERT.format(self._table_name)
+        delete = self.DmlStatements.DELETE_BY_ID.format(self._table_name)
+        with self._db:
+            cur = self._db.cursor()
+            cur.executemany(upsert, upsert_rows)
+            cur.executemany(delete, [(entity_id,) for entity_id in delete_ids])
+
+    def _try_write_batch(self, upsert_rows, delete_ids):
+        try:
+            self._write_batch(upsert_rows, delete_ids)
+            return True
+        except OperationalError as e:
+            self._check_operational_error(e)
+            return False
+        except Exception as e:
+            self._report_and_raise_error(e,
+                                         'Error on batch write',
+                                         SQLiteAdapterSaveException)
+
+    def _flush(self, upsert_rows, delete_ids):
+        self.logger.info(f'Writing {len(upsert_rows)} and deleting '
+                         f'{len(delete_ids)} rows in {self._table_name}...')
+        for _ in range(3):
+            if self._try_write_batch(upsert_rows, delete_ids):
+                return
+
+        msg = f'Error writing batch to {self._table_name}'
+        self._logger.error(msg)
+
+        raise SQLiteAdapterSaveException(msg)
+
+    def _to_row(self, json_data):
+        entity_id = self._resolve_entity_id(json_data)
+        return entity_id, json.dumps(json_data)
+
+    def save_many(self, entity_list: List[BasicEntity]):
+        """
+        Grava (insert ou update) várias entidades numa única transação
+        :param entity_list: Entidades a gravar
+        :return: Lista com os IDs gravados
+        """
+        rows = [self._to_row(entity.to_json()) for entity in entity_list]
+        self._flush(rows, [])
+        return [entity_id for entity_id, _ in rows]
+
+    def delete_many(self, entity_ids: List[str]):
+        """
+        Remove várias entidades numa única transação
+        :param entity_ids: IDs a remover
+        :return: Lista com os IDs removidos
+        """
+        self._flush([], list(entity_ids))
+        return list(entity_ids)
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Agrupa os save()/delete() feitos dentro do bloco (inclusive via
+        BasicEntity.save()) e grava tudo numa única transação na saída.
+        Se o bloco levantar uma exceção, nada é gravado. Leituras dentro do
+        bloco não enxergam as alterações pendentes.
+        """
+        if self._pending is not None:
+            yield self
+            return
+
+        self._pending = {}
+        try:
+            yield self
+            pending, self._pending = self._pending, None
+            self._flush_pending(pending)
+        finally:
+            self._pending = None
+
+    def _flush_pending(self, pending):
+        rows = [self._to_row(json_data)
+                for json_data in pending.values() if json_data is not _DELETED]
+        delete_ids = [entity_id for entity_id, json_data in pending.items()
+                      if json_data is _DELETED]
+        if rows or delete_ids:
+            self._flush(rows, delete_ids)
+
+    def _index_name(self, fields):
+        suffix = '_'.join(field.replace('.', '_') for field in fields)
+        return f'ndx_{self._table_name}_{suffix}'
+
+    def create_index(self, *fields):
+        """
+        Cria (se ainda não existir) um índice sobre
+        json_extract(data, '$.campo') para os campos informados, na ordem.
+        Filtros sobre esses campos passam a usar o índice.
+        """
+        columns = ', '.join(field_expression(field) for field in fields)
+        statement = self.DdlStatements.CREATE_INDEX_IF_NOT_EXISTS.format(
+            self._index_name(fields), self._table_name, columns)
+        self._execute_statement(statement)
+        self._ensured_indexes.add((self._database, self._table_name, fields))
+
+    def _declared_indexes(self):
+        return [(fields,) if isinstance(fields, str) else tuple(fields)
+                for fields in self.INDEXED_FIELDS]
+
+    def ensure_indexes(self):
+        for fields in self._declared_indexes():
+            key = (self._database, self._table_name, fields)
+            if key not in self._ensured_indexes:
+                self.create_index(*fields)
+
+    def _try_ensure_indexes(self):
+        try:
+            self.ensure_indexes()
+        except OperationalError:
+            # a tabela ainda não existe: _create_table cria os índices
+            pass
+
+    def _learn_indexes(self, args, kwargs):
+        key = (self._database, self._table_name)
+        observed = self._observed_fields.setdefault(key, Counter())
+        expression = self.filter_or(*args, **kwargs)
+        for field in expression_fields(expression):
+            observed[field] += 1
+            if observed[field] == self.LEARN_INDEX_THRESHOLD:
+                self.logger.info(f'Creating index on {field} '
+                                 f'in {self._table_name}...')
+                self.create_index(field)
+
+    def explain(self, *args, **kwargs):
+        """
+        Plano de execução (EXPLAIN QUERY PLAN) de um filtro, para conferir
+        se os índices estão sendo usados
+        :return: Lista com as linhas de detalhe do plano
+        """
+        conditions, params = self._get_conditions(args, kwargs)
+        statement = self.DmlStatements.EXPLAIN.format(
+            self.DmlStatements.SELECT.format(
+                'data', self._table_name, conditions))
+
+        rows = self._query_statement(statement, params)
+        return [row[-1] for row in rows]
+
     @staticmethod
     def _get_ops():
         return get_ops()
@@ -213,67 +424,185 @@ class BasicSQLiteAdapter(BasicPersistAdapter):
         except KeyError:
             raise ValueError(f'invalid comparator: {op}')
 
-    @staticmethod
-    def _get_op_mask_normalized(arg, op_mask: str):
-        is_not_string = type(arg) != str
-        return op_mask.replace('\'', '') if is_not_string else op_mask
-
-    @staticmethod
-    def _get_attr(field, op, ops, args):
-        op_mask = str(ops[op][1])
-        op_mask_normalized = BasicSQLiteAdapter._get_op_mask_normalized(
-            args[0], op_mask
-        )
-        attr = op_mask_normalized.format(
-            field,
-            *args
-        )
-        return attr
-
     @staticmethod
     def _parse_conditions(args, kwargs):
         ops = BasicSQLiteAdapter._get_ops()
 
-        attr_list = list(args)
+        conditions = list(args)
+        for condition in conditions:
+            if not isinstance(condition, (Term, Group)):
+                raise ValueError(f'invalid condition: {condition!r}')
+
         for k, v in kwargs.items():
-            field, op = k.split('__')
+            field, op = k.rsplit('__', 1)
             arg_count = BasicSQLiteAdapter._get_argcount(op, ops)
 
             args = BasicSQLiteAdapter._args_from_value(v, arg_count)
             field = field.replace('_dot_', '.')
 
-            attr_list.append(
-                BasicSQLiteAdapter._get_attr(field, op, ops, args))
+            conditions.append(Term(field, op, tuple(args)))
 
-        if not attr_list:
+        if not conditions:
             raise ValueError('No conditions in the filter.')
 
-        return attr_list
+        return conditions
 
     @staticmethod
     def filter_and(*args, **kwargs):
-        pargs = list(args)
-        conditions = BasicSQLiteAdapter._parse_conditions(pargs, kwargs)
-        return f'({conditions[0]} AND {conditions[1]})'
+        conditions = BasicSQLiteAdapter._parse_conditions(args, kwargs)
+        return Group('AND', tuple(conditions))
 
     @staticmethod
     def filter_or(*args, **kwargs):
-        pargs = list(args)
-        conditions = BasicSQLiteAdapter._parse_conditions(pargs, kwargs)
-        return f'({conditions[0]} OR {conditions[1]})'
+        conditions = BasicSQLiteAdapter._parse_conditions(args, kwargs)
+        return Group('OR', tuple(conditions))
 
     @staticmethod
     def _get_conditions(args, kwargs):
-        conditions = BasicSQLiteAdapter._parse_conditions(args, kwargs)
-        return str(conditions.pop())
-
-    def filter(self, *args, **kwargs):
-        conditions = self._get_conditions(args, kwargs)
+        """
+        Compila as condições de um filtro (combinadas com OR no nível mais
+        externo) em SQL parametrizado
+        :return: Tupla (sql, parâmetros)
+        """
+        return compile_expression(BasicSQLiteAdapter.filter_or(*args,
+                                                               **kwargs))
+
+    def _order_and_limit(self, statement, params, keys, limit):
+        if keys:
+            statement += self.DmlStatements.ORDER_BY.format(
+                compile_order(keys))
+        if limit is not None:
+            statement += self.DmlStatements.LIMIT
+            params = tuple(params) + (limit,)
+        return statement, params
+
+    def _filter_statement(self, args, kwargs, order_by, limit):
+        if self.LEARN_INDEXES:
+            self._learn_indexes(args, kwargs)
+
+        conditions, params = self._get_conditions(args, kwargs)
         statement = self.DmlStatements.SELECT.format(
             'data', self._table_name, conditions)
+        return self._order_and_limit(statement, params,
+                                     parse_order(order_by), limit)
 
-        rows = self._query_statement(statement)
+    def filter(self, *args, order_by=None, limit=None, **kwargs):
+        """
+        Ver BasicPersistAdapter.filter. order_by e limit são executados no
+        próprio SQL (ORDER BY/LIMIT)
+        """
+        statement, params = self._filter_statement(args, kwargs,
+                                                   order_by, limit)
+
+        rows = self._query_statement(statement, params)
 
         objects = [self._instantiate_object(json.loads(row[0]))
                    for row in rows]
         return objects
+
+    def iter_filter(self, *args, batch_size=None, order_by=None, limit=None,
+                    **kwargs):
+        """
+        Como filter, mas retorna um gerador que lê as linhas em lotes de
+        batch_size (fetchmany) e instancia os objetos sob demanda
+        """
+        statement, params = self._filter_statement(args, kwargs,
+                                                   order_by, limit)
+
+        for row in self._iter_statement(statement, params,
+                                        batch_size=batch_size):
+            yield self._instantiate_object(json.loads(row[0]))
+
+    def _page_conditions(self, args, kwargs, keys, cursor):
+        conditions, params = [], []
+        if args or kwargs:
+            sql, values = self._get_conditions(args, kwargs)
+            conditions.append(sql)
+            params.extend(values)
+        if cursor is not None:
+            sql, indexes = compile_keyset(keys)
+            values = decode_cursor(cursor, len(keys))
+            conditions.append(sql)
+            params.extend(values[i] for i in indexes)
+        return ' AND '.join(conditions), tuple(params)
+
+    def _page_statement(self, keys, conditions):
+        columns = ', '.join(['data'] + [field_expression(name)
+                                        for name, _ in keys])
+        if not conditions:
+            return self.DmlStatements.SELECT_ALL.format(columns,
+                                                        self._table_name)
+        return self.DmlStatements.SELECT.format(columns, self._table_name,
+                                                conditions)
+
+    def page(self, *args, order_by=None, limit=100, cursor=None, **kwargs):
+        """
+        Ver BasicPersistAdapter.page. A paginação é por keyset: o cursor
+        guarda os valores de ordenação do último item e a página seguinte é
+        lida com WHERE (chaves) > (cursor) ... ORDER BY ... LIMIT, sem
+        OFFSET. entity_id é sempre usado como desempate.
+        """
+        keys = keyset_order(order_by)
+        conditions, params = self._page_conditions(args, kwargs, keys, cursor)
+        statement = self._page_statement(keys, conditions)
+        statement, params = self._order_and_limit(statement, params,
+                                                  keys, limit)
+
+        rows = self._query_statement(statement, params)
+
+        items = [self._instantiate_object(json.loads(row[0])) for row in rows]
+        next_cursor = None
+        if rows and len(rows) == limit:
+            next_cursor = encode_cursor(rows[-1][1:])
+        return Page(items, next_cursor)
+
+    def _select_where(self, columns, args, kwargs):
+        if not (args or kwargs):
+            statement = self.DmlStatements.SELECT_ALL.format(
+                columns, self._table_name)
+            return statement, ()
+
+        conditions, params = self._get_conditions(args, kwargs)
+        statement = self.DmlStatements.SELECT.format(
+            columns, self._table_name, conditions)
+        return statement, params
+
+    def _query_scalar(self, statement, params, default=None):
+        try:
+            rows = self._query_statement(statement, params)
+        except OperationalError as e:
+            # tabela ainda não existe; outros erros (ex.: "database is
+            # locked") não podem virar um resultado vazio
+            if 'no such table' not in str(e):
+                raise
+            return default
+        return rows[0][0] if rows else default
+
+    def count(self, *args, **kwargs):
+        """
+        Ver BasicPersistAdapter.count. Executado como SELECT COUNT(*)
+        """
+        statement, params = self._select_where('COUNT(*)', args, kwargs)
+        return self._query_scalar(statement, params, 0)
+
+    def exists(self, *args, **kwargs):
+        """
+        Ver BasicPersistAdapter.exists. Executado como SELECT 1 ... LIMIT 1
+        """
+        statement, params = self._select_where('1', args, kwargs)
+        statement += self.DmlStatements.LIMIT
+        return self._query_scalar(statement, params + (1,)) is not None
+
+    def aggregate(self, function, field, *args, **kwargs):
+        """
+        Ver BasicPersistAdapter.aggregate. Executado em SQL sobre
+        json_extract(data, '$.campo')
+        """
+        try:
+            mask = get_aggregates()[function]
+        except KeyError:
+            raise ValueError(f'invalid aggregate: {function}')
+
+        column = mask.format(field_expression(field.replace('_dot_', '.')))
+        statement, params = self._select_where(column, args, kwargs)
+        return self._query_scalar(statement, params)
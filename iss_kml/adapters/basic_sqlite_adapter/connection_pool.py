@@ -0,0 +1,108 @@
+import threading
+import weakref
+from sqlite3 import connect
+from typing import Dict, Optional
+
+from .definers import DEFAULT_PRAGMAS
+
+
+class _ThreadConnection:
+    """
+    Conexão em uso por uma thread. Fica no threading.local do pool: quando
+    a thread termina, o objeto é descartado e a conexão volta ao pool
+    """
+    def __init__(self, db):
+        self.db = db
+
+
+class SQLiteConnectionPool:
+    """
+    Conexões para um banco SQLite, uma por thread, reaproveitada por todos
+    os adapters (e requisições) daquela thread. Quando a thread termina (o
+    servidor do Flask usa uma thread por requisição), a conexão fica
+    ociosa no pool, até max_idle conexões, e é entregue à próxima thread;
+    as demais são fechadas. Os PRAGMAs são aplicados apenas quando a
+    conexão é aberta.
+    """
+    def __init__(self, database, pragmas: Optional[dict] = None,
+                 max_idle: int = 8):
+        self.database = database
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self.max_idle = max_idle
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._idle = []
+
+    def _connect(self):
+        db = connect(self.database, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            db.execute(f'PRAGMA {name}={value}')
+        with self._lock:
+            self._connections.add(db)
+        return db
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _release(self, db):
+        with self._lock:
+            if db not in self._connections:
+                # já fechada por close_all
+                return
+            if db.in_transaction:
+                db.rollback()
+            if len(self._idle) < self.max_idle:
+                self._idle.append(db)
+                return
+            self._connections.discard(db)
+        db.close()
+
+    def connection(self):
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = _ThreadConnection(self._acquire())
+            weakref.finalize(holder, self._release, holder.db)
+            self._local.holder = holder
+        return holder.db
+
+    @property
+    def open_connections(self):
+        with self._lock:
+            return len(self._connections)
+
+    def close_all(self):
+        with self._lock:
+            connections, self._connections = self._connections, set()
+            self._idle = []
+        for db in connections:
+            db.close()
+        self._local = threading.local()
+
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database, pragmas: Optional[dict] = None) -> SQLiteConnectionPool:
+    """
+    Pool do processo para o banco. Os pragmas só são considerados na
+    primeira chamada para cada banco.
+    """
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = SQLiteConnectionPool(database, pragmas)
+            _pools[database] = pool
+        return pool
+
+
+def close_all_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
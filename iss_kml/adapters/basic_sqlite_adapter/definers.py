@@ -4,22 +4,50 @@ class DmlStatements:
     INSERT: str = 'INSERT INTO {} (entity_id, data) values (?,?)'
     UPDATE: str = 'UPDATE {} SET data=? WHERE {}'
     DELETE: str = 'DELETE FROM {} WHERE {}'
+    UPSERT: str = ('INSERT INTO {} (entity_id, data) values (?,?) '
+                   'ON CONFLICT(entity_id) DO UPDATE SET data=excluded.data')
+    DELETE_BY_ID: str = 'DELETE FROM {} WHERE entity_id=?'
+    EXPLAIN: str = 'EXPLAIN QUERY PLAN {}'
+    ORDER_BY: str = ' ORDER BY {}'
+    LIMIT: str = ' LIMIT ?'
 
 
 class DdlStatements:
     CREATE_TABLE: str = 'CREATE TABLE {} (entity_id str, data str)'
     CREATE_INDEX: str = 'CREATE INDEX {} ON {} ({})'
+    CREATE_UNIQUE_INDEX: str = \
+        'CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})'
+    CREATE_INDEX_IF_NOT_EXISTS: str = \
+        'CREATE INDEX IF NOT EXISTS {} ON {} ({})'
+
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,
+    'mmap_size': 268435456,
+    'busy_timeout': 5000,
+}
+
+
+def get_aggregates():
+    return {
+        "avg": "AVG({0})",
+        "max": "MAX({0})",
+        "min": "MIN({0})",
+        "sum": "SUM({0})"
+    }
 
 
 def get_ops():
     return {
-        "begins_with": (1, "{0} LIKE '{1}%'"),
-        "between": (2, "({0} BETWEEN '{1}' AND '{2}')"),
-        "contains": (1, "{0} LIKE '%{1}%'"),
-        "eq": (1, "{0}='{1}'"),
-        "gt": (1, "{0}>'{1}'"),
-        "gte": (1, "{0}>='{1}'"),
-        "lt": (1, "{0}<'{1}'"),
-        "lte": (1, "{0}<='{1}'"),
-        "ne": (1, "{0}<>'{1}'")
+        "begins_with": (1, "{0} LIKE ? || '%'"),
+        "between": (2, "({0} BETWEEN ? AND ?)"),
+        "contains": (1, "{0} LIKE '%' || ? || '%'"),
+        "eq": (1, "{0}=?"),
+        "gt": (1, "{0}>?"),
+        "gte": (1, "{0}>=?"),
+        "lt": (1, "{0}<?"),
+        "lte": (1, "{0}<=?"),
+        "ne": (1, "{0}<>?")
     }
@@ -0,0 +1,85 @@
+import base64
+import json
+from functools import lru_cache
+from typing import Tuple
+
+from .query_compiler import field_expression
+
+TIEBREAK_FIELD = 'entity_id'
+
+
+def parse_order(order_by) -> Tuple[Tuple[str, bool], ...]:
+    """
+    :param order_by: Campo ou sequência de campos; o prefixo '-' indica
+        ordem decrescente (ex.: ('-timestamp', 'nome'))
+    :return: Tupla de (campo, decrescente)
+    """
+    if not order_by:
+        return ()
+    if isinstance(order_by, str):
+        order_by = (order_by,)
+
+    keys = tuple((name.lstrip('-'), name.startswith('-')) for name in order_by)
+    for name, _ in keys:
+        field_expression(name)
+    return keys
+
+
+def keyset_order(order_by) -> Tuple[Tuple[str, bool], ...]:
+    """
+    Ordem usada na paginação: a ordem pedida seguida de entity_id (no mesmo
+    sentido da última chave), para que cada linha tenha uma posição única
+    """
+    keys = parse_order(order_by)
+    if TIEBREAK_FIELD in [name for name, _ in keys]:
+        return keys
+    descending = keys[-1][1] if keys else False
+    return keys + ((TIEBREAK_FIELD, descending),)
+
+
+@lru_cache(maxsize=128)
+def compile_order(keys) -> str:
+    return ', '.join(f'{field_expression(name)} {"DESC" if desc else "ASC"}'
+                     for name, desc in keys)
+
+
+def _compile_mixed_keyset(keys):
+    terms, indexes = [], []
+    for i, (name, descending) in enumerate(keys):
+        equals = [f'{field_expression(n)}=?' for n, _ in keys[:i]]
+        compare = f'{field_expression(name)}{"<" if descending else ">"}?'
+        terms.append('(' + ' AND '.join(equals + [compare]) + ')')
+        indexes.extend(range(i + 1))
+    return '(' + ' OR '.join(terms) + ')', tuple(indexes)
+
+
+@lru_cache(maxsize=128)
+def compile_keyset(keys) -> Tuple[str, Tuple[int, ...]]:
+    """
+    Condição "depois do cursor" para uma ordem. Com todas as chaves no mesmo
+    sentido usa uma comparação de row values (que aproveita índices); caso
+    contrário, a expansão equivalente com OR.
+    :return: Tupla (sql, índices dos valores do cursor para cada parâmetro)
+    """
+    if len({descending for _, descending in keys}) > 1:
+        return _compile_mixed_keyset(keys)
+
+    columns = ', '.join(field_expression(name) for name, _ in keys)
+    marks = ', '.join('?' * len(keys))
+    op = '<' if keys[0][1] else '>'
+    return f'({columns}) {op} ({marks})', tuple(range(len(keys)))
+
+
+def encode_cursor(values) -> str:
+    data = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, AttributeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError(f'invalid cursor: {cursor!r}')
+    return values
@@ -0,0 +1,100 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple, Union
+
+from .definers import get_ops
+
+_IDENTIFIER = r'[A-Za-z_][A-Za-z0-9_]*'
+_FIELD_PATTERN = re.compile(rf'^{_IDENTIFIER}(\.{_IDENTIFIER})*$')
+COLUMN_FIELDS = ('entity_id',)
+
+
+@dataclass(frozen=True)
+class Term:
+    """
+    Condição simples: campo, comparador e valores (ex.: idade__gt=30)
+    """
+    field: str
+    op: str
+    values: tuple
+
+    @property
+    def shape(self):
+        return self.field, self.op
+
+
+@dataclass(frozen=True)
+class Group:
+    """
+    Condições combinadas com AND ou OR, com qualquer quantidade de termos
+    """
+    operator: str
+    children: Tuple[Union[Term, 'Group'], ...]
+
+    @property
+    def shape(self):
+        return self.operator, tuple(child.shape for child in self.children)
+
+
+def field_expression(field: str) -> str:
+    """
+    Expressão SQL de um campo: colunas da tabela são usadas diretamente e os
+    demais campos (inclusive caminhos com '.') são lidos do JSON em data.
+    """
+    if not _FIELD_PATTERN.match(field):
+        raise ValueError(f'invalid field: {field}')
+    if field in COLUMN_FIELDS:
+        return field
+    return f"json_extract(data, '$.{field}')"
+
+
+def _compile_term(shape) -> str:
+    field, op = shape
+    return get_ops()[op][1].format(field_expression(field))
+
+
+@lru_cache(maxsize=128)
+def compile_shape(shape) -> str:
+    """
+    SQL parametrizado para o formato de uma expressão. O resultado só
+    depende dos campos, comparadores e operadores, nunca dos valores, então
+    filtros repetidos geram sempre o mesmo texto (reaproveitando o cache de
+    statements do sqlite).
+    """
+    if not isinstance(shape[1], tuple):
+        return _compile_term(shape)
+
+    operator, children = shape
+    sql = f' {operator} '.join(compile_shape(child) for child in children)
+    return sql if len(children) == 1 else f'({sql})'
+
+
+def _collect_params(expression, params: list):
+    if isinstance(expression, Term):
+        params.extend(expression.values)
+        return
+    for child in expression.children:
+        _collect_params(child, params)
+
+
+def compile_expression(expression) -> Tuple[str, tuple]:
+    """
+    :param expression: Term ou Group
+    :return: Tupla (sql, parâmetros)
+    """
+    params = []
+    _collect_params(expression, params)
+    return compile_shape(expression.shape), tuple(params)
+
+
+def expression_fields(expression) -> set:
+    """
+    Campos do JSON (não colunas) usados numa expressão
+    """
+    if isinstance(expression, Term):
+        if expression.field in COLUMN_FIELDS:
+            return set()
+        return {expression.field}
+    return set().union(*[expression_fields(child)
+                         for child in expression.children])
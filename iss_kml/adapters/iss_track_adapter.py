@@ -1,9 +1,84 @@
 from iss_kml.adapters.basic_sqlite_adapter import BasicSQLiteAdapter
+from iss_kml.adapters.iss_track_position_adapter import \
+    IssTrackPositionAdapter
 from iss_kml.domain.iss_track.iss_track import IssTrack
+from iss_kml.settings import Settings
 
 
 class IssTrackAdapter(BasicSQLiteAdapter):
+    PRAGMAS = Settings.SQLITE_PRAGMAS
+    _migrated_tracks = set()
+
     def __init__(self, db_path, logger=None):
         super().__init__(database=db_path,
                          adapted_class=IssTrack,
                          logger=logger)
+        self.positions_adapter = IssTrackPositionAdapter(db_path, logger)
+
+    def append_position(self, track_id, iss_pos):
+        return self.positions_adapter.append(track_id, iss_pos)
+
+    def latest_timestamp(self, track_id, since=None, until=None):
+        self._migrate_legacy_track(track_id)
+        return self.positions_adapter.latest_timestamp(track_id, since,
+                                                       until)
+
+    def count_positions(self, track_id, since=None, until=None):
+        self._migrate_legacy_track(track_id)
+        return self.positions_adapter.count_positions(track_id, since, until)
+
+    def get_track(self, track_id, max_points=None, since=None, until=None,
+                  columnar=False) -> IssTrack:
+        """
+        Monta o track a partir da janela final de posições armazenadas
+        :param track_id: ID do track
+        :param max_points: Quantidade máxima de posições (None: todas)
+        :param since: Timestamp mínimo, inclusive (None: sem limite)
+        :param until: Timestamp máximo, inclusive (None: sem limite), para
+            montar o track como estava num instante passado
+        :param columnar: Usa ColumnarPositions (ring buffer com capacidade
+            max_points) no lugar de uma lista de IssPos
+        :return: IssTrack
+        """
+        self._migrate_legacy_track(track_id)
+        if columnar:
+            positions = self.positions_adapter.tail_columnar(
+                track_id, max_points, since, until, capacity=max_points)
+        else:
+            positions = self.positions_adapter.tail(track_id, max_points,
+                                                    since, until)
+        iss_track = IssTrack(entity_id=track_id, positions=positions)
+        iss_track.set_adapter(self)
+        return iss_track
+
+    def iter_track(self, track_id, max_points=None, since=None, until=None,
+                   batch_size=None):
+        """
+        Janela final do track (de since até until, inclusive), em ordem
+        crescente e em lotes, para quem não precisa do track inteiro em
+        memória
+        :return: Gerador de ColumnarPositions
+        """
+        self._migrate_legacy_track(track_id)
+        return self.positions_adapter.iter_tail(track_id, max_points,
+                                                since=since, until=until,
+                                                batch_size=batch_size)
+
+    def _migrate_legacy_track(self, track_id):
+        """
+        Move as posições de um track gravado como um único blob JSON (formato
+        antigo) para a tabela de posições e remove o blob.
+        """
+        key = (self._database, track_id)
+        if key in self._migrated_tracks:
+            return
+
+        legacy_track = self.get_by_id(track_id)
+        if legacy_track is not None:
+            self.logger.info(f'Migrating track {track_id} '
+                             f'({len(legacy_track.positions)} positions)...')
+            self.positions_adapter.append_many(track_id,
+                                               legacy_track.positions)
+            self.delete(track_id)
+
+        self._migrated_tracks.add(key)
@@ -0,0 +1,224 @@
+import json
+from itertools import islice
+from sqlite3 import OperationalError
+from typing import Iterator, List
+
+from iss_kml.adapters.basic_persist_adapter import Page
+from iss_kml.adapters.basic_sqlite_adapter import BasicSQLiteAdapter
+from iss_kml.adapters.basic_sqlite_adapter.exceptions import \
+    SQLiteAdapterSaveException
+from iss_kml.domain.iss_track.columnar_positions import ColumnarPositions
+from iss_kml.domain.iss_track.iss_track import IssPos, IssTrackPosition
+from iss_kml.settings import Settings
+
+
+class PositionStatements:
+    MAX_TS: int = 2 ** 63 - 1
+    INSERT_OR_IGNORE: str = \
+        'INSERT OR IGNORE INTO {} (entity_id, data) values (?,?)'
+    SELECT_TAIL: str = (
+        "SELECT data FROM {} "
+        "WHERE json_extract(data, '$.track_id')=? "
+        "AND json_extract(data, '$.timestamp') BETWEEN ? AND ? "
+        "ORDER BY json_extract(data, '$.timestamp') DESC LIMIT ?"
+    )
+    SELECT_TAIL_START: str = (
+        "SELECT json_extract(data, '$.timestamp') FROM {} "
+        "WHERE json_extract(data, '$.track_id')=? "
+        "AND json_extract(data, '$.timestamp') BETWEEN ? AND ? "
+        "ORDER BY json_extract(data, '$.timestamp') DESC LIMIT 1 OFFSET ?"
+    )
+
+
+class IssTrackPositionAdapter(BasicSQLiteAdapter):
+    """
+    Armazena as posições de um track como linhas independentes, indexadas
+    por (track_id, timestamp). Incluir uma posição é um único INSERT e a
+    leitura traz apenas a janela final do track.
+    """
+    PRAGMAS = Settings.SQLITE_PRAGMAS
+    INDEXED_FIELDS = (('track_id', 'timestamp'),)
+
+    def __init__(self, db_path, logger=None):
+        super().__init__(database=db_path,
+                         adapted_class=IssTrackPosition,
+                         logger=logger)
+
+    def _insert_rows(self, rows):
+        statement = PositionStatements.INSERT_OR_IGNORE.format(
+            self._table_name)
+        cur = self._db.cursor()
+        cur.executemany(statement, rows)
+        self._db.commit()
+
+    def append_many(self, track_id, positions: List[IssPos]):
+        rows = []
+        for iss_pos in positions:
+            position = IssTrackPosition.from_iss_pos(track_id, iss_pos)
+            rows.append((position.entity_id, json.dumps(position.to_json())))
+
+        for _ in range(3):
+            try:
+                self._insert_rows(rows)
+                return len(rows)
+            except OperationalError as e:
+                self._check_operational_error(e)
+
+        msg = f'Error inserting {len(rows)} positions into ' \
+              f'{self._table_name}'
+        self._logger.error(msg)
+
+        raise SQLiteAdapterSaveException(msg)
+
+    def append(self, track_id, iss_pos: IssPos):
+        self.append_many(track_id, [iss_pos])
+        return IssTrackPosition.make_id(track_id, iss_pos.timestamp)
+
+    def _query_tail(self, track_id, max_points, since, until):
+        self.logger.info(f'Reading tail of track {track_id} '
+                         f'in {self._table_name}...')
+
+        statement = PositionStatements.SELECT_TAIL.format(self._table_name)
+        params = (track_id,
+                  since if since is not None else -1,
+                  until if until is not None else PositionStatements.MAX_TS,
+                  max_points if max_points is not None else -1)
+        try:
+            return self._query_statement(statement, params)
+        except OperationalError:
+            return []
+
+    def tail(self, track_id, max_points=None, since=None,
+             until=None) -> List[IssPos]:
+        """
+        Posições mais recentes de um track, em ordem crescente de timestamp
+        :param track_id: ID do track
+        :param max_points: Quantidade máxima de posições (None: todas)
+        :param since: Timestamp mínimo, inclusive (None: sem limite)
+        :param until: Timestamp máximo, inclusive (None: sem limite); a
+            janela é lida pelo índice (track_id, timestamp), sem percorrer
+            as posições posteriores
+        :return: Lista de IssPos
+        """
+        rows = self._query_tail(track_id, max_points, since, until)
+        positions = [self._instantiate_object(json.loads(row[0])).to_iss_pos()
+                     for row in rows]
+        positions.reverse()
+        return positions
+
+    def tail_columnar(self, track_id, max_points=None, since=None,
+                      until=None, capacity=None) -> ColumnarPositions:
+        """
+        Igual a tail(), mas carrega as posições direto em colunas, sem
+        instanciar um objeto por posição
+        :param capacity: Capacidade do ring buffer (None: sem limite)
+        :return: ColumnarPositions
+        """
+        rows = self._query_tail(track_id, max_points, since, until)
+        positions = ColumnarPositions(capacity=capacity)
+        self._append_rows(positions, reversed(rows))
+        return positions
+
+    @staticmethod
+    def _append_rows(positions: ColumnarPositions, rows):
+        for row in rows:
+            data = json.loads(row[0])
+            positions.append_values(data['latitude'],
+                                    data['longitude'],
+                                    data['altitude'],
+                                    data['speed'],
+                                    data['footprint'],
+                                    data['timestamp'])
+
+    def _tail_start(self, track_id, max_points, since, until):
+        since = since if since is not None else -1
+        if max_points is None:
+            return since
+
+        statement = PositionStatements.SELECT_TAIL_START.format(
+            self._table_name)
+        rows = self._query_statement(statement, (track_id, since, until,
+                                                 max_points - 1))
+        return rows[0][0] if rows else since
+
+    def iter_tail(self, track_id, max_points=None, since=None, until=None,
+                  batch_size=None) -> Iterator[ColumnarPositions]:
+        """
+        Igual a tail_columnar(), mas lendo as posições em ordem crescente,
+        em lotes de batch_size, sem manter o track inteiro em memória
+        :param until: Timestamp máximo, inclusive (None: sem limite)
+        :return: Gerador de ColumnarPositions, um por lote
+        """
+        until = until if until is not None else PositionStatements.MAX_TS
+        try:
+            yield from self._iter_tail(track_id, max_points, since, until,
+                                       batch_size)
+        except OperationalError as e:
+            if 'no such table' not in str(e):
+                raise
+
+    def _iter_tail(self, track_id, max_points, since, until, batch_size):
+        start = self._tail_start(track_id, max_points, since, until)
+        window = self.filter_and(track_id__eq=track_id,
+                                 timestamp__between=(start, until))
+        statement, params = self._filter_statement((window,), {},
+                                                   'timestamp', None)
+        rows = self._iter_statement(statement, params, batch_size=batch_size)
+        batch_size = batch_size or self.FETCH_BATCH_SIZE
+        while True:
+            batch = ColumnarPositions()
+            self._append_rows(batch, islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def history(self, track_id, limit=100, cursor=None,
+                newest_first=False) -> Page:
+        """
+        Página do histórico de um track, por ordem de timestamp
+        :param track_id: ID do track
+        :param limit: Quantidade máxima de posições na página
+        :param cursor: Cursor da página anterior (None: primeira página)
+        :param newest_first: Percorre o histórico do mais recente para o
+            mais antigo
+        :return: Page de IssPos
+        """
+        order_by = '-timestamp' if newest_first else 'timestamp'
+        try:
+            page = self.page(track_id__eq=track_id, order_by=order_by,
+                             limit=limit, cursor=cursor)
+        except OperationalError:
+            return Page()
+
+        return Page([position.to_iss_pos() for position in page.items],
+                    page.cursor)
+
+    def latest_timestamp(self, track_id, since=None, until=None):
+        """
+        Timestamp da posição mais recente de um track, sem carregar posições
+        :param track_id: ID do track
+        :param since: Timestamp mínimo, inclusive (None: sem limite)
+        :param until: Timestamp máximo, inclusive (None: sem limite); com
+            ele, retorna a posição vigente naquele instante
+        :return: Timestamp ou None, se não houver posições no intervalo
+        """
+        if since is None and until is None:
+            return self.max_value('timestamp', track_id__eq=track_id)
+        return self.max_value('timestamp',
+                              self._range_filter(track_id, since, until))
+
+    def _range_filter(self, track_id, since, until):
+        return self.filter_and(
+            track_id__eq=track_id,
+            timestamp__between=(
+                since if since is not None else -1,
+                until if until is not None else PositionStatements.MAX_TS))
+
+    def count_positions(self, track_id, since=None, until=None):
+        """
+        Quantidade de posições armazenadas de um track, opcionalmente num
+        intervalo (since e until inclusive), pelo índice de timestamp
+        """
+        if since is None and until is None:
+            return self.count(track_id__eq=track_id)
+        return self.count(self._range_filter(track_id, since, until))
@@ -0,0 +1,153 @@
+import gzip
+import threading
+import zipfile
+from collections import OrderedDict
+from io import BytesIO
+from typing import Callable, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+KMZ = 'kmz'
+KMZ_DOCUMENT_NAME = 'doc.kml'
+
+
+def available_encodings():
+    """
+    Content-Encodings suportados, em ordem de preferência
+    """
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encodings) -> Optional[str]:
+    """
+    Escolhe o Content-Encoding da resposta
+    :param accept_encodings: Accept-Encoding da requisição
+        (request.accept_encodings do Flask)
+    :return: 'br', 'gzip' ou None (sem compressão)
+    """
+    return accept_encodings.best_match(available_encodings())
+
+
+def make_kmz(kml: bytes) -> bytes:
+    """
+    KMZ (zip com o KML em doc.kml). A data do arquivo é fixa, de forma que
+    o mesmo KML gera sempre os mesmos bytes.
+    """
+    buffer = BytesIO()
+    info = zipfile.ZipInfo(KMZ_DOCUMENT_NAME, date_time=(1980, 1, 1, 0, 0, 0))
+    info.compress_type = zipfile.ZIP_DEFLATED
+    with zipfile.ZipFile(buffer, 'w') as kmz:
+        kmz.writestr(info, kml)
+    return buffer.getvalue()
+
+
+def compress(data: bytes, variant: Optional[str]) -> bytes:
+    """
+    :param variant: 'gzip', 'br', 'kmz' ou None (dados sem alteração)
+    """
+    if variant is None:
+        return data
+    if variant == 'gzip':
+        return gzip.compress(data, GZIP_LEVEL, mtime=0)
+    if variant == 'br' and brotli is not None:
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if variant == KMZ:
+        return make_kmz(data)
+    raise ValueError(f'unsupported variant: {variant}')
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RenderCache:
+    """
+    Guarda o KML renderizado e suas variantes comprimidas por chave (a
+    última posição mais os parâmetros de renderização), numa LRU de até
+    max_entries chaves. Enquanto a chave não muda, renderização e compressão
+    acontecem uma única vez, independente da quantidade de clientes:
+    requisições simultâneas pela mesma chave e variante aguardam a primeira
+    (como no SingleFlight), sem bloquear as de outras chaves. Como a chave
+    inclui a última posição, as entradas antigas saem da LRU quando chegam
+    posições novas.
+    """
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flights = {}
+
+    def get(self, key, variant: Optional[str],
+            render: Callable[[], Optional[bytes]]) -> Optional[bytes]:
+        """
+        :param key: Chave da renderização (hashable)
+        :param variant: 'gzip', 'br', 'kmz' ou None (KML sem compressão)
+        :param render: Função que renderiza o KML (bytes); se retornar None,
+            nada é guardado
+        :return: Bytes da variante ou None
+        """
+        data, flight, is_leader = self._lookup_or_join(key, variant)
+        if data is not None:
+            return data
+        if is_leader:
+            return self._lead(flight, key, variant, render)
+
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def _lookup_or_join(self, key, variant):
+        with self._lock:
+            variants = self._entries.get(key)
+            if variants is not None:
+                self._entries.move_to_end(key)
+                if variant in variants:
+                    return variants[variant], None, False
+
+            flight = self._flights.get((key, variant))
+            if flight is not None:
+                return None, flight, False
+            flight = self._flights[(key, variant)] = _Flight()
+            return None, flight, True
+
+    def _lead(self, flight, key, variant, render):
+        try:
+            flight.result = self._build(key, variant, render)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[(key, variant)]
+            flight.done.set()
+
+    def _build(self, key, variant, render):
+        if variant is None:
+            data = render()
+        else:
+            kml = self.get(key, None, render)
+            data = None if kml is None else compress(kml, variant)
+        if data is not None:
+            self._store(key, variant, data)
+        return data
+
+    def _store(self, key, variant, data):
+        with self._lock:
+            self._entries.setdefault(key, {})[variant] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -1,26 +1,34 @@
 from marshmallow import Schema
 
+from .codec import get_codec
+
 
 class BasicValue:
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._codec = get_codec(cls.Schema)
+
     @classmethod
-    def from_json(cls, dict_data):
-        return cls.Schema().load(dict_data)
+    def from_json(cls, dict_data, validate=False):
+        return cls._codec.load(dict_data, validate)
 
     def to_json(self):
-        return self.Schema().dump(self)
+        return self._codec.dump(self)
 
     def __eq__(self, other):
         return all([getattr(self, attr) == getattr(other, attr)
-                    for attr in self.Schema().fields.keys()])
+                    for attr in self._codec.field_names])
 
     def __repr__(self):
         class_name = self.__class__.__name__
-        fields = self.Schema().fields
         values_dict = {field: str(getattr(self, field))
-                       for field in fields.keys()}
+                       for field in self._codec.field_names}
         values = [f'{field}={value}' for field, value in values_dict.items()]
         values_str = ', '.join(sorted(values))
         return f'{class_name}({values_str})'
 
     class Schema(Schema):
         pass
+
+
+BasicValue._codec = get_codec(BasicValue.Schema)
@@ -0,0 +1,148 @@
+from typing import Callable, Dict, Type
+
+from marshmallow import Schema, fields
+from marshmallow.decorators import POST_DUMP, POST_LOAD, PRE_DUMP, PRE_LOAD
+
+_MISSING = object()
+_SCALARS = {fields.Float: float, fields.Integer: int, fields.String: str}
+_codecs: Dict[Type[Schema], 'Codec'] = {}
+
+
+def get_codec(schema_class: Type[Schema]) -> 'Codec':
+    """
+    Codec compilado (e cacheado) para uma classe de Schema
+    :param schema_class: Classe derivada de marshmallow.Schema
+    :return: Codec
+    """
+    codec = _codecs.get(schema_class)
+    if codec is None:
+        codec = Codec(schema_class)
+        _codecs[schema_class] = codec
+    return codec
+
+
+def _nullable(convert: Callable) -> Callable:
+    return lambda value: None if value is None else convert(value)
+
+
+def _nested_codec(field):
+    nested = field.nested
+    if isinstance(nested, type) and issubclass(nested, Schema):
+        return get_codec(nested)
+    return None
+
+
+def _many(convert: Callable) -> Callable:
+    return _nullable(lambda values: [convert(v) for v in values])
+
+
+class Codec:
+    """
+    Serializa/desserializa objetos de um Schema sem passar pelo pipeline do
+    marshmallow a cada chamada. Campos Float, Integer, String, Nested e List
+    (desses tipos) são convertidos diretamente; os demais usam o próprio
+    campo do marshmallow. Hooks post_load continuam sendo executados.
+
+    A desserialização não valida os dados; use load(..., validate=True)
+    (o Schema do marshmallow) quando os dados não forem confiáveis.
+    """
+    def __init__(self, schema_class: Type[Schema]):
+        self.schema_class = schema_class
+        self.schema = schema_class()
+        self.field_names = tuple(self.schema.fields.keys())
+        self.compiled = self._is_compilable()
+        self._loaders = []
+        self._dumpers = []
+        if self.compiled:
+            self._compile()
+
+    def _is_compilable(self):
+        has_hooks = any(self.schema._has_processors(tag)
+                        for tag in (PRE_LOAD, PRE_DUMP, POST_DUMP))
+        has_many_hooks = bool(self.schema._hooks[(POST_LOAD, True)])
+        renamed = any(field.data_key or field.attribute
+                      for field in self.schema.fields.values())
+        return not (has_hooks or has_many_hooks or renamed)
+
+    def _get_post_loads(self):
+        post_loads = [getattr(self.schema, name)
+                      for name in self.schema._hooks[(POST_LOAD, False)]]
+        for post_load in post_loads:
+            hook = post_load.__marshmallow_hook__[(POST_LOAD, False)]
+            if hook.get('pass_original'):
+                return None
+        return post_loads
+
+    def _compile(self):
+        self._post_loads = self._get_post_loads()
+        for name, field in self.schema.fields.items():
+            if not field.dump_only:
+                self._loaders.append((name,
+                                      self._make_loader(name, field),
+                                      field.load_default))
+            if not field.load_only:
+                self._dumpers.append((name, self._make_dumper(name, field)))
+
+    def _make_loader(self, name, field) -> Callable:
+        convert = self._make_converter(field, load=True)
+        if convert is None:
+            return lambda value, data: field.deserialize(value, name, data)
+        return lambda value, _data: convert(value)
+
+    def _make_dumper(self, name, field) -> Callable:
+        convert = self._make_converter(field, load=False)
+        if convert is None:
+            return lambda value, obj: field.serialize(name, obj)
+        return lambda value, _obj: convert(value)
+
+    def _make_converter(self, field, load):
+        if type(field) in _SCALARS:
+            return _nullable(_SCALARS[type(field)])
+
+        if type(field) == fields.List:
+            convert = self._make_converter(field.inner, load)
+            return _many(convert) if convert else None
+
+        if type(field) == fields.Nested:
+            codec = _nested_codec(field)
+            if codec is None:
+                return None
+            convert = _nullable(codec.load if load else codec.dump)
+            return _many(convert) if field.many else convert
+
+        return None
+
+    def _load_fields(self, data: dict) -> dict:
+        result = {}
+        for name, loader, default in self._loaders:
+            value = data.get(name, _MISSING)
+            if value is not _MISSING:
+                result[name] = loader(value, data)
+            elif default is not fields.missing_:
+                result[name] = default() if callable(default) else default
+        return result
+
+    def load(self, data: dict, validate=False):
+        if validate or not self.compiled:
+            return self.schema.load(data)
+
+        result = self._load_fields(data)
+        if self._post_loads is None:
+            return self.schema._invoke_load_processors(
+                POST_LOAD, result, many=False, original_data=data,
+                partial=None)
+
+        for post_load in self._post_loads:
+            result = post_load(result, many=False, partial=None)
+        return result
+
+    def dump(self, obj) -> dict:
+        if not self.compiled:
+            return self.schema.dump(obj)
+
+        result = {}
+        for name, dumper in self._dumpers:
+            value = getattr(obj, name, _MISSING)
+            if value is not _MISSING:
+                result[name] = dumper(value, obj)
+        return result
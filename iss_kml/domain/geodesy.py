@@ -0,0 +1,83 @@
+import numpy as np
+
+# Raio da esfera 'sphere' do PROJ, a mesma usada por
+# LatLon.offset(..., ellipse='sphere')
+SPHERE_RADIUS_KM = 6370.997
+
+
+def destination_points(latitudes, longitudes, bearings, distances,
+                       radius=SPHERE_RADIUS_KM):
+    """
+    Pontos de destino sobre a esfera, partindo de (latitude, longitude) com
+    rumo inicial e distância dados. Os argumentos seguem as regras de
+    broadcasting do numpy, de forma que vários pontos e rumos são calculados
+    numa única chamada.
+    :param latitudes: Latitudes de origem, em graus
+    :param longitudes: Longitudes de origem, em graus
+    :param bearings: Rumos iniciais, em graus
+    :param distances: Distâncias, em km
+    :param radius: Raio da esfera, em km
+    :return: Tupla (latitudes, longitudes) em graus, longitudes em [-180, 180)
+    """
+    phi = np.radians(latitudes)
+    lam = np.radians(longitudes)
+    theta = np.radians(bearings)
+    delta = np.asarray(distances, dtype=float) / radius
+
+    sin_phi, cos_phi = np.sin(phi), np.cos(phi)
+    sin_delta, cos_delta = np.sin(delta), np.cos(delta)
+
+    sin_phi2 = sin_phi * cos_delta + cos_phi * sin_delta * np.cos(theta)
+    phi2 = np.arcsin(sin_phi2)
+    lam2 = lam + np.arctan2(np.sin(theta) * sin_delta * cos_phi,
+                            cos_delta - sin_phi * sin_phi2)
+
+    return np.degrees(phi2), (np.degrees(lam2) + 540) % 360 - 180
+
+
+def final_bearings(latitudes1, longitudes1, latitudes2, longitudes2):
+    """
+    Rumo de chegada em (latitude2, longitude2) no grande círculo que parte
+    de (latitude1, longitude1), ou seja, o rumo para seguir em frente a
+    partir do segundo ponto
+    :return: Rumos em graus, em [0, 360)
+    """
+    phi1, phi2 = np.radians(latitudes2), np.radians(latitudes1)
+    delta_lam = np.radians(np.subtract(longitudes1, longitudes2))
+
+    reverse = np.degrees(np.arctan2(
+        np.sin(delta_lam) * np.cos(phi2),
+        np.cos(phi1) * np.sin(phi2) -
+        np.sin(phi1) * np.cos(phi2) * np.cos(delta_lam)))
+    return (reverse + 180) % 360
+
+
+def footprint_rings(latitudes, longitudes, radii, num_points=128):
+    """
+    Polígonos (fechados) de footprint para um lote de posições
+    :param latitudes: Latitudes dos centros, em graus
+    :param longitudes: Longitudes dos centros, em graus
+    :param radii: Raios dos footprints, em km
+    :param num_points: Quantidade de vértices de cada anel
+    :return: Tupla (latitudes, longitudes), cada uma com shape
+        (posições, num_points + 1)
+    """
+    bearings = np.arange(num_points + 1) * (360 / num_points)
+    latitudes = np.atleast_1d(np.asarray(latitudes, dtype=float))[:, None]
+    longitudes = np.atleast_1d(np.asarray(longitudes, dtype=float))[:, None]
+    radii = np.atleast_1d(np.asarray(radii, dtype=float))[:, None]
+
+    return destination_points(latitudes, longitudes, bearings[None, :], radii)
+
+
+def format_kml_coordinates(longitudes, latitudes, altitude=0) -> str:
+    """
+    Formata pontos no formato de coordenadas do KML ("lon,lat,alt ")
+    :param longitudes: Longitudes, em graus
+    :param latitudes: Latitudes, em graus
+    :param altitude: Altitude comum a todos os pontos
+    :return: String de coordenadas
+    """
+    return ''.join([f'{lon},{lat},{altitude} '
+                    for lon, lat in zip(np.asarray(longitudes).tolist(),
+                                        np.asarray(latitudes).tolist())])
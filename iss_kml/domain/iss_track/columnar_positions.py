@@ -0,0 +1,153 @@
+from array import array
+from typing import Iterable, List, Optional
+
+from iss_kml.domain.iss_track.iss_track import IssPos, kml_coordinate
+
+
+_INT_BITS = (1, 2, 4)
+
+
+def _int_flags(*values):
+    return sum(bit for bit, value in zip(_INT_BITS, values)
+               if isinstance(value, int))
+
+
+class ColumnarPositions:
+    """
+    Sequência de IssPos armazenada em colunas paralelas (array('d') para os
+    valores e array('q') para os timestamps), sem um objeto por posição.
+    Com capacity, funciona como um ring buffer: ao encher, a posição mais
+    antiga é descartada a cada append.
+
+    Suporta o subconjunto de operações de lista usado por IssTrack: len,
+    append, extend, iteração, índice (retorna IssPos) e slice (retorna
+    lista de IssPos).
+
+    As coordenadas do KML são formatadas a partir das colunas, sem guardar
+    um str por posição; um byte por posição (array('B')) marca os valores
+    de longitude, latitude e altitude recebidos como int, para que o texto
+    seja idêntico ao de IssTrack com uma lista de IssPos.
+    """
+    FLOAT_FIELDS = ('latitude', 'longitude', 'altitude', 'speed', 'footprint')
+    KML_FIELDS = ('longitude', 'latitude', 'altitude')
+
+    def __init__(self,
+                 positions: Iterable[IssPos] = (),
+                 capacity: Optional[int] = None):
+        if capacity is not None and capacity < 1:
+            raise ValueError('capacity must be positive')
+
+        self.capacity = capacity
+        self._columns = {name: array('d') for name in self.FLOAT_FIELDS}
+        self._columns['timestamp'] = array('q')
+        self._int_flags = array('B')
+        self._flagged = 0
+        self._start = 0
+        self._size = 0
+        self.extend(positions)
+
+    def __len__(self):
+        return self._size
+
+    def _is_full(self):
+        return self.capacity is not None and self._size == self.capacity
+
+    def append_values(self, latitude, longitude, altitude, speed, footprint,
+                      timestamp):
+        values = (latitude, longitude, altitude, speed, footprint, timestamp)
+        flags = _int_flags(longitude, latitude, altitude)
+        if self._is_full():
+            self._flagged -= self._int_flags[self._start] != 0
+            for column, value in zip(self._columns.values(), values):
+                column[self._start] = value
+            self._int_flags[self._start] = flags
+            self._start = (self._start + 1) % self.capacity
+        else:
+            for column, value in zip(self._columns.values(), values):
+                column.append(value)
+            self._int_flags.append(flags)
+            self._size += 1
+        self._flagged += flags != 0
+
+    def append(self, iss_pos: IssPos):
+        self.append_values(iss_pos.latitude,
+                           iss_pos.longitude,
+                           iss_pos.altitude,
+                           iss_pos.speed,
+                           iss_pos.footprint,
+                           iss_pos.timestamp)
+
+    def extend(self, positions: Iterable[IssPos]):
+        for iss_pos in positions:
+            self.append(iss_pos)
+
+    def _physical_index(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('position index out of range')
+        return (self._start + index) % len(self._columns['timestamp'])
+
+    def _get_position(self, index) -> IssPos:
+        physical = self._physical_index(index)
+        return IssPos(*[column[physical]
+                        for column in self._columns.values()])
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self._get_position(i)
+                    for i in range(*item.indices(self._size))]
+        return self._get_position(item)
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._get_position(i)
+
+    def _tail_start(self, max_points):
+        # como positions[-max_points:] numa lista: 0 é o track inteiro
+        if not max_points:
+            return 0
+        return max(0, self._size - max_points)
+
+    def column(self, name, max_points=None) -> array:
+        """
+        Valores de um campo, em ordem cronológica
+        :param name: Nome do campo (ex.: 'latitude', 'timestamp')
+        :param max_points: Retorna apenas os últimos max_points valores
+        :return: array com cópia dos valores (compatível com numpy.asarray)
+        """
+        return self._ring_slice(self._columns[name], max_points)
+
+    def _ring_slice(self, column, max_points):
+        first = self._start + self._tail_start(max_points)
+        last = self._start + self._size
+        if last <= len(column):
+            return column[first:last]
+
+        wrapped = last - len(column)
+        if first >= len(column):
+            return column[first - len(column):wrapped]
+        return column[first:] + column[:wrapped]
+
+    def fragments(self, max_points=None) -> List[str]:
+        """
+        Fragmentos de coordenadas do KML ("lon,lat,alt ") das últimas
+        posições, em ordem cronológica
+        """
+        columns = [self.column(name, max_points) for name in self.KML_FIELDS]
+        if self._flagged:
+            flags = self._ring_slice(self._int_flags, max_points)
+            columns = [[int(value) if flag & bit else value
+                        for value, flag in zip(column, flags)]
+                       for bit, column in zip(_INT_BITS, columns)]
+        return list(map(kml_coordinate, *columns))
+
+    def coordinates_kml(self, max_points=None) -> str:
+        """
+        Coordenadas das últimas posições no formato do KML
+        ("lon,lat,alt "), idênticas às de IssTrack.get_track_coordinates_kml
+        """
+        return ''.join(self.fragments(max_points))
+
+    def to_list(self) -> List[IssPos]:
+        return list(self)
@@ -1,9 +1,13 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 from marshmallow import fields, post_load
 
 from iss_kml.domain.basic_domain import BasicEntity, BasicValue
+from iss_kml.domain.simplification import (douglas_peucker_importance,
+                                           select_points,
+                                           simplification_cache)
+from iss_kml.domain.viewport import BBox, SegmentIndex, viewport_cache
 
 
 @dataclass
@@ -28,21 +32,154 @@ class IssPos(BasicValue):
             return IssPos(**data)
 
 
+def kml_coordinate(longitude, latitude, altitude) -> str:
+    """
+    Fragmento de uma posição no formato de coordenadas do KML
+    ("lon,lat,alt ")
+    """
+    return f'{longitude},{latitude},{altitude} '
+
+
 class IssTrack(BasicEntity):
     def __init__(self,
                  positions: List[IssPos],
                  entity_id=None):
         super().__init__(entity_id)
         self.positions = positions
+        self._fragments = []
+        self._fragments_of = None
+        self._last_encoded = None
+
+    def _update_fragments(self):
+        """
+        Mantém um fragmento de coordenadas já formatado por posição. As
+        posições são tratadas como append-only: só as novas são formatadas.
+        Se a lista for trocada, encolher ou tiver a última posição
+        formatada substituída, os fragmentos são refeitos. Só vale para um
+        IssTrack mantido entre renderizações: no app, o track é lido do
+        banco a cada requisição, e o RenderCache evita renderizar de novo.
+        """
+        positions = self.positions
+        cached = len(self._fragments)
+        if self._fragments_stale(positions, cached):
+            self._fragments = []
+            self._fragments_of = positions
+            cached = 0
+
+        self._fragments.extend([kml_coordinate(pos.longitude,
+                                               pos.latitude,
+                                               pos.altitude)
+                                for pos in positions[cached:]])
+        self._last_encoded = positions[-1] if positions else None
+
+    def _fragments_stale(self, positions, cached):
+        if self._fragments_of is not positions or cached > len(positions):
+            return True
+        return cached > 0 and positions[cached - 1] is not self._last_encoded
 
     def get_track_coordinates_kml(self, max_points=None):
-        coordinates = ''
+        if hasattr(self.positions, 'coordinates_kml'):
+            # posições em colunas (ColumnarPositions)
+            return self.positions.coordinates_kml(max_points)
+
+        self._update_fragments()
         if max_points is None:
-            max_points = len(self.positions)
-        for pos in self.positions[-max_points:]:
-            coordinates += f'{pos.longitude},{pos.latitude},{pos.altitude} '
+            max_points = len(self._fragments)
+        return ''.join(self._fragments[-max_points:])
+
+    def positions_until(self, timestamp,
+                        count: Optional[int] = None) -> List[IssPos]:
+        """
+        Posições anteriores a timestamp (exclusive). As posições estão em
+        ordem de timestamp, então o corte é encontrado por busca binária.
+        :param count: Retorna apenas as últimas count dessas posições (só
+            elas são lidas de um ColumnarPositions)
+        """
+        positions = self.positions
+        low, high = 0, len(positions)
+        while low < high:
+            middle = (low + high) // 2
+            if positions[middle].timestamp < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        start = 0 if count is None else max(0, low - count)
+        return positions[start:low]
+
+    def _window(self, window):
+        """
+        Latitudes, longitudes, altitudes, timestamps e fragmentos do KML das
+        últimas window posições (mesma janela de get_track_coordinates_kml)
+        """
+        positions = self.positions
+        names = ('latitude', 'longitude', 'altitude', 'timestamp')
+        if hasattr(positions, 'fragments'):
+            # posições em colunas (ColumnarPositions)
+            return ([positions.column(name, window) for name in names],
+                    positions.fragments(window))
+
+        self._update_fragments()
+        if window is None:
+            window = len(self._fragments)
+        tail = positions[-window:]
+        return ([[getattr(pos, name) for pos in tail] for name in names],
+                self._fragments[-window:])
+
+    def get_simplified_coordinates_kml(self, window=None, max_points=None,
+                                       tolerance=None):
+        """
+        Coordenadas das últimas window posições, simplificadas com
+        Douglas-Peucker sobre a esfera para no máximo max_points pontos e/ou
+        desvio de até tolerance km. A importância de cada ponto é calculada
+        uma única vez por versão do track (simplification_cache); cada nível
+        de detalhe é só uma seleção sobre ela.
+        """
+        _columns, fragments, indexes, _version = self._simplify(
+            window, max_points, tolerance)
+        return ''.join([fragments[i] for i in indexes])
+
+    def _simplify(self, window, max_points, tolerance):
+        """
+        :return: Tupla (colunas da janela, fragmentos, índices dos pontos
+            selecionados, versão do track)
+        """
+        columns, fragments = self._window(window)
+        if not fragments:
+            return columns, fragments, [], None
+
+        latitudes, longitudes, _altitudes, timestamps = columns
+        version = (self.entity_id, len(fragments),
+                   timestamps[0], timestamps[-1])
+        importance = simplification_cache.get(
+            version, lambda: douglas_peucker_importance(latitudes,
+                                                        longitudes))
+        indexes = select_points(importance, max_points, tolerance)
+        return columns, fragments, indexes.tolist(), version
+
+    def get_clipped_coordinates_kml(self, bbox: BBox, window=None,
+                                    max_points=None,
+                                    tolerance=None) -> List[str]:
+        """
+        Coordenadas das últimas window posições (simplificadas como em
+        get_simplified_coordinates_kml) recortadas pela bbox. Cada trecho
+        dentro da bbox é um LineString separado; os pontos nas bordas são
+        interpolados. O índice espacial é montado uma vez por versão do
+        track e nível de detalhe (viewport_cache).
+        """
+        columns, _fragments, indexes, version = self._simplify(
+            window, max_points, tolerance)
+        if not indexes:
+            return []
 
-        return coordinates
+        def build():
+            latitudes, longitudes, altitudes, _ = columns
+            return SegmentIndex([longitudes[i] for i in indexes],
+                                [latitudes[i] for i in indexes],
+                                [altitudes[i] for i in indexes])
+
+        index = viewport_cache.get((version, max_points, tolerance), build)
+        return [''.join([kml_coordinate(*point) for point in piece.tolist()])
+                for piece in index.clip(bbox)]
 
     class Schema(BasicEntity.Schema):
         positions = fields.List(fields.Nested(IssPos.Schema),
@@ -52,3 +189,63 @@ class IssTrack(BasicEntity):
         @post_load
         def on_load(self, data, **_kwargs):
             return IssTrack(**data)
+
+
+class IssTrackPosition(BasicEntity):
+    """
+    Uma posição de um track, persistida como uma linha independente.
+    O entity_id é derivado do track e do timestamp, de forma que a mesma
+    leitura do serviço nunca é gravada duas vezes.
+    """
+    def __init__(self,
+                 track_id: str,
+                 latitude: float,
+                 longitude: float,
+                 altitude: float,
+                 speed: float,
+                 footprint: float,
+                 timestamp: int,
+                 entity_id=None):
+        super().__init__(entity_id or self.make_id(track_id, timestamp))
+        self.track_id = track_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.speed = speed
+        self.footprint = footprint
+        self.timestamp = timestamp
+
+    @staticmethod
+    def make_id(track_id, timestamp):
+        return f'{track_id}:{timestamp}'
+
+    @classmethod
+    def from_iss_pos(cls, track_id, iss_pos):
+        return cls(track_id=track_id,
+                   latitude=iss_pos.latitude,
+                   longitude=iss_pos.longitude,
+                   altitude=iss_pos.altitude,
+                   speed=iss_pos.speed,
+                   footprint=iss_pos.footprint,
+                   timestamp=iss_pos.timestamp)
+
+    def to_iss_pos(self) -> IssPos:
+        return IssPos(latitude=self.latitude,
+                      longitude=self.longitude,
+                      altitude=self.altitude,
+                      speed=self.speed,
+                      footprint=self.footprint,
+                      timestamp=self.timestamp)
+
+    class Schema(BasicEntity.Schema):
+        track_id = fields.String(required=True, allow_none=False)
+        latitude = fields.Float(required=True, allow_none=False)
+        longitude = fields.Float(required=True, allow_none=False)
+        altitude = fields.Float(required=True, allow_none=False)
+        speed = fields.Float(required=True, allow_none=False)
+        footprint = fields.Float(required=True, allow_none=False)
+        timestamp = fields.Integer(required=True, allow_none=False)
+
+        @post_load
+        def on_load(self, data, **_kwargs):
+            return IssTrackPosition(**data)
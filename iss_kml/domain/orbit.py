@@ -0,0 +1,235 @@
+import math
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from iss_kml.domain.geodesy import SPHERE_RADIUS_KM
+
+# Constantes do WGS84
+MU_KM3_S2 = 398600.4418
+EARTH_RADIUS_KM = 6378.137
+EARTH_FLATTENING = 1 / 298.257223563
+J2 = 1.08262668e-3
+
+MICROSECONDS = 1_000_000
+_SECONDS_PER_DAY = 86400.0
+_UNIX_EPOCH_JULIAN_DATE = 2440587.5
+
+
+@dataclass(frozen=True)
+class Tle:
+    """
+    Elementos orbitais de um TLE (two-line element set). Ângulos em graus,
+    mean_motion em revoluções por dia, mean_motion_dot (primeira derivada
+    dividida por 2, como no TLE) em revoluções por dia², epoch em
+    microssegundos desde 1970-01-01 UTC.
+    """
+    name: Optional[str]
+    catalog_number: int
+    epoch: int
+    mean_motion_dot: float
+    inclination: float
+    raan: float
+    eccentricity: float
+    arg_perigee: float
+    mean_anomaly: float
+    mean_motion: float
+
+    @classmethod
+    def parse(cls, line1: str, line2: str, name: Optional[str] = None):
+        """
+        :raises ValueError: se as linhas não formarem um TLE válido
+        """
+        line1, line2 = line1.strip(), line2.strip()
+        for number, line in ((1, line1), (2, line2)):
+            if len(line) != 69 or line[0] != str(number):
+                raise ValueError(f'invalid TLE line {number}: {line!r}')
+            if _checksum(line) != line[68]:
+                raise ValueError(f'invalid TLE checksum: {line!r}')
+        if line1[2:7] != line2[2:7]:
+            raise ValueError('TLE lines of different objects')
+
+        return cls(name=name.strip() if name else None,
+                   catalog_number=int(line1[2:7]),
+                   epoch=_parse_epoch(line1[18:32]),
+                   mean_motion_dot=float(line1[33:43]),
+                   inclination=float(line2[8:16]),
+                   raan=float(line2[17:25]),
+                   eccentricity=float('0.' + line2[26:33]),
+                   arg_perigee=float(line2[34:42]),
+                   mean_anomaly=float(line2[43:51]),
+                   mean_motion=float(line2[52:63]))
+
+
+def _checksum(line):
+    total = sum(int(c) if c.isdigit() else c == '-' for c in line[:68])
+    return str(total % 10)
+
+
+def _parse_epoch(text):
+    year = int(text[:2])
+    year += 1900 if year >= 57 else 2000
+    start = datetime(year, 1, 1, tzinfo=timezone.utc).timestamp()
+    day = float(text[2:])
+    return round((start + (day - 1) * _SECONDS_PER_DAY) * MICROSECONDS)
+
+
+def parse_tles(text: str) -> List[Tle]:
+    """
+    TLEs de um arquivo no formato da CelesTrak: grupos de duas linhas,
+    opcionalmente precedidos por uma linha com o nome do objeto
+    """
+    lines = [line.rstrip() for line in text.splitlines() if line.strip()]
+    tles, name = [], None
+    index = 0
+    while index < len(lines):
+        if lines[index].startswith('1 ') and index + 1 < len(lines):
+            tles.append(Tle.parse(lines[index], lines[index + 1], name))
+            name = None
+            index += 2
+        else:
+            name = lines[index]
+            index += 1
+    return tles
+
+
+class OrbitPositions(NamedTuple):
+    """
+    Posições propagadas, uma por timestamp: latitude e longitude
+    (geodésicas, em graus), altitude (m), speed (velocidade orbital, km/h)
+    e footprint (diâmetro da área visível, km), como no IssPos
+    """
+    latitude: np.ndarray
+    longitude: np.ndarray
+    altitude: np.ndarray
+    speed: np.ndarray
+    footprint: np.ndarray
+
+
+class KeplerPropagator:
+    """
+    Propagação kepleriana de um TLE, com as variações seculares do J2 (nó
+    ascendente, argumento do perigeu e anomalia média) e o decaimento da
+    órbita pela derivada do movimento médio do TLE. É bem mais simples que
+    o SGP4 (sem termos periódicos nem o modelo de arrasto com bstar), com
+    erro de alguns km perto da época do TLE, crescendo com a distância a
+    ela; suficiente para desenhar o track.
+
+    Todas as operações são vetorizadas sobre arrays de timestamps.
+    """
+    KEPLER_ITERATIONS = 8
+
+    def __init__(self, tle: Tle):
+        self.tle = tle
+        n = tle.mean_motion * 2 * math.pi / _SECONDS_PER_DAY
+        e = tle.eccentricity
+        i = math.radians(tle.inclination)
+        self.semi_major_axis = (MU_KM3_S2 / n ** 2) ** (1 / 3)
+        p = self.semi_major_axis * (1 - e ** 2)
+        k = 1.5 * J2 * (EARTH_RADIUS_KM / p) ** 2 * n
+        sin2_i = math.sin(i) ** 2
+        self._mean_motion = n
+        self._raan_rate = -k * math.cos(i)
+        self._arg_perigee_rate = k * (2 - 2.5 * sin2_i)
+        self._mean_anomaly_rate = n + k * math.sqrt(1 - e ** 2) * \
+            (1 - 1.5 * sin2_i)
+        self._decay = tle.mean_motion_dot * 2 * math.pi / \
+            _SECONDS_PER_DAY ** 2
+
+    def propagate(self, timestamps_us) -> OrbitPositions:
+        """
+        :param timestamps_us: Timestamps (escalar ou array) em microssegundos
+            desde 1970-01-01 UTC
+        :return: OrbitPositions, com arrays no shape de timestamps_us
+        """
+        timestamps_us = np.asarray(timestamps_us, dtype=np.int64)
+        elapsed = (timestamps_us - self.tle.epoch) / MICROSECONDS
+        x, y, z, radius = self._inertial_position(elapsed)
+
+        theta = _gmst(timestamps_us)
+        cos_t, sin_t = np.cos(theta), np.sin(theta)
+        x, y = x * cos_t + y * sin_t, y * cos_t - x * sin_t
+        latitude, longitude, altitude = _geodetic(x, y, z)
+
+        semi_major_axis = self._semi_major_axis(elapsed)
+        speed = np.sqrt(MU_KM3_S2 * (2 / radius - 1 / semi_major_axis))
+        horizon = np.arccos(SPHERE_RADIUS_KM /
+                            (SPHERE_RADIUS_KM + altitude))
+        return OrbitPositions(latitude=latitude,
+                              longitude=longitude,
+                              altitude=altitude * 1000,
+                              speed=speed * 3600,
+                              footprint=2 * SPHERE_RADIUS_KM * horizon)
+
+    def _semi_major_axis(self, elapsed):
+        n = self._mean_motion + 2 * self._decay * elapsed
+        return (MU_KM3_S2 / n ** 2) ** (1 / 3)
+
+    def _inertial_position(self, elapsed):
+        tle = self.tle
+        e = tle.eccentricity
+        mean_anomaly = math.radians(tle.mean_anomaly) + \
+            self._mean_anomaly_rate * elapsed + self._decay * elapsed ** 2
+        eccentric = _solve_kepler(mean_anomaly, e, self.KEPLER_ITERATIONS)
+
+        semi_major_axis = self._semi_major_axis(elapsed)
+        px = semi_major_axis * (np.cos(eccentric) - e)
+        py = semi_major_axis * math.sqrt(1 - e ** 2) * np.sin(eccentric)
+        radius = np.hypot(px, py)
+
+        raan = math.radians(tle.raan) + self._raan_rate * elapsed
+        omega = math.radians(tle.arg_perigee) + \
+            self._arg_perigee_rate * elapsed
+        i = math.radians(tle.inclination)
+        cos_o, sin_o = np.cos(raan), np.sin(raan)
+        cos_w, sin_w = np.cos(omega), np.sin(omega)
+        # perifocal -> inercial
+        u = px * cos_w - py * sin_w
+        v = px * sin_w + py * cos_w
+        x = u * cos_o - v * sin_o * math.cos(i)
+        y = u * sin_o + v * cos_o * math.cos(i)
+        z = v * math.sin(i)
+        return x, y, z, radius
+
+
+def _solve_kepler(mean_anomaly, eccentricity, iterations):
+    mean_anomaly = np.mod(mean_anomaly, 2 * np.pi)
+    eccentric = mean_anomaly + eccentricity * np.sin(mean_anomaly)
+    for _ in range(iterations):
+        eccentric -= (eccentric - eccentricity * np.sin(eccentric) -
+                      mean_anomaly) / (1 - eccentricity * np.cos(eccentric))
+    return eccentric
+
+
+def _gmst(timestamps_us):
+    """
+    Tempo sideral médio de Greenwich (rad), com o UTC no lugar do UT1
+    """
+    days = (timestamps_us - 946728000 * MICROSECONDS) / \
+        (_SECONDS_PER_DAY * MICROSECONDS)
+    degrees = 280.46061837 + 360.98564736629 * days
+    return np.radians(np.mod(degrees, 360))
+
+
+def _geodetic(x, y, z):
+    """
+    Coordenadas geodésicas (WGS84) de um ponto fixo na Terra, pelo método
+    de Bowring
+    :return: Tupla (latitude em graus, longitude em graus em [-180, 180),
+        altitude em km)
+    """
+    a, f = EARTH_RADIUS_KM, EARTH_FLATTENING
+    b = a * (1 - f)
+    e2 = f * (2 - f)
+    ep2 = e2 / (1 - e2)
+    p = np.hypot(x, y)
+    beta = np.arctan2(z * a, p * b)
+    phi = np.arctan2(z + ep2 * b * np.sin(beta) ** 3,
+                     p - e2 * a * np.cos(beta) ** 3)
+    sin_phi = np.sin(phi)
+    n = a / np.sqrt(1 - e2 * sin_phi ** 2)
+    altitude = p * np.cos(phi) + z * sin_phi - a * a / n
+    longitude = (np.degrees(np.arctan2(y, x)) + 540) % 360 - 180
+    return np.degrees(phi), longitude, altitude
@@ -0,0 +1,124 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+from iss_kml.domain.geodesy import SPHERE_RADIUS_KM
+from iss_kml.domain.version_cache import VersionCache
+
+# Campo de visão horizontal usado para estimar a resolução da vista
+DEFAULT_FOV_DEGREES = 60.0
+
+
+def unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """
+    Vetores unitários (x, y, z) de pontos sobre a esfera
+    :return: array com shape (n, 3)
+    """
+    phi = np.radians(np.asarray(latitudes, dtype=float))
+    lam = np.radians(np.asarray(longitudes, dtype=float))
+    cos_phi = np.cos(phi)
+    return np.stack([cos_phi * np.cos(lam),
+                     cos_phi * np.sin(lam),
+                     np.sin(phi)], axis=-1)
+
+
+def _distances_to_arc(start, end, points) -> np.ndarray:
+    """
+    Distâncias angulares (rad) dos pontos ao grande círculo que passa por
+    start e end (ou até start, se os dois coincidirem)
+    """
+    (ax, ay, az), (bx, by, bz) = start, end
+    normal = (ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx)
+    norm = math.sqrt(sum(c * c for c in normal))
+    if norm < 1e-12:
+        return np.arccos(np.clip(points @ np.asarray(start), -1.0, 1.0))
+    normal = np.asarray(normal) / norm
+    return np.abs(np.arcsin(np.clip(points @ normal, -1.0, 1.0)))
+
+
+def douglas_peucker_importance(latitudes, longitudes,
+                               radius=SPHERE_RADIUS_KM) -> np.ndarray:
+    """
+    Executa o Douglas-Peucker completo sobre a esfera e guarda, para cada
+    ponto, a tolerância (km) a partir da qual ele deixa de ser mantido. Os
+    extremos têm importância infinita. Como a importância de um ponto nunca
+    é maior que a do ponto que dividiu o trecho anterior, os pontos com
+    importância > t são exatamente o resultado do Douglas-Peucker com
+    tolerância t, e os k mais importantes formam uma simplificação com k
+    pontos.
+
+    Com o resultado guardado, cada nível de detalhe é só uma seleção (ver
+    select_points).
+    :return: array com a importância de cada ponto, em km
+    """
+    size = len(latitudes)
+    importance = np.full(size, np.inf)
+    vectors = unit_vectors(latitudes, longitudes)
+    rows = vectors.tolist()
+
+    stack = [(0, size - 1, np.inf)]
+    while stack:
+        first, last, parent = stack.pop()
+        if last - first < 2:
+            continue
+
+        distances = _distances_to_arc(rows[first], rows[last],
+                                      vectors[first + 1:last])
+        offset = int(np.argmax(distances))
+        index = first + 1 + offset
+        value = min(float(distances[offset]) * radius, parent)
+        importance[index] = value
+        stack.append((first, index, value))
+        stack.append((index, last, value))
+
+    return importance
+
+
+def select_points(importance: np.ndarray,
+                  max_points: Optional[int] = None,
+                  tolerance: Optional[float] = None) -> np.ndarray:
+    """
+    Índices (em ordem) dos pontos de um nível de detalhe
+    :param importance: Resultado de douglas_peucker_importance
+    :param max_points: Quantidade máxima de pontos (mínimo 2)
+    :param tolerance: Desvio máximo tolerado, em km
+    :return: array de índices
+    """
+    selected = np.arange(len(importance))
+    if tolerance is not None:
+        selected = selected[importance > tolerance]
+
+    if max_points is not None and len(selected) > max_points:
+        max_points = max(2, max_points)
+        ranked = np.argsort(-importance[selected], kind='stable')
+        selected = np.sort(selected[ranked[:max_points]])
+
+    return selected
+
+
+def tolerance_from_view(view_range, horizontal_pixels,
+                        fov_degrees=DEFAULT_FOV_DEGREES) -> float:
+    """
+    Tolerância (km) equivalente a um pixel da vista de um NetworkLink
+    (parâmetros [lookatRange] e [horizPixels] do viewFormat), arredondada
+    por quantize_tolerance
+    :param view_range: Distância da câmera ao ponto observado, em metros
+    :param horizontal_pixels: Largura da vista, em pixels
+    :return: Tolerância em km
+    """
+    width = 2 * view_range * math.tan(math.radians(fov_degrees) / 2)
+    return quantize_tolerance(width / 1000 / max(1, horizontal_pixels))
+
+
+def quantize_tolerance(tolerance) -> float:
+    """
+    Arredonda a tolerância para a potência de 2 mais próxima, de forma que
+    vistas parecidas compartilhem o mesmo nível de detalhe (e cache)
+    """
+    if tolerance <= 0:
+        return 0.0
+    return 2.0 ** round(math.log2(tolerance))
+
+
+simplification_cache = VersionCache()
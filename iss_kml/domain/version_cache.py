@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class VersionCache:
+    """
+    Estruturas derivadas de um track (simplificação, índice espacial, ...)
+    por versão, em LRU. A versão deve mudar sempre que o track mudar (ex.:
+    ID, quantidade de posições e timestamps inicial e final).
+
+    A estrutura é construída fora do lock: chamadas simultâneas pela mesma
+    versão aguardam a primeira (como no RenderCache), sem bloquear as de
+    outras versões.
+    """
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get(self, version: Hashable, build: Callable[[], Any]):
+        value, flight, is_leader = self._lookup_or_join(version)
+        if flight is None:
+            return value
+        if is_leader:
+            return self._lead(flight, version, build)
+
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _lookup_or_join(self, version):
+        with self._lock:
+            if version in self._entries:
+                self._entries.move_to_end(version)
+                return self._entries[version], None, False
+
+            flight = self._flights.get(version)
+            if flight is not None:
+                return None, flight, False
+            flight = self._flights[version] = _Flight()
+            return None, flight, True
+
+    def _lead(self, flight, version, build):
+        try:
+            flight.value = build()
+            self._store(version, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[version]
+            flight.done.set()
+
+    def _store(self, version, value):
+        with self._lock:
+            self._entries[version] = value
+            self._entries.move_to_end(version)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,221 @@
+import math
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+from iss_kml.domain.version_cache import VersionCache
+
+
+@dataclass(frozen=True)
+class BBox:
+    """
+    Região visível, em graus (BBOX=west,south,east,north do viewFormat de
+    um NetworkLink). Com west > east, a região cruza o antimeridiano.
+    """
+    west: float
+    south: float
+    east: float
+    north: float
+
+    @classmethod
+    def parse(cls, text: str) -> 'BBox':
+        """
+        :param text: "west,south,east,north", longitudes em [-180, 180] e
+            latitudes em [-90, 90]
+        :raises ValueError: se o texto não for uma bbox válida
+        """
+        try:
+            values = [float(value) for value in text.split(',')]
+        except (AttributeError, ValueError):
+            values = []
+        if len(values) != 4 or not cls._in_range(*values):
+            raise ValueError(f'invalid bbox: {text!r}')
+        return cls(*values)
+
+    @staticmethod
+    def _in_range(west, south, east, north) -> bool:
+        # comparações com NaN são falsas: NaN também é inválido
+        return -180 <= west <= 180 and -180 <= east <= 180 and \
+            -90 <= south <= north <= 90
+
+    @property
+    def unwrapped_east(self):
+        """
+        Limite leste contínuo com o oeste (somando 360 quando a região
+        cruza o antimeridiano)
+        """
+        return self.east + 360 if self.west > self.east else self.east
+
+
+def unwrap_longitudes(longitudes) -> np.ndarray:
+    """
+    Longitudes contínuas ao longo do track: a cada passagem pelo
+    antimeridiano, as seguintes são deslocadas de 360°
+    """
+    longitudes = np.asarray(longitudes, dtype=float)
+    if len(longitudes) < 2:
+        return longitudes.copy()
+    jumps = np.round(np.diff(longitudes) / 360) * 360
+    return longitudes - np.concatenate([[0.0], np.cumsum(jumps)])
+
+
+def normalize_longitudes(longitudes) -> np.ndarray:
+    longitudes = np.asarray(longitudes, dtype=float)
+    outside = (longitudes < -180) | (longitudes >= 180)
+    shifted = (longitudes + 180) % 360 - 180
+    return np.where(outside, shifted, longitudes)
+
+
+class SegmentIndex:
+    """
+    Índice espacial dos segmentos de um track (pares de posições
+    consecutivas): uma grade de células de cell_size graus, sobre as
+    longitudes contínuas (unwrap_longitudes), com os segmentos que cruzam
+    cada célula. O recorte por uma bbox só examina os segmentos das células
+    que ela cobre.
+    """
+    CELL_SIZE = 10.0
+
+    def __init__(self, longitudes, latitudes, altitudes, cell_size=None):
+        self.cell_size = cell_size or self.CELL_SIZE
+        self.raw_longitudes = np.asarray(longitudes, dtype=float)
+        self.longitudes = unwrap_longitudes(longitudes)
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.altitudes = np.asarray(altitudes, dtype=float)
+        self._cells = self._build_cells()
+        self._extent = self._cell_extent()
+
+    def __len__(self):
+        return max(0, len(self.longitudes) - 1)
+
+    def _cell_ranges(self):
+        x, y = self.longitudes, self.latitudes
+        bounds = [np.minimum(x[:-1], x[1:]), np.maximum(x[:-1], x[1:]),
+                  np.minimum(y[:-1], y[1:]), np.maximum(y[:-1], y[1:])]
+        return [np.floor(bound / self.cell_size).astype(int).tolist()
+                for bound in bounds]
+
+    def _build_cells(self):
+        cells = defaultdict(list)
+        for segment, (x0, x1, y0, y1) in enumerate(zip(*self._cell_ranges())):
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    cells[(cx, cy)].append(segment)
+        return {cell: np.array(segments) for cell, segments in cells.items()}
+
+    def _cell_extent(self):
+        """
+        Primeira e última célula ocupadas, em longitude e em latitude
+        """
+        if not self._cells:
+            return (0, -1), (0, -1)
+        columns, rows = zip(*self._cells)
+        return (min(columns), max(columns)), (min(rows), max(rows))
+
+    def candidates(self, west, south, east, north) -> np.ndarray:
+        """
+        Segmentos (ordenados) das células que cobrem a região, em longitudes
+        contínuas (west <= east)
+        """
+        columns, rows = self._extent
+        found = [self._cells.get((cx, cy))
+                 for cx in self._cell_span(west, east, columns)
+                 for cy in self._cell_span(south, north, rows)]
+        found = [segments for segments in found if segments is not None]
+        if not found:
+            return np.array([], dtype=int)
+        return np.unique(np.concatenate(found))
+
+    def _cell_span(self, low, high, extent):
+        """
+        Células entre low e high, limitadas às ocupadas (extent): o custo
+        não cresce com o tamanho da região
+        """
+        first, last = extent
+        return range(max(first, math.floor(low / self.cell_size)),
+                     min(last, math.floor(high / self.cell_size)) + 1)
+
+    def _shifts(self, west, east):
+        low, high = self.longitudes.min(), self.longitudes.max()
+        return range(math.ceil((low - east) / 360),
+                     math.floor((high - west) / 360) + 1)
+
+    def clip(self, bbox: BBox) -> List[np.ndarray]:
+        """
+        Trechos do track dentro da bbox, recortados nas bordas
+        :return: Lista de arrays (n, 3) com longitude, latitude e altitude,
+            na ordem do track; as posições originais mantêm os valores
+            exatos e as longitudes ficam em [-180, 180)
+        """
+        if len(self) == 0:
+            return []
+
+        east = bbox.unwrapped_east
+        pieces = []
+        for shift in self._shifts(bbox.west, east):
+            offset = shift * 360
+            pieces.extend(self._clip_region(bbox.west + offset, bbox.south,
+                                            east + offset, bbox.north))
+        pieces.sort(key=lambda piece: piece[0])
+        return [points for _, points in pieces]
+
+    def _clip_region(self, west, south, east, north):
+        segments = self.candidates(west, south, east, north)
+        t0, t1, inside = _liang_barsky(
+            self.longitudes[segments], self.latitudes[segments],
+            self.longitudes[segments + 1], self.latitudes[segments + 1],
+            (west, south, east, north))
+        segments, t0, t1 = segments[inside], t0[inside], t1[inside]
+        if len(segments) == 0:
+            return []
+
+        starts = self._interpolate(segments, t0)
+        ends = self._interpolate(segments, t1)
+        joined = (segments[1:] == segments[:-1] + 1) & (t1[:-1] == 1) & \
+            (t0[1:] == 0)
+        breaks = np.flatnonzero(~joined) + 1
+        return [(int(segments[first]),
+                 np.vstack([starts[first:first + 1], ends[first:last]]))
+                for first, last in zip([0, *breaks.tolist()],
+                                       [*breaks.tolist(), len(segments)])]
+
+    def _interpolate(self, segments, t):
+        """
+        Pontos em t (0 a 1) de cada segmento; em t=0 e t=1 retorna as
+        posições originais, sem erro de arredondamento
+        """
+        columns = []
+        for values, exact in ((self.longitudes, self.raw_longitudes),
+                              (self.latitudes, self.latitudes),
+                              (self.altitudes, self.altitudes)):
+            start, end = values[segments], values[segments + 1]
+            point = start + t * (end - start)
+            if values is self.longitudes:
+                point = normalize_longitudes(point)
+            point = np.where(t == 0, exact[segments], point)
+            columns.append(np.where(t == 1, exact[segments + 1], point))
+        return np.stack(columns, axis=-1)
+
+
+def _liang_barsky(x0, y0, x1, y1, region):
+    """
+    Recorte de segmentos por um retângulo (Liang-Barsky), vetorizado
+    :return: Tupla (t0, t1, segmentos com algum trecho dentro)
+    """
+    west, south, east, north = region
+    dx, dy = x1 - x0, y1 - y0
+    t0, t1 = np.zeros(len(x0)), np.ones(len(x0))
+    inside = np.ones(len(x0), dtype=bool)
+    for p, q in ((-dx, x0 - west), (dx, east - x0),
+                 (-dy, y0 - south), (dy, north - y0)):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = q / p
+        t0 = np.where(p < 0, np.maximum(t0, ratio), t0)
+        t1 = np.where(p > 0, np.minimum(t1, ratio), t1)
+        inside &= ~((p == 0) & (q < 0))
+    return t0, t1, inside & (t0 <= t1)
+
+
+viewport_cache = VersionCache()
@@ -0,0 +1,37 @@
+import math
+import time
+from datetime import datetime, timezone
+from hashlib import blake2b
+
+
+def make_etag(timestamp, *render_params) -> str:
+    """
+    ETag de um KML renderizado: muda quando chega uma nova posição ou quando
+    muda algum parâmetro que afeta a renderização.
+    :param timestamp: Timestamp da última posição do track
+    :param render_params: Parâmetros de renderização (hashable/repr estável)
+    :return: ETag (sem aspas)
+    """
+    digest = blake2b(repr(render_params).encode(), digest_size=8).hexdigest()
+    return f'{timestamp}-{digest}'
+
+
+def get_max_age(last_timestamp, interval, now=None) -> int:
+    """
+    Segundos até a próxima posição esperada, usado em Cache-Control/Expires
+    :param last_timestamp: Timestamp da última posição do track
+    :param interval: Intervalo esperado entre posições, em segundos
+    :param now: Instante atual (default: time.time())
+    :return: max-age, nunca negativo
+    """
+    now = time.time() if now is None else now
+    return max(0, math.ceil(last_timestamp + interval - now))
+
+
+def apply_cache_headers(response, etag, max_age, now=None):
+    now = time.time() if now is None else now
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.expires = datetime.fromtimestamp(now + max_age, tz=timezone.utc)
+    return response
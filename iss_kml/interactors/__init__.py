@@ -1,3 +1,4 @@
 from .iss import IssInteractor
+from .kml_template import KmlTemplate, Segments
 
-__all__ = ['IssInteractor']
+__all__ = ['IssInteractor', 'KmlTemplate', 'Segments']
@@ -1,57 +1,242 @@
 from datetime import datetime, timezone
 from math import acos, pi
-from typing import List
+from typing import Optional, Union
 
 from latloncalc.latlon import LatLon
 from vector import Vector
 
 from iss_kml.adapters.basic_persist_adapter import BasicPersistAdapter
+from iss_kml.domain.geodesy import footprint_rings, format_kml_coordinates
 from iss_kml.domain.iss_track.iss_track import IssTrack
+from iss_kml.domain.viewport import BBox
+from iss_kml.interactors.kml_template import KmlTemplate, Segments
 from iss_kml.services.basic_iss_pos_service import BasicIssPosService, IssPos
+from iss_kml.services.dead_reckoning import extrapolate
+from iss_kml.services.ground_track_prediction import GroundTrackPredictor
 
 
 class IssInteractor:
-    LIMIT_TIMESTAMP = None
+    TRACK_ID = '1'
+    # Posições do track ao vivo e limite de posições lidas por requisição,
+    # mesmo com um max_points maior
+    MAX_TRACK_POINTS = 2000
+    MAX_WINDOW_POINTS = 100_000
+    COLUMNAR_TRACK = True
     PRINT_TIMESTAMP = False
     YT_TIME_OFFSET_SECONDS = -27
+    # Streaming: posições por parte do track e posições recentes carregadas
+    # para o footprint e o yt_iss_live
+    STREAM_BATCH_SIZE = 1000
+    STREAM_CONTEXT_POINTS = 64
 
     def __init__(self,
                  iss_track_adapter: BasicPersistAdapter,
                  iss_pos_service_instance: BasicIssPosService,
-                 kml_template: str
+                 kml_template: Union[str, KmlTemplate],
+                 max_points: Optional[int] = None,
+                 tolerance: Optional[float] = None,
+                 bbox: Optional[BBox] = None,
+                 since: Optional[int] = None,
+                 until: Optional[int] = None,
+                 as_of: Optional[int] = None,
+                 extrapolate_to: Optional[int] = None,
+                 track_predictor: Optional[GroundTrackPredictor] = None
                  ):
+        """
+        :param max_points: Quantidade máxima de pontos do track renderizado
+            (nível de detalhe); o track é simplificado se necessário. Acima
+            de MAX_TRACK_POINTS, lê também mais posições (até
+            MAX_WINDOW_POINTS)
+        :param tolerance: Desvio máximo (km) tolerado na simplificação
+        :param bbox: Região visível; o track é recortado por ela (um
+            LineString por trecho dentro da região)
+        :param since: Timestamp mínimo (inclusive) das posições do track;
+            com ele, o track tem todas as posições do intervalo (ver window)
+        :param until: Timestamp máximo (inclusive): renderiza o track como
+            estava nesse instante, lendo a janela pelo índice de timestamp,
+            sem consultar o serviço nem alterar o track
+        :param as_of: Timestamp da última posição já conhecida (a do ETag):
+            o track é lido só até ela, mesmo que o poller grave outra posição
+            durante a renderização. Ao contrário de until, não torna o KML
+            histórico
+        :param extrapolate_to: Instante para o qual a posição da ISS (não o
+            track) é estimada a partir das duas últimas posições gravadas
+            (dead reckoning); as estimativas não são gravadas no track
+        :param track_predictor: Gera o track previsto a partir da posição
+            renderizada (não usado com since/until)
+        """
         self.iss_track_adapter = iss_track_adapter
         self.iss_pos_service = iss_pos_service_instance
         self.kml_template = kml_template
+        self.max_points = max_points
+        self.tolerance = tolerance
+        self.bbox = bbox
+        self.since = since
+        self.until = until
+        self.as_of = as_of
+        self.extrapolate_to = extrapolate_to
+        self.track_predictor = track_predictor
 
-    @staticmethod
-    def _get_track_until_timestamp(iss_track, timestamp):
-        size = len(iss_track.positions)
-        for i in range(size):
-            current_pos = iss_track.positions[size - 1 - i]
-            if current_pos.timestamp < timestamp:
-                return iss_track.positions[:size - i]
+    @property
+    def window(self) -> int:
+        """
+        Quantidade de posições (as mais recentes) lidas para o track. Num
+        intervalo (since), todas as posições dele, até MAX_WINDOW_POINTS
+        """
+        if self.since is not None:
+            return self.MAX_WINDOW_POINTS
+        return min(max(self.MAX_TRACK_POINTS, self.max_points or 0),
+                   self.MAX_WINDOW_POINTS)
+
+    @property
+    def read_until(self) -> Optional[int]:
+        return self.as_of if self.as_of is not None else self.until
+
+    @property
+    def historical(self):
+        return self.since is not None or self.until is not None
 
     def run(self):
+        if self.historical:
+            return self.render_latest()
+
         try:
             iss_pos = self.iss_pos_service.get_pos()
             iss_track = self._get_current_track()
             self._update_iss_track(iss_track, iss_pos)
-            self._print_timestamp(iss_pos)
-
-            if self.LIMIT_TIMESTAMP is not None:
-                positions = self._get_track_until_timestamp(
-                    iss_track, self.LIMIT_TIMESTAMP)
-                iss_track.positions = positions
-                iss_pos = iss_track.positions[-1]
-
-            coordinates = self._get_footprint_coordinates(iss_pos)
-            track = iss_track.get_track_coordinates_kml(2000)
-            yt_iss_live = self._get_yt_iss_live_coordinates(iss_track)
-            kml = self._make_kml(iss_pos, coordinates, track, yt_iss_live)
-            return kml
+            return self._render(iss_track, iss_pos)
+        except Exception as e:
+            print(f'Error: {e.__class__.__name__}: {e}')
+
+    def render_latest(self):
+        """
+        Gera o KML a partir da última posição armazenada no track, sem
+        consultar o serviço de posição (alimentado por um IssPosPoller).
+        Enquanto o track estiver vazio, recai no fluxo síncrono de run()
+        (exceto num intervalo histórico, que não tem posições: None).
+        """
+        try:
+            iss_track = self._get_current_track()
+            if not iss_track.positions:
+                return None if self.historical else self.run()
+            return self._render(iss_track,
+                                self._current_position(iss_track))
+        except Exception as e:
+            print(f'Error: {e.__class__.__name__}: {e}')
+
+    def stream_latest(self):
+        """
+        Como render_latest(), mas gera o KML em partes (bytes): o início do
+        template e o footprint saem antes de o track ser lido, e as
+        coordenadas do track são lidas do banco e enviadas em lotes de
+        STREAM_BATCH_SIZE posições. O tempo até o primeiro byte e a memória
+        usada não dependem do tamanho do track.
+        """
+        try:
+            values = self._prepare_stream()
         except Exception as e:
             print(f'Error: {e.__class__.__name__}: {e}')
+            return
+
+        if values is None:
+            # track vazio, simplificado ou recortado:
+            # renderização completa
+            kml = self.render_latest()
+            if kml is not None:
+                yield kml if isinstance(kml, bytes) else kml.encode()
+            return
+
+        yield from self._compiled_template().iter_chunks(**values)
+
+    def _compiled_template(self) -> KmlTemplate:
+        if isinstance(self.kml_template, KmlTemplate):
+            return self.kml_template
+        return KmlTemplate(self.kml_template)
+
+    def _prepare_stream(self):
+        if self.simplified:
+            return None
+
+        iss_track = self.iss_track_adapter.get_track(
+            self.TRACK_ID, self.STREAM_CONTEXT_POINTS, self.since,
+            self.read_until, columnar=self.COLUMNAR_TRACK)
+        if not iss_track.positions:
+            return None
+
+        iss_pos = self._current_position(iss_track)
+        self._print_timestamp(iss_pos)
+        return self._make_values(iss_pos,
+                                 self._get_footprint_coordinates(iss_pos),
+                                 self._stream_track(
+                                     iss_track.positions[-1].timestamp),
+                                 self._get_yt_iss_live_coordinates(iss_track),
+                                 self._get_predicted_coordinates(iss_pos))
+
+    def _current_position(self, iss_track) -> IssPos:
+        """
+        Posição renderizada: a última do track ou, com extrapolate_to, a
+        estimada nesse instante a partir das duas últimas
+        """
+        positions = iss_track.positions
+        if self.extrapolate_to is None or self.historical or \
+                len(positions) < 2:
+            return positions[-1]
+        return extrapolate(positions[-2], positions[-1], self.extrapolate_to)
+
+    def _stream_track(self, until):
+        def track_chunks():
+            for batch in self.iss_track_adapter.iter_track(
+                    self.TRACK_ID, self.window, since=self.since,
+                    until=until, batch_size=self.STREAM_BATCH_SIZE):
+                yield batch.coordinates_kml()
+        return track_chunks
+
+    def ingest(self, iss_pos: IssPos):
+        """
+        Grava uma posição no track, sem gerar o KML
+        :param iss_pos: Posição obtida do serviço
+        :return: ID da posição gravada
+        """
+        return self.iss_track_adapter.append_position(self.TRACK_ID, iss_pos)
+
+    def _render(self, iss_track, iss_pos):
+        self._print_timestamp(iss_pos)
+        coordinates = self._get_footprint_coordinates(iss_pos)
+        track = self._get_track_coordinates(iss_track)
+        yt_iss_live = self._get_yt_iss_live_coordinates(iss_track)
+        predicted_track = self._get_predicted_coordinates(iss_pos)
+        kml = self._make_kml(iss_pos, coordinates, track, yt_iss_live,
+                             predicted_track)
+        return kml
+
+    @property
+    def simplified(self):
+        """
+        Se o track precisa ser simplificado ou recortado (e lido inteiro em
+        memória); um max_points que cobre a janela toda não descarta pontos
+        """
+        return (self.max_points is not None and
+                self.max_points < self.window) or \
+            self.tolerance is not None or self.bbox is not None
+
+    def _get_track_coordinates(self, iss_track):
+        if not self.simplified:
+            return iss_track.get_track_coordinates_kml(self.window)
+        if self.bbox is not None:
+            return Segments(iss_track.get_clipped_coordinates_kml(
+                self.bbox, self.window, self.max_points, self.tolerance))
+        return iss_track.get_simplified_coordinates_kml(
+            self.window, self.max_points, self.tolerance)
+
+    def _get_predicted_coordinates(self, iss_pos) -> str:
+        if self.track_predictor is None or self.historical:
+            return ''
+        try:
+            return self.track_predictor.coordinates_kml(iss_pos.timestamp)
+        except Exception as e:
+            # sem TLE, o KML sai sem o track previsto
+            print(f'Error predicting track: {e.__class__.__name__}: {e}')
+            return ''
 
     def _print_timestamp(self, iss_pos):
         if self.PRINT_TIMESTAMP:
@@ -62,40 +247,47 @@ class IssInteractor:
                   iss_pos: IssPos,
                   coordinates: str,
                   track: str,
-                  yt_iss_live: str):
-        return self.kml_template.format(latitude=iss_pos.latitude,
-                                        longitude=iss_pos.longitude,
-                                        altitude=iss_pos.altitude,
-                                        footprint=coordinates,
-                                        track=track,
-                                        yt_iss_live=yt_iss_live)
+                  yt_iss_live: str,
+                  predicted_track: str = ''):
+        values = self._make_values(iss_pos, coordinates, track, yt_iss_live,
+                                   predicted_track)
+        if isinstance(self.kml_template, KmlTemplate):
+            # bytes, renderizados direto num buffer
+            return self.kml_template.render(**values)
+        if isinstance(track, Segments):
+            # um LineString por trecho: só o template compilado repete
+            return self._compiled_template().format(**values)
+        return self.kml_template.format(**values)
 
     @staticmethod
-    def _get_footprint_coordinates(iss_pos: IssPos, num_points=128):
-        step = 360 / num_points
-        coordinates = ''
-        center = LatLon(iss_pos.latitude, iss_pos.longitude)
-        radius = iss_pos.footprint / 2
-        for i in range(num_points + 1):
-            angle = step * i
-            p = center.offset(angle, radius, ellipse='sphere')
-            coordinates += f'{p.lon},{p.lat},0 '
-
-        return coordinates
+    def _make_values(iss_pos: IssPos, coordinates, track, yt_iss_live,
+                     predicted_track=''):
+        return dict(latitude=iss_pos.latitude,
+                    longitude=iss_pos.longitude,
+                    altitude=iss_pos.altitude,
+                    footprint=coordinates,
+                    track=track,
+                    yt_iss_live=yt_iss_live,
+                    predicted_track=predicted_track)
 
     @staticmethod
-    def _update_iss_track(iss_track, iss_pos):
+    def _get_footprint_coordinates(iss_pos: IssPos, num_points=128):
+        latitudes, longitudes = footprint_rings(iss_pos.latitude,
+                                                iss_pos.longitude,
+                                                iss_pos.footprint / 2,
+                                                num_points)
+        return format_kml_coordinates(longitudes[0], latitudes[0])
+
+    def _update_iss_track(self, iss_track, iss_pos):
         iss_track.positions.append(iss_pos)
-        iss_track.save()
+        self.iss_track_adapter.append_position(iss_track.entity_id, iss_pos)
 
     def _get_current_track(self) -> IssTrack:
-        iss_track = self.iss_track_adapter.get_by_id('1')
-        if iss_track is None:
-            iss_track = IssTrack(entity_id='1', positions=[])
-            iss_track.set_adapter(self.iss_track_adapter)
-            iss_track.save()
-
-        return iss_track
+        return self.iss_track_adapter.get_track(self.TRACK_ID,
+                                                self.window,
+                                                self.since,
+                                                self.read_until,
+                                                columnar=self.COLUMNAR_TRACK)
 
     @staticmethod
     def _get_yt_iss_live_coordinates(iss_track: IssTrack):
@@ -115,8 +307,12 @@ class IssInteractor:
 
         last_timestamp = iss_track.positions[-1].timestamp
         delayed_last = last_timestamp + IssInteractor.YT_TIME_OFFSET_SECONDS
-        iss_pos = IssInteractor._get_track_until_timestamp(iss_track,
-                                                           delayed_last)[-2:]
+        iss_pos = iss_track.positions_until(delayed_last, 2)
+        if len(iss_pos) < 2:
+            # track mais curto que o atraso do vídeo: as duas últimas
+            iss_pos = iss_track.positions[-2:]
+        if len(iss_pos) < 2:
+            return ''
         width = 250
         height = 140
         p1 = LatLon(iss_pos[0].latitude, iss_pos[0].longitude)
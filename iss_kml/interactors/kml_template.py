@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+from io import BytesIO
+from string import Formatter
+from typing import Iterator, List, Union
+
+_CONVERSIONS = {None: lambda value: value, 's': str, 'r': repr, 'a': ascii}
+
+
+@dataclass(frozen=True)
+class Slot:
+    """
+    Campo do template ({nome}, com conversão e format spec opcionais)
+    """
+    name: str
+    conversion: str = None
+    format_spec: str = ''
+
+    def encode(self, value, encoding) -> bytes:
+        if isinstance(value, bytes) and not (self.conversion or
+                                             self.format_spec):
+            return value
+        value = _CONVERSIONS[self.conversion](value)
+        return format(value, self.format_spec).encode(encoding)
+
+
+class Segments(tuple):
+    """
+    Valor de um campo com vários trechos (ex.: track recortado por uma
+    bbox): cada trecho é renderizado num element próprio, repetindo o
+    element que envolve o campo no template (um <LineString> dentro de um
+    <MultiGeometry>, por exemplo).
+    """
+    element = 'LineString'
+
+
+class KmlTemplate:
+    """
+    Template de KML compilado uma única vez em segmentos: trechos estáticos,
+    já codificados em bytes, e slots para os campos. A renderização só
+    codifica os valores (uma vez por campo, mesmo que ele apareça mais de
+    uma vez, como {track}) e escreve tudo num único buffer.
+
+    render(**valores) produz os mesmos bytes que
+    template.format(**valores).encode(encoding).
+
+    Um valor pode ser também uma função que retorna um iterável de partes
+    (str ou bytes): iter_chunks chama a função a cada ocorrência do campo e
+    repassa as partes conforme são geradas, permitindo enviar o KML em
+    streaming sem montar o valor inteiro em memória.
+
+    Um valor Segments é renderizado repetindo, para cada trecho, o element
+    que envolve o campo (ver separator).
+    """
+    def __init__(self, template: str, encoding='utf-8'):
+        self.template = template
+        self.encoding = encoding
+        self.segments: List[Union[bytes, Slot]] = self._compile(template)
+        self.fields = frozenset(segment.name for segment in self.segments
+                                if isinstance(segment, Slot))
+        self._separators = {}
+
+    def _compile(self, template):
+        segments = []
+        for literal, name, format_spec, conversion in \
+                Formatter().parse(template):
+            if literal:
+                self._add_literal(segments, literal.encode(self.encoding))
+            if name is not None:
+                segments.append(self._make_slot(name, conversion,
+                                                format_spec))
+        return segments
+
+    @staticmethod
+    def _add_literal(segments, literal):
+        if segments and isinstance(segments[-1], bytes):
+            segments[-1] += literal
+        else:
+            segments.append(literal)
+
+    @staticmethod
+    def _make_slot(name, conversion, format_spec):
+        if not name.isidentifier() or '{' in format_spec:
+            raise ValueError(f'unsupported template field: {name!r}')
+        return Slot(name, conversion, format_spec)
+
+    def iter_chunks(self, **values) -> Iterator[bytes]:
+        """
+        Segmentos renderizados, em ordem
+        """
+        encoded = {}
+        for index, segment in enumerate(self.segments):
+            if isinstance(segment, bytes):
+                yield segment
+            else:
+                yield from self._iter_slot(index, segment,
+                                           values[segment.name], encoded)
+
+    def _iter_slot(self, index, segment, value, encoded):
+        if callable(value):
+            yield from self._iter_parts(segment, value())
+            return
+
+        if isinstance(value, Segments):
+            yield from self._iter_segments(index, segment, value)
+            return
+
+        chunk = encoded.get(segment)
+        if chunk is None:
+            chunk = segment.encode(value, self.encoding)
+            encoded[segment] = chunk
+        yield chunk
+
+    def _iter_parts(self, segment, parts):
+        for part in parts:
+            yield segment.encode(part, self.encoding)
+
+    def _iter_segments(self, index, segment, parts):
+        separator = self.separator(index, parts.element)
+        for number, part in enumerate(parts):
+            if number:
+                yield separator
+            yield segment.encode(part, self.encoding)
+
+    def separator(self, index, element) -> bytes:
+        """
+        Trecho entre dois valores de um campo Segments na posição index dos
+        segmentos: fecha o element que envolve o campo e abre um novo, com
+        a mesma indentação e os mesmos elements filhos (ex.: de
+        "</coordinates></LineString>" até "<LineString>...<coordinates>").
+        """
+        separator = self._separators.get((index, element))
+        if separator is None:
+            separator = self._make_separator(index, element)
+            self._separators[(index, element)] = separator
+        return separator
+
+    def _make_separator(self, index, element):
+        before, after = self.segments[index - 1:index + 2:2] \
+            if 0 < index < len(self.segments) - 1 else (None, None)
+        opening = f'<{element}>'.encode(self.encoding)
+        closing = f'</{element}>'.encode(self.encoding)
+        if not (isinstance(before, bytes) and isinstance(after, bytes)) \
+                or opening not in before or closing not in after:
+            raise ValueError(f'field is not inside a <{element}> element')
+
+        start = before.rfind(b'\n', 0, before.rfind(opening)) + 1
+        end = after.index(closing) + len(closing)
+        return after[:end] + b'\n' + before[start:]
+
+    def render_into(self, buffer, **values):
+        """
+        Escreve o KML renderizado em buffer (BytesIO, arquivo binário, ...)
+        """
+        for chunk in self.iter_chunks(**values):
+            buffer.write(chunk)
+        return buffer
+
+    def render(self, **values) -> bytes:
+        return self.render_into(BytesIO(), **values).getvalue()
+
+    def format(self, **values) -> str:
+        """
+        Compatível com str.format do template original
+        """
+        return self.render(**values).decode(self.encoding)
@@ -1,3 +1,12 @@
 from .wheretheiss import WhereTheIssAt
+from .iss_pos_poller import IssPosPoller
+from .single_flight import SingleFlightIssPosService
+from .tle_propagation import TlePropagationService
+from .ground_track_prediction import GroundTrackPredictor
+from .last_known import LastKnownIssPosService
+from .hedged import HedgedIssPosService, LatencyHistogram
 
-__all__ = ['WhereTheIssAt']
+__all__ = ['WhereTheIssAt', 'IssPosPoller', 'SingleFlightIssPosService',
+           'TlePropagationService', 'GroundTrackPredictor',
+           'LastKnownIssPosService', 'HedgedIssPosService',
+           'LatencyHistogram']
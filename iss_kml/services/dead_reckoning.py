@@ -0,0 +1,51 @@
+import math
+
+from iss_kml.domain.geodesy import (SPHERE_RADIUS_KM, destination_points,
+                                    final_bearings)
+from iss_kml.services.basic_iss_pos_service import IssPos
+
+
+# Velocidade angular da rotação da Terra (dia sideral), em rad/h
+EARTH_ROTATION_RAD_PER_HOUR = 2 * math.pi / (86164.0905 / 3600)
+
+
+def extrapolate(previous: IssPos, last: IssPos, timestamp: float) -> IssPos:
+    """
+    Posição estimada em timestamp, seguindo em frente a partir de last: o
+    rumo é o do grande círculo entre previous e last e a distância vem de
+    speed (ver ground_speed)
+    """
+    elapsed = timestamp - last.timestamp
+    if previous is None or elapsed <= 0 or \
+            (previous.latitude, previous.longitude) == (last.latitude,
+                                                        last.longitude):
+        return last
+
+    bearing = final_bearings(previous.latitude, previous.longitude,
+                             last.latitude, last.longitude)
+    distance = ground_speed(last, float(bearing)) * elapsed / 3600
+    latitude, longitude = destination_points(last.latitude, last.longitude,
+                                             bearing, distance)
+    return IssPos(latitude=float(latitude),
+                  longitude=float(longitude),
+                  altitude=last.altitude,
+                  speed=last.speed,
+                  footprint=last.footprint,
+                  timestamp=int(timestamp))
+
+
+def ground_speed(iss_pos: IssPos, bearing: float) -> float:
+    """
+    Velocidade (km/h) do ponto abaixo da ISS sobre a superfície em rotação,
+    no rumo dado. speed é a velocidade orbital (inercial, na altitude da
+    órbita): projetada no solo, ela é a soma da velocidade procurada com a
+    da rotação da Terra (para leste) naquela latitude.
+    """
+    orbit_radius = SPHERE_RADIUS_KM + iss_pos.altitude / 1000
+    inertial = iss_pos.speed * SPHERE_RADIUS_KM / orbit_radius
+    rotation = EARTH_ROTATION_RAD_PER_HOUR * SPHERE_RADIUS_KM * \
+        math.cos(math.radians(iss_pos.latitude))
+    east = math.sin(math.radians(bearing))
+    # |v * (rumo) + rotation * (leste)| == inertial
+    discriminant = (rotation * east) ** 2 - rotation ** 2 + inertial ** 2
+    return max(0.0, math.sqrt(max(0.0, discriminant)) - rotation * east)
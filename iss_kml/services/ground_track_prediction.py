@@ -0,0 +1,81 @@
+import math
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import List
+
+import numpy as np
+
+from iss_kml.domain.orbit import MICROSECONDS, KeplerPropagator, Tle
+from iss_kml.domain.version_cache import VersionCache
+from iss_kml.services.tle_propagation import TlePropagationService
+
+
+@dataclass(frozen=True)
+class PredictedTrack:
+    """
+    Coordenadas do track previsto (no formato do KML, "lon,lat,0 ") a
+    partir de start, a cada step segundos, num único texto: offsets[i] é a
+    posição do i-ésimo ponto no texto
+    """
+    start: int
+    step: int
+    text: str
+    offsets: List[int]
+
+    def coordinates_kml(self, timestamp, points) -> str:
+        """
+        Coordenadas dos points pontos seguintes a timestamp (só um slice do
+        texto já formatado)
+        """
+        first = max(0, math.ceil((timestamp - self.start) / self.step))
+        last = min(first + points, len(self.offsets) - 1)
+        first = min(first, last)
+        return self.text[self.offsets[first]:self.offsets[last]]
+
+
+class GroundTrackPredictor:
+    """
+    Track previsto para as próximas orbits voltas, a partir do TLE de um
+    TlePropagationService. As posições são propagadas num único lote por
+    época (intervalos de epoch_seconds) e TLE, cobrindo a época inteira;
+    cada requisição só recorta o trecho a partir do seu timestamp.
+    """
+    def __init__(self,
+                 tle_service: TlePropagationService,
+                 orbits: float = 2.0,
+                 step_seconds: int = 30,
+                 epoch_seconds: int = 600):
+        self.tle_service = tle_service
+        self.orbits = orbits
+        self.step_seconds = step_seconds
+        self.epoch_seconds = epoch_seconds
+        self._cache = VersionCache(max_entries=4)
+
+    def points(self, tle: Tle) -> int:
+        period = 86400 / tle.mean_motion
+        return math.ceil(self.orbits * period / self.step_seconds) + 1
+
+    def coordinates_kml(self, timestamp: int) -> str:
+        """
+        :param timestamp: Início da previsão (s)
+        :return: Coordenadas do track previsto no formato do KML
+        """
+        tle = self.tle_service.tle
+        epoch = timestamp - timestamp % self.epoch_seconds
+        points = self.points(tle)
+        predicted = self._cache.get((tle, epoch),
+                                    lambda: self._predict(tle, epoch, points))
+        return predicted.coordinates_kml(timestamp, points)
+
+    def _predict(self, tle, epoch, points) -> PredictedTrack:
+        count = points + math.ceil(self.epoch_seconds / self.step_seconds)
+        timestamps = epoch + np.arange(count, dtype=np.int64) * \
+            self.step_seconds
+        positions = KeplerPropagator(tle).propagate(timestamps * MICROSECONDS)
+        fragments = [f'{lon},{lat},0 '
+                     for lon, lat in zip(positions.longitude.tolist(),
+                                         positions.latitude.tolist())]
+        return PredictedTrack(start=epoch,
+                              step=self.step_seconds,
+                              text=''.join(fragments),
+                              offsets=[0, *accumulate(map(len, fragments))])
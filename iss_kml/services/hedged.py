@@ -0,0 +1,261 @@
+import math
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from iss_kml.services.basic_iss_pos_service import BasicIssPosService, IssPos
+
+
+class InvalidPositionError(ValueError):
+    pass
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências (s) em buckets logarítmicos, com
+    BUCKETS_PER_DECADE buckets por década entre MIN_SECONDS e MAX_SECONDS.
+    Ao chegar a DECAY_SAMPLES amostras, as contagens são divididas por 2,
+    para que os percentis acompanhem a latência recente.
+    """
+    BUCKETS_PER_DECADE = 10
+    MIN_SECONDS = 0.001
+    MAX_SECONDS = 100.0
+    DECAY_SAMPLES = 1000
+
+    def __init__(self):
+        decades = math.log10(self.MAX_SECONDS / self.MIN_SECONDS)
+        self._bounds = [self.MIN_SECONDS * 10 ** (index /
+                                                  self.BUCKETS_PER_DECADE)
+                        for index in range(round(decades *
+                                                 self.BUCKETS_PER_DECADE) + 1)]
+        self._counts = [0] * len(self._bounds)
+        self.count = 0
+
+    def record(self, seconds: float):
+        index = min(bisect_left(self._bounds, seconds), len(self._bounds) - 1)
+        self._counts[index] += 1
+        self.count += 1
+        if self.count >= self.DECAY_SAMPLES:
+            self._counts = [count // 2 for count in self._counts]
+            self.count = sum(self._counts)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """
+        :param fraction: Percentil, de 0 a 1
+        :return: Limite superior do bucket do percentil (None sem amostras)
+        """
+        if self.count == 0:
+            return None
+        rank = max(1, math.ceil(fraction * self.count))
+        cumulative = 0
+        for bound, count in zip(self._bounds, self._counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return self._bounds[-1]
+
+
+@dataclass
+class ProviderStats:
+    calls: int = 0
+    errors: int = 0
+    consecutive_errors: int = 0
+    wins: int = 0
+    p50: Optional[float] = None
+    hedge_delay: Optional[float] = None
+
+
+class _Provider:
+    def __init__(self, service: BasicIssPosService, priority: int):
+        self.service = service
+        self.priority = priority
+        self.name = service.__class__.__name__
+        self.histogram = LatencyHistogram()
+        self.stats = ProviderStats()
+        self.lock = threading.Lock()
+        self.last_started = -math.inf
+
+    def start(self):
+        with self.lock:
+            self.last_started = time.monotonic()
+
+    def claim_probe(self, interval) -> bool:
+        """
+        Marca o início de uma sonda, se a última chamada foi há mais de
+        interval segundos (uma única thread consegue)
+        """
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_started < interval:
+                return False
+            self.last_started = now
+            return True
+
+    def record(self, seconds):
+        with self.lock:
+            self.histogram.record(seconds)
+            self.stats.calls += 1
+            self.stats.consecutive_errors = 0
+
+    def record_error(self):
+        with self.lock:
+            self.stats.calls += 1
+            self.stats.errors += 1
+            self.stats.consecutive_errors += 1
+
+    def record_win(self):
+        with self.lock:
+            self.stats.wins += 1
+
+
+class HedgedIssPosService(BasicIssPosService):
+    """
+    Composição de serviços de posição, em ordem de preferência (ex.:
+    WhereTheIssAt e TlePropagationService). A consulta começa pelo primeiro;
+    se ele falhar, ou não responder dentro do percentil hedge_percentile das
+    suas latências recentes (um LatencyHistogram por serviço), o seguinte é
+    consultado em paralelo, e assim por diante, até timeout segundos.
+    Retorna a primeira posição válida de qualquer um deles; as chamadas
+    perdedoras terminam em segundo plano e continuam alimentando os
+    histogramas.
+
+    Um serviço com FAILURE_THRESHOLD falhas seguidas vai para o fim da fila.
+    Como os anteriores costumam responder antes do hedge delay, ele é
+    sondado em segundo plano, sem atrasar a consulta, no máximo a cada
+    probe_interval segundos; quando volta a responder, retoma o seu lugar
+    na fila. Com max_age, posições mais antigas que max_age
+    segundos são descartadas.
+    """
+    FAILURE_THRESHOLD = 3
+    MIN_SAMPLES = 5
+    WORKERS_PER_PROVIDER = 2
+
+    def __init__(self,
+                 providers: List[BasicIssPosService],
+                 hedge_percentile: float = 0.9,
+                 default_hedge_delay: float = 0.5,
+                 min_hedge_delay: float = 0.01,
+                 timeout: float = 5.0,
+                 max_age: Optional[float] = None,
+                 probe_interval: float = 30.0,
+                 clock: Callable[[], float] = time.time):
+        super().__init__()
+        if not providers:
+            raise ValueError('no position providers')
+        self._providers = [_Provider(service, priority)
+                           for priority, service in enumerate(providers)]
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.timeout = timeout
+        self.max_age = max_age
+        self.probe_interval = probe_interval
+        self._clock = clock
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.WORKERS_PER_PROVIDER * len(providers),
+            thread_name_prefix='hedged-iss-pos')
+
+    def get_pos(self) -> IssPos:
+        deadline = time.monotonic() + self.timeout
+        pending, errors = set(), []
+        self._probe_demoted()
+        for provider in self._route():
+            pending.add(self._executor.submit(self._call, provider))
+            hedge_at = time.monotonic() + self.hedge_delay(provider)
+            winner, pending = self._first_valid(pending, errors,
+                                                min(deadline, hedge_at))
+            if winner is not None:
+                return self._won(winner)
+
+        winner, pending = self._first_valid(pending, errors, deadline)
+        if winner is not None:
+            return self._won(winner)
+        if pending or not errors:
+            raise TimeoutError(f'no position in {self.timeout}s')
+        raise errors[-1]
+
+    def hedge_delay(self, provider: _Provider) -> float:
+        """
+        Tempo de espera pela resposta de um serviço antes de consultar o
+        seguinte
+        """
+        with provider.lock:
+            delay = provider.histogram.percentile(self.hedge_percentile) \
+                if provider.histogram.count >= self.MIN_SAMPLES else None
+        if delay is None:
+            delay = self.default_hedge_delay
+        return min(max(delay, self.min_hedge_delay), self.timeout)
+
+    def stats(self) -> Dict[str, ProviderStats]:
+        stats = {}
+        for provider in self._providers:
+            with provider.lock:
+                snapshot = ProviderStats(**vars(provider.stats))
+                snapshot.p50 = provider.histogram.percentile(0.5)
+            snapshot.hedge_delay = self.hedge_delay(provider)
+            stats[provider.name] = snapshot
+        return stats
+
+    def _is_demoted(self, provider: _Provider) -> bool:
+        return provider.stats.consecutive_errors >= self.FAILURE_THRESHOLD
+
+    def _route(self) -> List[_Provider]:
+        return sorted(self._providers,
+                      key=lambda provider: (self._is_demoted(provider),
+                                            provider.priority))
+
+    def _probe_demoted(self):
+        for provider in self._providers:
+            if self._is_demoted(provider) and \
+                    provider.claim_probe(self.probe_interval):
+                self._executor.submit(self._call, provider)
+
+    def _call(self, provider: _Provider):
+        provider.start()
+        start = time.monotonic()
+        try:
+            iss_pos = provider.service.get_pos()
+            self._validate(iss_pos)
+        except Exception:
+            provider.record_error()
+            raise
+        provider.record(time.monotonic() - start)
+        return provider, iss_pos
+
+    def _validate(self, iss_pos: IssPos):
+        # comparações com NaN são falsas: NaN também é inválido
+        if not (-90 <= iss_pos.latitude <= 90 and
+                -180 <= iss_pos.longitude <= 180):
+            raise InvalidPositionError(
+                f'invalid position: {iss_pos.latitude}, {iss_pos.longitude}')
+        if self.max_age is not None and \
+                self._clock() - iss_pos.timestamp > self.max_age:
+            raise InvalidPositionError(
+                f'stale position: {iss_pos.timestamp}')
+
+    @staticmethod
+    def _first_valid(pending, errors, until):
+        """
+        Aguarda, até until, a primeira chamada bem sucedida
+        :return: Tupla ((serviço, posição) ou None, chamadas pendentes)
+        """
+        while pending:
+            timeout = max(0.0, until - time.monotonic())
+            done, pending = wait(pending, timeout=timeout,
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    return future.result(), pending
+                errors.append(future.exception())
+        return None, pending
+
+    @staticmethod
+    def _won(winner) -> IssPos:
+        provider, iss_pos = winner
+        provider.record_win()
+        return iss_pos
@@ -0,0 +1,116 @@
+import fcntl
+import logging
+import threading
+import time
+from typing import Callable, List, Optional
+
+from iss_kml.services.basic_iss_pos_service import BasicIssPosService, IssPos
+
+
+class IssPosPoller:
+    """
+    Consulta a posição da ISS em uma cadência fixa, numa thread própria,
+    e repassa cada leitura para os listeners registrados (ex.: gravar no
+    track). Com lock_path, apenas um processo por host faz as consultas.
+    """
+    def __init__(self,
+                 iss_pos_service: BasicIssPosService,
+                 interval: float,
+                 lock_path: Optional[str] = None,
+                 logger=None):
+        self.iss_pos_service = iss_pos_service
+        self.interval = interval
+        self.lock_path = lock_path
+        self._logger = logger if logger else logging.getLogger()
+        self._listeners: List[Callable[[IssPos], None]] = []
+        self._latest: Optional[IssPos] = None
+        self._last_poll_time: Optional[float] = None
+        self._lock_file = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def latest(self) -> Optional[IssPos]:
+        return self._latest
+
+    @property
+    def last_poll_time(self) -> Optional[float]:
+        return self._last_poll_time
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_listener(self, listener: Callable[[IssPos], None]):
+        self._listeners.append(listener)
+
+    def poll_once(self) -> Optional[IssPos]:
+        try:
+            iss_pos = self.iss_pos_service.get_pos()
+        except Exception as e:
+            self._logger.error(
+                f'Error polling position: {e.__class__.__name__}({e})')
+            return None
+
+        self._latest = iss_pos
+        self._last_poll_time = time.time()
+        self._notify(iss_pos)
+        return iss_pos
+
+    def _notify(self, iss_pos):
+        for listener in self._listeners:
+            try:
+                listener(iss_pos)
+            except Exception as e:
+                self._logger.error(
+                    f'Error on position listener: {e.__class__.__name__}({e})')
+
+    def is_leader(self):
+        """
+        Tenta obter o lock do host (se configurado). Processos que não obtêm
+        o lock continuam tentando a cada ciclo, assumindo caso o líder morra.
+        """
+        if self.lock_path is None or self._lock_file is not None:
+            return True
+
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+
+        self._lock_file = lock_file
+        return True
+
+    def _release_leadership(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _run(self):
+        next_poll = time.monotonic()
+        while not self._stop_event.is_set():
+            if self.is_leader():
+                self.poll_once()
+            next_poll += self.interval
+            self._stop_event.wait(max(0.0, next_poll - time.monotonic()))
+
+        self._release_leadership()
+
+    def start(self):
+        if self.is_running:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='iss-pos-poller',
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
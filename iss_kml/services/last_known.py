@@ -0,0 +1,50 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Optional
+
+from iss_kml.services.basic_iss_pos_service import BasicIssPosService, IssPos
+
+
+class LastKnownIssPosService(BasicIssPosService):
+    """
+    Última posição conhecida, gravada num arquivo JSON. Decorando outro
+    serviço, grava cada posição obtida e, se o serviço falhar (qualquer
+    exceção), retorna a última gravada. Sem serviço, só lê o arquivo.
+    """
+    DEFAULT_PATH = os.path.join(tempfile.gettempdir(),
+                                'iss_last_position.json')
+
+    def __init__(self,
+                 iss_pos_service: Optional[BasicIssPosService] = None,
+                 path: Optional[str] = None,
+                 logger=None):
+        super().__init__()
+        self.iss_pos_service = iss_pos_service
+        self.path = path if path else self.DEFAULT_PATH
+        self._logger = logger if logger else logging.getLogger()
+
+    def get_pos(self) -> IssPos:
+        if self.iss_pos_service is None:
+            return self.read()
+
+        try:
+            iss_pos = self.iss_pos_service.get_pos()
+        except Exception as e:
+            self._logger.error(f'Error getting position, using last known: '
+                               f'{e.__class__.__name__}({e})')
+            return self.read()
+
+        self.remember(iss_pos)
+        return iss_pos
+
+    def remember(self, iss_pos: IssPos):
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(iss_pos.to_json(), f)
+        os.replace(temp_path, self.path)
+
+    def read(self) -> IssPos:
+        with open(self.path, 'r') as f:
+            return IssPos.from_json(json.load(f))
@@ -0,0 +1,100 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable
+
+from iss_kml.services.basic_iss_pos_service import BasicIssPosService, IssPos
+
+
+@dataclass
+class SingleFlightStats:
+    calls: int = 0
+    executions: int = 0
+    coalesced: int = 0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas concorrentes com a mesma chave: apenas a primeira executa
+    a função, as demais aguardam e recebem o mesmo resultado. Um resultado
+    bem sucedido continua sendo compartilhado por `window` segundos após o
+    término da execução.
+    """
+    def __init__(self, window: float = 0.0):
+        self.window = window
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._stats: Dict[Hashable, SingleFlightStats] = {}
+
+    def _is_shareable(self, call: _Call):
+        if not call.done.is_set():
+            return True
+        return time.monotonic() - call.finished_at < self.window
+
+    def _join_or_lead(self, key):
+        with self._lock:
+            stats = self._stats.setdefault(key, SingleFlightStats())
+            stats.calls += 1
+            call = self._calls.get(key)
+            if call is not None and self._is_shareable(call):
+                stats.coalesced += 1
+                return call, False
+
+            call = _Call()
+            self._calls[key] = call
+            stats.executions += 1
+            return call, True
+
+    def _execute(self, key, call: _Call, fn: Callable):
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+        finally:
+            call.finished_at = time.monotonic()
+            call.done.set()
+
+    def do(self, key: Hashable, fn: Callable):
+        call, is_leader = self._join_or_lead(key)
+        if is_leader:
+            self._execute(key, call, fn)
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> Dict[Hashable, SingleFlightStats]:
+        with self._lock:
+            return {key: SingleFlightStats(**vars(stats))
+                    for key, stats in self._stats.items()}
+
+
+class SingleFlightIssPosService(BasicIssPosService):
+    """
+    Decorator de um BasicIssPosService que coalesce consultas concorrentes
+    (ou feitas dentro da janela) em uma única chamada ao serviço decorado.
+    """
+    def __init__(self, iss_pos_service: BasicIssPosService, window=1.0):
+        super().__init__()
+        self.iss_pos_service = iss_pos_service
+        self.key = iss_pos_service.__class__.__name__
+        self._single_flight = SingleFlight(window)
+
+    def get_pos(self) -> IssPos:
+        return self._single_flight.do(self.key, self.iss_pos_service.get_pos)
+
+    def stats(self) -> Dict[Hashable, SingleFlightStats]:
+        return self._single_flight.stats()
@@ -0,0 +1,180 @@
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from iss_kml.domain.orbit import (MICROSECONDS, KeplerPropagator,
+                                  OrbitPositions, Tle, parse_tles)
+from iss_kml.services.basic_iss_pos_service import BasicIssPosService, IssPos
+
+
+class TlePropagationService(BasicIssPosService):
+    """
+    Posição da ISS calculada localmente, propagando a órbita (ver
+    KeplerPropagator) a partir de um TLE em cache num arquivo, sem uma
+    chamada externa por posição.
+
+    Com tle_source (função que retorna o texto de um TLE atualizado, ex.:
+    WhereTheIssAt.get_tle), o arquivo é atualizado a cada refresh_interval
+    segundos, numa thread em segundo plano: enquanto isso, e se a
+    atualização falhar, o TLE em cache continua sendo usado. Uma
+    atualização que falhou é tentada de novo após retry_interval segundos.
+    Sem cache, o TLE é buscado na própria consulta; se a busca falhar, as
+    consultas falham sem buscá-lo de novo até retry_interval segundos depois.
+    """
+    ISS_CATALOG_NUMBER = 25544
+
+    def __init__(self,
+                 tle_path: str,
+                 tle_source: Optional[Callable[[], str]] = None,
+                 refresh_interval: float = 12 * 3600,
+                 retry_interval: float = 60,
+                 catalog_number: int = ISS_CATALOG_NUMBER,
+                 clock: Callable[[], float] = time.time,
+                 logger=None):
+        super().__init__()
+        self.tle_path = tle_path
+        self.tle_source = tle_source
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.catalog_number = catalog_number
+        self._clock = clock
+        self._logger = logger if logger else logging.getLogger()
+        self._lock = threading.Lock()
+        self._propagator: Optional[KeplerPropagator] = None
+        self._last_refresh: Optional[float] = None
+        self._last_attempt = -math.inf
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @property
+    def tle(self) -> Tle:
+        return self._get_propagator().tle
+
+    def get_pos(self) -> IssPos:
+        now = int(self._clock() * MICROSECONDS)
+        return self.get_positions([now])[0]
+
+    def propagate(self, timestamps_us) -> OrbitPositions:
+        """
+        Posições em lote
+        :param timestamps_us: Timestamps em microssegundos (escalar ou array)
+        :return: OrbitPositions, com um array por campo
+        """
+        return self._get_propagator().propagate(timestamps_us)
+
+    def get_positions(self, timestamps_us) -> List[IssPos]:
+        """
+        Igual a propagate(), mas retornando um IssPos por timestamp (com o
+        timestamp truncado para segundos)
+        """
+        timestamps_us = np.atleast_1d(np.asarray(timestamps_us,
+                                                 dtype=np.int64))
+        positions = self.propagate(timestamps_us)
+        columns = [column.tolist() for column in positions]
+        timestamps = (timestamps_us // MICROSECONDS).tolist()
+        return [IssPos(*values, timestamp)
+                for *values, timestamp in zip(*columns, timestamps)]
+
+    def _get_propagator(self) -> KeplerPropagator:
+        with self._lock:
+            if self._propagator is None:
+                self._propagator = self._load()
+            if self._needs_refresh():
+                self._start_refresh()
+            return self._propagator
+
+    def _load(self) -> KeplerPropagator:
+        try:
+            return KeplerPropagator(self._read_tle())
+        except FileNotFoundError:
+            if self.tle_source is None:
+                raise
+        # sem cache: não há o que usar enquanto o TLE é buscado
+        tle = self._fetch_without_cache()
+        if tle is None:
+            raise FileNotFoundError(f'no cached TLE in {self.tle_path}')
+        return KeplerPropagator(tle)
+
+    def _fetch_without_cache(self) -> Optional[Tle]:
+        now = self._clock()
+        if now - self._last_attempt < self.retry_interval:
+            return None
+        self._last_attempt = now
+        return self._refresh()
+
+    def _needs_refresh(self):
+        if self.tle_source is None or self._refreshing():
+            return False
+        if self._last_refresh is None:
+            # a idade do cache conta como a da última atualização
+            self._last_refresh = self._cache_modified_time()
+        now = self._clock()
+        return now - self._last_refresh >= self.refresh_interval and \
+            now - self._last_attempt >= self.retry_interval
+
+    def _refreshing(self):
+        return self._refresh_thread is not None and \
+            self._refresh_thread.is_alive()
+
+    def _cache_modified_time(self):
+        try:
+            return os.path.getmtime(self.tle_path)
+        except OSError:
+            return -math.inf
+
+    def _start_refresh(self):
+        self._last_attempt = self._clock()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_in_background, name='tle-refresh',
+            daemon=True)
+        self._refresh_thread.start()
+
+    def _refresh_in_background(self):
+        tle = self._refresh()
+        if tle is not None:
+            with self._lock:
+                self._propagator = KeplerPropagator(tle)
+
+    def wait_for_refresh(self, timeout: Optional[float] = None):
+        """
+        Aguarda a atualização em segundo plano em andamento, se houver
+        """
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _refresh(self) -> Optional[Tle]:
+        """
+        Busca o TLE em tle_source e atualiza o arquivo
+        :return: O TLE novo ou None, se a busca falhar
+        """
+        try:
+            text = self.tle_source()
+            tle = self._find_tle(text)
+        except Exception as e:
+            self._logger.error(
+                f'Error refreshing TLE: {e.__class__.__name__}({e})')
+            return None
+
+        temp_path = f'{self.tle_path}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(text)
+        os.replace(temp_path, self.tle_path)
+        self._last_refresh = self._clock()
+        return tle
+
+    def _read_tle(self) -> Tle:
+        with open(self.tle_path, 'r') as f:
+            return self._find_tle(f.read())
+
+    def _find_tle(self, text) -> Tle:
+        tles = [tle for tle in parse_tles(text)
+                if tle.catalog_number == self.catalog_number]
+        if not tles:
+            raise ValueError(f'no TLE for object {self.catalog_number}')
+        # o mais recente, se houver mais de um
+        return max(tles, key=lambda tle: tle.epoch)
@@ -2,34 +2,40 @@ import requests
 
 from iss_kml.domain import ApiData
 from iss_kml.services.basic_iss_pos_service import BasicIssPosService, IssPos
-import json
+from iss_kml.services.last_known import LastKnownIssPosService
 
 
 class WhereTheIssAt(BasicIssPosService):
+    """
+    Posição da ISS na API do wheretheiss.at. Qualquer falha da consulta
+    (timeout, erro de conexão ou de HTTP) é propagada: a última posição
+    conhecida fica a cargo do LastKnownIssPosService.
+    """
     API_URL = 'https://api.wheretheiss.at/v1/satellites/25544'
+    TLE_URL = 'https://api.wheretheiss.at/v1/satellites/25544/tles'
     READ_FROM_SERVICE = True
+    TIMEOUT = 5
 
     def get_pos(self) -> IssPos:
-        if self.READ_FROM_SERVICE:
-            position = self._get_pos_from_service()
-            self._write_position(position)
-        else:
-            position = self._get_pos_from_file()
+        if not self.READ_FROM_SERVICE:
+            return LastKnownIssPosService().read()
 
-        return position
+        return self._get_pos_from_service()
 
-    @staticmethod
-    def _write_position(position):
-        with open('/tmp/iss_last_position.json', 'w') as f:
-            json.dump(position.to_json(), f)
+    def get_tle(self) -> str:
+        """
+        TLE atual da ISS, no formato texto de três linhas (nome e as duas
+        linhas do TLE), para o TlePropagationService
+        """
+        response = requests.get(self.TLE_URL, timeout=self.TIMEOUT).json()
+        return f"{response['header']}\n{response['line1']}\n" \
+               f"{response['line2']}\n"
 
     def _get_pos_from_service(self):
-        try:
-            response = requests.get(self.API_URL, timeout=5).json()
-        except requests.exceptions.ConnectTimeout:
-            return self._get_pos_from_file()
+        response = requests.get(self.API_URL, timeout=self.TIMEOUT)
+        response.raise_for_status()
 
-        api_data = ApiData.parse_obj(response)
+        api_data = ApiData.parse_obj(response.json())
         position = IssPos(latitude=api_data.latitude,
                           longitude=api_data.longitude,
                           altitude=api_data.altitude * 1000,
@@ -37,8 +43,3 @@ class WhereTheIssAt(BasicIssPosService):
                           footprint=api_data.footprint,
                           timestamp=api_data.timestamp)
         return position
-
-    @staticmethod
-    def _get_pos_from_file():
-        with open('/tmp/iss_last_position.json', 'r') as f:
-            return IssPos.from_json(json.load(f))
@@ -1,2 +1,40 @@
 class Settings:
     DB_PATH = 'iss_kml.db'
+    USE_POLLER = True
+    # Com o poller, o KML mostra a posição estimada a partir das duas últimas
+    # posições gravadas, atualizada a cada DEAD_RECKONING_STEP_SECONDS, até
+    # DEAD_RECKONING_MAX_SECONDS depois da última (None: a última gravada).
+    # Assim o serviço de posição é consultado a cada POLL_INTERVAL_SECONDS
+    # (30 s; 5 s sem a estimativa) e a posição no KML continua mudando a
+    # cada 5 s, com erro abaixo de 1 km
+    POLL_INTERVAL_SECONDS = 30
+    DEAD_RECKONING_STEP_SECONDS = 5
+    DEAD_RECKONING_MAX_SECONDS = 120
+    POLLER_LOCK_PATH = 'iss_kml_poller.lock'
+    SINGLE_FLIGHT_WINDOW_SECONDS = 1.0
+    # Serviços de posição, em ordem de preferência: 'wheretheiss' (API) e
+    # 'tle' (calculada localmente a partir de um TLE em cache, atualizado no
+    # wheretheiss.at a cada TLE_REFRESH_SECONDS). Com mais de um, o seguinte
+    # é consultado quando o anterior falha ou demora mais que o percentil
+    # HEDGE_PERCENTILE das suas latências; se todos falharem, é usada a
+    # última posição conhecida, gravada em LAST_POSITION_PATH (None: no
+    # diretório temporário)
+    POSITION_PROVIDERS = ('wheretheiss', 'tle')
+    HEDGE_PERCENTILE = 0.9
+    POSITION_TIMEOUT_SECONDS = 5
+    LAST_POSITION_PATH = None
+    TLE_PATH = 'iss_tle.txt'
+    TLE_REFRESH_SECONDS = 12 * 3600
+    # Track previsto (a partir do TLE) para as próximas PREDICTED_ORBITS
+    # voltas, recalculado a cada PREDICTION_EPOCH_SECONDS (0: desligado)
+    PREDICTED_ORBITS = 2
+    PREDICTION_STEP_SECONDS = 30
+    PREDICTION_EPOCH_SECONDS = 600
+    # Envia o KML em streaming (também com /iss?stream=1)
+    STREAM_KML = False
+    # KMLs renderizados em cache (live, níveis de detalhe e instantes
+    # passados) e max-age de um instante passado (/iss?at=...)
+    RENDER_CACHE_ENTRIES = 64
+    HISTORY_MAX_AGE_SECONDS = 3600
+    # PRAGMAs das conexões SQLite (None: DEFAULT_PRAGMAS, com WAL)
+    SQLITE_PRAGMAS = None
@@ -1,6 +1,7 @@
 from typing import List
 from unittest.mock import MagicMock
 
+import pytest
 from pytest import fixture
 
 from uuid import uuid4
@@ -139,3 +140,26 @@ def test_adapted_class_properties(dummy_adapter_class, dummy_serializable):
 
     assert adapter.adapted_class_name == 'DummySerializable'
     assert adapter.adapted_class == dummy_serializable
+
+
+def test_default_aggregates(dummy_adapter_class, dummy_serializable):
+    adapter = dummy_adapter_class(adapted_class=dummy_serializable,
+                                  fake_db={},
+                                  logger=MagicMock())
+
+    assert adapter.count() == 0
+    assert not adapter.exists()
+    assert adapter.max_value('idade') is None
+
+    for nome, idade in [('a', 10), ('b', 20), ('c', 60)]:
+        dummy_serializable(None, nome, idade).save(adapter)
+
+    assert adapter.count() == 3
+    assert adapter.exists()
+    assert adapter.min_value('idade') == 10
+    assert adapter.max_value('idade') == 60
+    assert adapter.avg_value('idade') == 30
+    assert adapter.aggregate('sum', 'idade') == 90
+
+    with pytest.raises(ValueError):
+        adapter.aggregate('median', 'idade')
@@ -0,0 +1,53 @@
+import pytest
+from marshmallow import fields, post_load
+
+from iss_kml.adapters.basic_sqlite_adapter import BasicSQLiteAdapter
+from iss_kml.domain.basic_domain import BasicEntity, BasicValue
+
+
+class Sensor(BasicValue):
+    def __init__(self, modelo):
+        self.modelo = modelo
+
+    class Schema(BasicValue.Schema):
+        modelo = fields.Str()
+
+        @post_load
+        def on_load(self, data, **_kwargs):
+            return Sensor(**data)
+
+
+class Registro(BasicEntity):
+    def __init__(self, nome=None, grupo=None, valor=None, sensor=None,
+                 entity_id=None):
+        super().__init__(entity_id)
+        self.nome = nome
+        self.grupo = grupo
+        self.valor = valor
+        self.sensor = sensor
+
+    class Schema(BasicEntity.Schema):
+        nome = fields.Str(allow_none=True)
+        grupo = fields.Str(allow_none=True)
+        valor = fields.Raw(allow_none=True)
+        sensor = fields.Nested(Sensor.Schema, allow_none=True)
+
+        @post_load
+        def on_load(self, data, **_kwargs):
+            return Registro(**data)
+
+
+@pytest.fixture
+def make_adapter(tmp_path):
+    """
+    Cria um adapter de Registro num banco novo, com a tabela criada e os
+    registros gravados
+    """
+    def make(registros=(), adapter_class=BasicSQLiteAdapter):
+        adapter = adapter_class(str(tmp_path / 'registros.db'), Registro)
+        adapter._create_table()
+        if registros:
+            adapter.save_many(list(registros))
+        return adapter
+
+    return make
@@ -0,0 +1,69 @@
+from sqlite3 import OperationalError
+from unittest.mock import patch
+
+import pytest
+
+from iss_kml.adapters.basic_sqlite_adapter import BasicSQLiteAdapter
+
+from .conftest import Registro, Sensor
+
+
+@pytest.fixture
+def adapter(make_adapter):
+    return make_adapter([Registro(grupo='A', valor=1.0, sensor=Sensor('x')),
+                         Registro(grupo='A', valor=3.0, sensor=Sensor('y')),
+                         Registro(grupo='B', valor=8.0, sensor=Sensor('x'))])
+
+
+def test_count(adapter):
+    assert adapter.count() == 3
+    assert adapter.count(grupo__eq='A') == 2
+    assert adapter.count(sensor_dot_modelo__eq='x') == 2
+    assert adapter.count(grupo__eq='C') == 0
+
+
+def test_exists(adapter):
+    assert adapter.exists()
+    assert adapter.exists(grupo__eq='B')
+    assert not adapter.exists(grupo__eq='C')
+
+
+def test_aggregates(adapter):
+    assert adapter.min_value('valor') == 1.0
+    assert adapter.max_value('valor', grupo__eq='A') == 3.0
+    assert adapter.avg_value('valor') == 4.0
+    assert adapter.aggregate('sum', 'valor',
+                             sensor_dot_modelo__eq='x') == 9.0
+    assert adapter.max_value('sensor_dot_modelo') == 'y'
+    assert adapter.max_value('valor', grupo__eq='C') is None
+
+
+def test_aggregates_do_not_instantiate_entities(adapter):
+    with patch.object(adapter, '_instantiate_object') as instantiate:
+        adapter.count(grupo__eq='A')
+        adapter.exists()
+        adapter.max_value('valor')
+
+    instantiate.assert_not_called()
+
+
+def test_invalid_aggregate(adapter):
+    with pytest.raises(ValueError):
+        adapter.aggregate('median', 'valor')
+
+
+def test_aggregates_without_table(tmp_path):
+    adapter = BasicSQLiteAdapter(str(tmp_path / 'empty.db'), Registro)
+
+    assert adapter.count() == 0
+    assert not adapter.exists(grupo__eq='A')
+    assert adapter.max_value('valor') is None
+
+
+def test_aggregates_raise_other_operational_errors(adapter):
+    with patch.object(adapter, '_query_statement',
+                      side_effect=OperationalError('database is locked')):
+        with pytest.raises(OperationalError):
+            adapter.count()
+        with pytest.raises(OperationalError):
+            adapter.max_value('valor')
@@ -12,6 +12,7 @@ from iss_kml.adapters.basic_sqlite_adapter.definers import (
 )
 from iss_kml.adapters.basic_sqlite_adapter.exceptions import \
     SQLiteAdapterSaveException, SQLiteAdapterDeleteException
+from iss_kml.adapters.basic_sqlite_adapter.query_compiler import Group, Term
 
 
 def prefixed(text):
@@ -98,13 +99,16 @@ def test_init_basic_sqlite_adapter_with_optional_values(mock_super_init,
     assert sut.adapter.DdlStatements == sut.mock_ddl_statements
 
 
-@patch(prefixed("connect"))
-def test_get_db(mock_connect):
+@patch(prefixed("get_pool"))
+def test_get_db(mock_get_pool):
     db = BasicSQLiteAdapter._get_db("some_database")
 
-    mock_connect.assert_called_once_with("some_database")
+    mock_get_pool.assert_called_once_with("some_database",
+                                          BasicSQLiteAdapter.PRAGMAS)
+    mock_pool = mock_get_pool.return_value
+    mock_pool.connection.assert_called_once_with()
 
-    assert db == mock_connect.return_value
+    assert db == mock_pool.connection.return_value
 
 
 def test_execute_statement(make_sut):
@@ -277,10 +281,17 @@ def test_create_table(mock_execute_statement, make_sut):
         "Some Class",
         "entity_id"
     )
+    ddl = sut.mock_ddl_statements
+    ddl.CREATE_UNIQUE_INDEX.format.assert_called_once_with(
+        "undx_Some Class_entity_id",
+        "Some Class",
+        "entity_id"
+    )
 
     assert mock_execute_statement.call_args_list == [
-        call(sut.mock_ddl_statements.CREATE_TABLE.format.return_value),
-        call(sut.mock_ddl_statements.CREATE_INDEX.format.return_value),
+        call(ddl.CREATE_TABLE.format.return_value),
+        call(ddl.CREATE_INDEX.format.return_value),
+        call(ddl.CREATE_UNIQUE_INDEX.format.return_value),
     ]
 
 
@@ -569,49 +580,18 @@ def test_get_argcount_failure():
     assert str(error.value) == "invalid comparator: foo"
 
 
-def test_get_op_mask_normalized_with_arg_not_string():
-    result = BasicSQLiteAdapter._get_op_mask_normalized({},
-                                                        "s\'om\'e_op\'_mask")
-
-    assert result == "some_op_mask"
-
-
-def test_get_op_mask_normalized_with_arg_string():
-    result = BasicSQLiteAdapter._get_op_mask_normalized(
-        "some_arg", "some_op_mask"
-    )
-
-    assert result == "some_op_mask"
-
-
-@patch.object(BasicSQLiteAdapter, "_get_op_mask_normalized")
-def test_get_attr(mock_get_op_mask_normalized):
-    result = BasicSQLiteAdapter._get_attr("some_field",
-                                          "foo",
-                                          {"foo": ["", "some_ops"]},
-                                          ["some_args"])
-
-    mock_get_op_mask_normalized.assert_called_once_with(
-        "some_args", "some_ops"
-    )
-    mock_mask = mock_get_op_mask_normalized.return_value
-
-    mock_mask.format.assert_called_once_with("some_field", "some_args")
-
-    assert result == mock_mask.format.return_value
-
-
 @patch.object(BasicSQLiteAdapter, "_args_from_value")
 @patch.object(BasicSQLiteAdapter, "_get_argcount")
-@patch.object(BasicSQLiteAdapter, "_get_attr")
 @patch.object(BasicSQLiteAdapter, "_get_ops")
 def test_parse_conditions_successfully(mock_get_ops,
-                                       mock_get_attr,
                                        mock_get_argcount,
                                        mock_args_from_value):
+    mock_args_from_value.return_value = ["some_value"]
+    some_term = Term("a", "eq", (1,))
+
     result = BasicSQLiteAdapter._parse_conditions(
-        ["some_arg", "some_arg"],
-        {"some__key": "some_value"}
+        [some_term],
+        {"some_dot_field__key": "some_value"}
     )
 
     mock_get_ops.assert_called_once()
@@ -624,22 +604,13 @@ def test_parse_conditions_successfully(mock_get_ops,
         "some_value", mock_get_argcount.return_value
     )
 
-    mock_get_attr.assert_called_once_with(
-        "some",
-        "key",
-        mock_get_ops.return_value,
-        mock_args_from_value.return_value
-    )
-
-    assert result == ["some_arg", "some_arg", mock_get_attr.return_value]
+    assert result == [some_term, Term("some.field", "key", ("some_value",))]
 
 
 @patch.object(BasicSQLiteAdapter, "_args_from_value")
 @patch.object(BasicSQLiteAdapter, "_get_argcount")
-@patch.object(BasicSQLiteAdapter, "_get_attr")
 @patch.object(BasicSQLiteAdapter, "_get_ops")
 def test_parse_conditions_failure(mock_get_ops,
-                                  mock_get_attr,
                                   mock_get_argcount,
                                   mock_args_from_value):
     with pytest.raises(ValueError) as error:
@@ -651,11 +622,17 @@ def test_parse_conditions_failure(mock_get_ops,
     mock_get_ops.assert_called_once()
     mock_get_argcount.assert_not_called()
     mock_args_from_value.assert_not_called()
-    mock_get_attr.assert_not_called()
 
     assert str(error.value) == "No conditions in the filter."
 
 
+def test_parse_conditions_rejects_raw_sql():
+    with pytest.raises(ValueError) as error:
+        BasicSQLiteAdapter._parse_conditions(["1=1"], {})
+
+    assert str(error.value) == "invalid condition: '1=1'"
+
+
 @pytest.mark.parametrize(
     "method,operator",
     [
@@ -665,26 +642,31 @@ def test_parse_conditions_failure(mock_get_ops,
 )
 @patch.object(BasicSQLiteAdapter, "_parse_conditions")
 def test_filter_operators(mock_parse_conditions, method, operator):
-    mock_parse_conditions.return_value = ["value1", "value2"]
+    mock_parse_conditions.return_value = ["value1", "value2", "value3"]
     result = getattr(BasicSQLiteAdapter, method)("some_arg", some="kwarg")
 
     mock_parse_conditions.assert_called_once_with(
-        ["some_arg"], {"some": "kwarg"}
+        ("some_arg",), {"some": "kwarg"}
     )
 
-    assert result == f"(value1 {operator} value2)"
+    assert result == Group(operator, ("value1", "value2", "value3"))
 
 
-@patch.object(BasicSQLiteAdapter, "_parse_conditions")
-def test_get_conditions(mock_parse_conditions):
-    mock_parse_conditions.return_value = ["value1", "value2"]
-    result = BasicSQLiteAdapter._get_conditions("some_arg", "some_kwarg")
+def test_get_conditions():
+    _and = BasicSQLiteAdapter.filter_and
+    _or = BasicSQLiteAdapter.filter_or
 
-    mock_parse_conditions.assert_called_once_with(
-        "some_arg", "some_kwarg"
+    result = BasicSQLiteAdapter._get_conditions(
+        (_and(_or(a__eq=1, b__eq="x"), _or(_and(d__eq=4, e__lt=5), c__eq=3)),),
+        {"entity_id__eq": "some_id"}
     )
 
-    assert result == "value2"
+    assert result == (
+        "(((json_extract(data, '$.a')=? OR json_extract(data, '$.b')=?) "
+        "AND ((json_extract(data, '$.d')=? AND json_extract(data, '$.e')<?) "
+        "OR json_extract(data, '$.c')=?)) OR entity_id=?)",
+        (1, "x", 4, 5, 3, "some_id")
+    )
 
 
 @patch.object(BasicSQLiteAdapter, "_get_conditions")
@@ -697,6 +679,7 @@ def test_filter(mock_json,
                 mock_get_conditions,
                 make_sut):
     mock_query_statement.return_value = [["some_value"]]
+    mock_get_conditions.return_value = ("some_sql", ("some_param",))
     sut = make_sut()
     objects = sut.adapter.filter("some_arg", some="kwargs")
 
@@ -705,11 +688,12 @@ def test_filter(mock_json,
     )
 
     sut.mock_dml_statements.SELECT.format.assert_called_once_with(
-        "data", "Some Class", mock_get_conditions.return_value
+        "data", "Some Class", "some_sql"
     )
 
     mock_query_statement.assert_called_once_with(
-        sut.mock_dml_statements.SELECT.format.return_value
+        sut.mock_dml_statements.SELECT.format.return_value,
+        ("some_param",)
     )
 
     mock_json.loads.assert_called_once_with(
@@ -0,0 +1,107 @@
+import pytest
+
+from iss_kml.adapters.basic_sqlite_adapter import BasicSQLiteAdapter
+
+from .conftest import Registro
+
+
+@pytest.fixture
+def adapter(make_adapter):
+    return make_adapter()
+
+
+def count_rows(adapter):
+    return len(adapter.list_all())
+
+
+def test_save_many_inserts_and_upserts(adapter):
+    registros = [Registro(f'p{i}', valor=i) for i in range(10)]
+
+    ids = adapter.save_many(registros)
+
+    assert ids == [p.entity_id for p in registros]
+    assert count_rows(adapter) == 10
+
+    registros[0].valor = 42
+    adapter.save_many([registros[0], Registro('novo', valor=1)])
+
+    assert count_rows(adapter) == 11
+    assert adapter.get_by_id(registros[0].entity_id).valor == 42
+
+
+def test_save_many_on_legacy_table(adapter):
+    adapter.save(Registro('legado', valor=1).to_json())
+    adapter._unique_index_ready = False
+
+    adapter.save_many([Registro('novo', valor=2)])
+
+    assert count_rows(adapter) == 2
+
+
+def test_delete_many(adapter):
+    registros = [Registro(f'p{i}', valor=i) for i in range(5)]
+    adapter.save_many(registros)
+
+    deleted = adapter.delete_many([p.entity_id for p in registros[:3]])
+
+    assert deleted == [p.entity_id for p in registros[:3]]
+    assert sorted(p.nome for p in adapter.list_all()) == ['p3', 'p4']
+
+
+def test_unit_of_work_flushes_once(adapter):
+    registros = [Registro(f'p{i}', valor=i) for i in range(3)]
+    adapter.save_many(registros)
+
+    with adapter.unit_of_work():
+        novo = Registro('novo', valor=7)
+        novo.set_adapter(adapter)
+        novo.save()
+        registros[1].set_adapter(adapter)
+        registros[1].delete()
+        assert count_rows(adapter) == 3
+
+    assert sorted(p.nome for p in adapter.list_all()) == ['novo', 'p0', 'p2']
+
+
+def test_unit_of_work_discards_on_error(adapter):
+    with pytest.raises(ValueError):
+        with adapter.unit_of_work():
+            adapter.save(Registro('novo', valor=7).to_json())
+            raise ValueError('boom')
+
+    assert count_rows(adapter) == 0
+    assert adapter._pending is None
+
+
+def test_nested_unit_of_work(adapter):
+    with adapter.unit_of_work():
+        with adapter.unit_of_work():
+            adapter.save(Registro('a', valor=1).to_json())
+        assert count_rows(adapter) == 0
+        adapter.save(Registro('b', valor=2).to_json())
+
+    assert count_rows(adapter) == 2
+
+
+def test_save_many_creates_table(tmp_path):
+    adapter = BasicSQLiteAdapter(str(tmp_path / 'new.db'), Registro)
+
+    adapter.save_many([Registro('a', valor=1), Registro('b', valor=2)])
+
+    assert count_rows(adapter) == 2
+
+
+def test_filter_with_parameters(adapter):
+    adapter.save_many([Registro("o'neil", valor=30), Registro('ana', valor=20),
+                       Registro('bia', valor=40)])
+    _and = adapter.filter_and
+
+    result = adapter.filter(nome__eq="o'neil")
+    assert [p.nome for p in result] == ["o'neil"]
+
+    result = adapter.filter(_and(valor__gte=20, valor__lt=40,
+                                 nome__begins_with='a'))
+    assert [p.nome for p in result] == ['ana']
+
+    result = adapter.filter(valor__between=(25, 45))
+    assert sorted(p.nome for p in result) == ['bia', "o'neil"]
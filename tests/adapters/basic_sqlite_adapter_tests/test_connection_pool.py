@@ -0,0 +1,158 @@
+import threading
+from unittest.mock import call, patch
+
+from iss_kml.adapters.basic_sqlite_adapter.connection_pool import (
+    SQLiteConnectionPool,
+    close_all_pools,
+    get_pool
+)
+
+
+def prefixed(text):
+    prefix = "iss_kml.adapters.basic_sqlite_adapter.connection_pool"
+    return f'{prefix}.{text}'
+
+
+@patch(prefixed("connect"))
+def test_connection_applies_pragmas_once(mock_connect):
+    pool = SQLiteConnectionPool("some_database",
+                                {"journal_mode": "WAL", "synchronous": 1})
+
+    db1 = pool.connection()
+    db2 = pool.connection()
+
+    mock_connect.assert_called_once_with("some_database",
+                                         check_same_thread=False)
+    mock_db = mock_connect.return_value
+    assert mock_db.execute.call_args_list == [
+        call("PRAGMA journal_mode=WAL"),
+        call("PRAGMA synchronous=1"),
+    ]
+
+    assert db1 is db2 is mock_db
+
+
+def test_one_connection_per_thread(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'))
+    connections = []
+    taken, done = threading.Event(), threading.Event()
+
+    def worker():
+        connections.append(pool.connection())
+        taken.set()
+        done.wait(5)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    taken.wait(5)
+
+    assert pool.connection() is pool.connection()
+    assert connections[0] is not pool.connection()
+
+    done.set()
+    thread.join()
+    pool.close_all()
+
+
+def run_threads(pool, count):
+    connections = []
+
+    def worker():
+        db = pool.connection()
+        connections.append(db)
+        db.execute('SELECT 1').fetchone()
+
+    for _ in range(count):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    return connections
+
+
+def test_short_lived_threads_reuse_connections(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'))
+
+    connections = run_threads(pool, 50)
+
+    assert len({id(db) for db in connections}) == 1
+    assert pool.open_connections == 1
+    pool.close_all()
+
+
+def test_idle_connections_are_bounded(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'), max_idle=2)
+    barrier = threading.Barrier(5)
+
+    def worker():
+        pool.connection()
+        barrier.wait(5)
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pool.open_connections == 2
+    pool.close_all()
+    assert pool.open_connections == 0
+
+
+def test_released_connection_has_no_open_transaction(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'))
+
+    def worker():
+        db = pool.connection()
+        db.execute('CREATE TABLE t (v int)')
+        db.commit()
+        db.execute('INSERT INTO t VALUES (1)')
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    db = pool.connection()
+    assert not db.in_transaction
+    assert db.execute('SELECT count(*) FROM t').fetchone()[0] == 0
+    pool.close_all()
+
+
+def test_wal_mode(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'))
+
+    db = pool.connection()
+
+    assert db.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+    pool.close_all()
+
+
+def test_readers_do_not_block_writer(tmp_path):
+    database = str(tmp_path / 'pool.db')
+    writer = SQLiteConnectionPool(database).connection()
+    reader = SQLiteConnectionPool(database).connection()
+    writer.execute('CREATE TABLE t (v int)')
+    writer.execute('INSERT INTO t VALUES (1)')
+    writer.commit()
+
+    reader.execute('BEGIN')
+    assert reader.execute('SELECT count(*) FROM t').fetchone()[0] == 1
+    writer.execute('INSERT INTO t VALUES (2)')
+    writer.commit()
+    assert reader.execute('SELECT count(*) FROM t').fetchone()[0] == 1
+    reader.execute('COMMIT')
+
+    assert reader.execute('SELECT count(*) FROM t').fetchone()[0] == 2
+
+
+def test_get_pool(tmp_path):
+    database = str(tmp_path / 'pool.db')
+
+    pool = get_pool(database)
+
+    assert get_pool(database) is pool
+
+    close_all_pools()
+
+    assert get_pool(database) is not pool
+    close_all_pools()
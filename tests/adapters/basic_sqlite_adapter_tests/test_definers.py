@@ -13,6 +13,11 @@ def test_dml_statements():
     )
     assert DmlStatements.UPDATE == 'UPDATE {} SET data=? WHERE {}'
     assert DmlStatements.DELETE == 'DELETE FROM {} WHERE {}'
+    assert DmlStatements.UPSERT == (
+        'INSERT INTO {} (entity_id, data) values (?,?) '
+        'ON CONFLICT(entity_id) DO UPDATE SET data=excluded.data'
+    )
+    assert DmlStatements.DELETE_BY_ID == 'DELETE FROM {} WHERE entity_id=?'
 
 
 def test_ddl_statements():
@@ -20,6 +25,9 @@ def test_ddl_statements():
         'CREATE TABLE {} (entity_id str, data str)'
     )
     assert DdlStatements.CREATE_INDEX == 'CREATE INDEX {} ON {} ({})'
+    assert DdlStatements.CREATE_UNIQUE_INDEX == (
+        'CREATE UNIQUE INDEX IF NOT EXISTS {} ON {} ({})'
+    )
 
 
 def test_get_ops():
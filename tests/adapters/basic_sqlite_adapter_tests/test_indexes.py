@@ -0,0 +1,68 @@
+import pytest
+
+from iss_kml.adapters.basic_sqlite_adapter import BasicSQLiteAdapter
+
+from .conftest import Registro
+
+CIDADES = [Registro('Santos', 'SP', 400000),
+           Registro('Niterói', 'RJ', 500000),
+           Registro('Campinas', 'SP', 1200000)]
+
+
+class RegistroAdapter(BasicSQLiteAdapter):
+    INDEXED_FIELDS = ('grupo', ('nome', 'valor'))
+
+
+class LearningRegistroAdapter(BasicSQLiteAdapter):
+    LEARN_INDEXES = True
+    LEARN_INDEX_THRESHOLD = 2
+
+
+def uses_index(plan, name):
+    return any(f'USING INDEX {name}' in line for line in plan)
+
+
+def test_declared_indexes(make_adapter):
+    adapter = make_adapter(CIDADES, RegistroAdapter)
+
+    assert uses_index(adapter.explain(grupo__eq='SP'), 'ndx_Registro_grupo')
+    assert uses_index(adapter.explain(nome__eq='Santos'),
+                      'ndx_Registro_nome_valor')
+    assert {c.nome for c in adapter.filter(grupo__eq='SP')} == \
+        {'Santos', 'Campinas'}
+
+
+def test_declared_indexes_on_existing_table(make_adapter):
+    existing = make_adapter(CIDADES)
+
+    adapter = RegistroAdapter(existing._database, Registro)
+
+    assert uses_index(adapter.explain(grupo__eq='SP'), 'ndx_Registro_grupo')
+
+
+def test_create_index_on_nested_field(make_adapter):
+    adapter = make_adapter(CIDADES)
+
+    adapter.create_index('sensor.modelo')
+
+    assert uses_index(adapter.explain(sensor_dot_modelo__eq='x'),
+                      'ndx_Registro_sensor_modelo')
+
+
+def test_learn_indexes(make_adapter):
+    adapter = make_adapter(CIDADES, LearningRegistroAdapter)
+
+    assert not uses_index(adapter.explain(grupo__eq='SP'),
+                          'ndx_Registro_grupo')
+
+    adapter.filter(grupo__eq='SP', entity_id__eq='x')
+    adapter.filter(grupo__eq='RJ')
+
+    assert uses_index(adapter.explain(grupo__eq='SP'), 'ndx_Registro_grupo')
+    assert [c.nome for c in adapter.filter(grupo__eq='RJ')] == ['Niterói']
+
+
+@pytest.fixture(autouse=True)
+def reset_registries():
+    BasicSQLiteAdapter._ensured_indexes.clear()
+    BasicSQLiteAdapter._observed_fields.clear()
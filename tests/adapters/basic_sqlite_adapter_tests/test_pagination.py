@@ -0,0 +1,102 @@
+import pytest
+
+from iss_kml.adapters.basic_sqlite_adapter.pagination import (
+    compile_keyset,
+    decode_cursor,
+    encode_cursor,
+    keyset_order,
+    parse_order
+)
+
+from .conftest import Registro
+
+
+@pytest.fixture
+def adapter(make_adapter):
+    return make_adapter(Registro(grupo='a' if i % 2 else 'b', valor=i % 7,
+                                 entity_id=f'{i:03}')
+                        for i in range(30))
+
+
+def read_all_pages(adapter, *args, **kwargs):
+    result, cursor = [], None
+    while True:
+        page = adapter.page(*args, cursor=cursor, **kwargs)
+        assert len(page) <= kwargs['limit']
+        result.extend(page)
+        cursor = page.cursor
+        if cursor is None:
+            return result
+
+
+def test_parse_order():
+    assert parse_order(None) == ()
+    assert parse_order('-valor') == (('valor', True),)
+    assert parse_order(['grupo', '-valor']) == \
+        (('grupo', False), ('valor', True))
+    with pytest.raises(ValueError):
+        parse_order('valor; DROP TABLE x')
+
+
+def test_keyset_order_adds_tiebreak():
+    assert keyset_order('-valor') == (('valor', True), ('entity_id', True))
+    assert keyset_order(None) == (('entity_id', False),)
+    assert keyset_order(['entity_id', 'valor']) == (('entity_id', False),
+                                                    ('valor', False))
+
+
+def test_compile_keyset():
+    sql, indexes = compile_keyset((('valor', False), ('entity_id', False)))
+
+    assert sql == "(json_extract(data, '$.valor'), entity_id) > (?, ?)"
+    assert indexes == (0, 1)
+
+    sql, indexes = compile_keyset((('valor', True), ('entity_id', False)))
+
+    assert sql == ("((json_extract(data, '$.valor')<?) OR "
+                   "(json_extract(data, '$.valor')=? AND entity_id>?))")
+    assert indexes == (0, 0, 1)
+
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor((3, 'abc'))
+
+    assert decode_cursor(cursor, 2) == [3, 'abc']
+
+
+@pytest.mark.parametrize('cursor', ['???', encode_cursor([1]), 'e30='])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+@pytest.mark.parametrize('order_by,full_order', [
+    (None, 'entity_id'),
+    ('valor', ['valor', 'entity_id']),
+    ('-valor', ['-valor', '-entity_id']),
+    (['grupo', '-valor'], ['grupo', '-valor', '-entity_id']),
+])
+def test_page_through_everything(adapter, order_by, full_order):
+    expected = [m.entity_id for m in adapter.iter_all(order_by=full_order)]
+
+    result = read_all_pages(adapter, order_by=order_by, limit=4)
+
+    assert [m.entity_id for m in result] == expected
+
+
+def test_page_with_filter(adapter):
+    result = read_all_pages(adapter, grupo__eq='a', order_by='-valor',
+                            limit=3)
+
+    assert len(result) == 15
+    assert {m.grupo for m in result} == {'a'}
+    assert [m.valor for m in result] == sorted((m.valor for m in result),
+                                               reverse=True)
+
+
+def test_filter_order_by_and_limit(adapter):
+    result = adapter.filter(grupo__eq='b', order_by=['-valor', 'entity_id'],
+                            limit=3)
+
+    assert [(m.valor, m.entity_id) for m in result] == \
+        [(6, '006'), (6, '020'), (5, '012')]
@@ -0,0 +1,74 @@
+import pytest
+
+from iss_kml.adapters.basic_sqlite_adapter.query_compiler import (
+    Group,
+    Term,
+    compile_expression,
+    compile_shape,
+    field_expression
+)
+
+
+def test_field_expression():
+    assert field_expression('entity_id') == 'entity_id'
+    assert field_expression('nome') == "json_extract(data, '$.nome')"
+    assert field_expression('a.b') == "json_extract(data, '$.a.b')"
+
+
+@pytest.mark.parametrize('field', ["a'; DROP TABLE x; --", 'a..b', '1a', ''])
+def test_field_expression_rejects_invalid_fields(field):
+    with pytest.raises(ValueError):
+        field_expression(field)
+
+
+@pytest.mark.parametrize(
+    'op,values,sql',
+    [
+        ('begins_with', ('ab',), "json_extract(data, '$.f') LIKE ? || '%'"),
+        ('between', (1, 2), "(json_extract(data, '$.f') BETWEEN ? AND ?)"),
+        ('contains', ('ab',),
+         "json_extract(data, '$.f') LIKE '%' || ? || '%'"),
+        ('eq', ('ab',), "json_extract(data, '$.f')=?"),
+        ('gt', (1,), "json_extract(data, '$.f')>?"),
+        ('gte', (1,), "json_extract(data, '$.f')>=?"),
+        ('lt', (1,), "json_extract(data, '$.f')<?"),
+        ('lte', (1,), "json_extract(data, '$.f')<=?"),
+        ('ne', (1,), "json_extract(data, '$.f')<>?"),
+    ]
+)
+def test_compile_term(op, values, sql):
+    assert compile_expression(Term('f', op, values)) == (sql, values)
+
+
+def test_compile_group_with_many_terms():
+    expression = Group('AND', (Term('a', 'eq', (1,)),
+                               Term('b', 'eq', (2,)),
+                               Term('c', 'eq', (3,))))
+
+    sql, params = compile_expression(expression)
+
+    assert sql == ("(json_extract(data, '$.a')=? AND "
+                   "json_extract(data, '$.b')=? AND "
+                   "json_extract(data, '$.c')=?)")
+    assert params == (1, 2, 3)
+
+
+def test_single_term_group_has_no_parenthesis():
+    expression = Group('OR', (Term('a', 'eq', (1,)),))
+
+    assert compile_expression(expression) == (
+        "json_extract(data, '$.a')=?", (1,))
+
+
+def test_same_shape_reuses_compiled_sql():
+    compile_shape.cache_clear()
+
+    sql1, params1 = compile_expression(Group('OR', (Term('a', 'eq', (1,)),
+                                                    Term('b', 'gt', (2,)))))
+    sql2, params2 = compile_expression(Group('OR', (Term('a', 'eq', (7,)),
+                                                    Term('b', 'gt', (8,)))))
+
+    assert sql1 is sql2
+    assert params1 == (1, 2)
+    assert params2 == (7, 8)
+    assert compile_shape.cache_info().hits >= 1
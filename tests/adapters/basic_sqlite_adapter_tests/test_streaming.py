@@ -0,0 +1,74 @@
+import types
+
+import pytest
+
+from .conftest import Registro
+
+
+@pytest.fixture
+def adapter(make_adapter):
+    return make_adapter(Registro(valor=i) for i in range(100))
+
+
+class FetchSpy:
+    def __init__(self, db):
+        self._db = db
+        self.batches = []
+
+    def cursor(self):
+        cur = self._db.cursor()
+        spy = self
+
+        class Cursor:
+            def execute(self, *args):
+                return cur.execute(*args)
+
+            def fetchmany(self, size):
+                rows = cur.fetchmany(size)
+                spy.batches.append(len(rows))
+                return rows
+
+            def close(self):
+                cur.close()
+
+        return Cursor()
+
+
+def test_iter_all(adapter):
+    result = adapter.iter_all(batch_size=7)
+
+    assert isinstance(result, types.GeneratorType)
+    assert sorted(obj.valor for obj in result) == list(range(100))
+
+
+def test_iter_all_reads_in_batches(adapter):
+    spy = FetchSpy(adapter._db)
+    adapter._db = spy
+
+    first = next(adapter.iter_all(batch_size=30))
+
+    assert isinstance(first, Registro)
+    assert first.adapter is adapter
+    assert spy.batches == [30]
+
+
+def test_iter_all_consumes_every_batch(adapter):
+    spy = FetchSpy(adapter._db)
+    adapter._db = spy
+
+    assert len(list(adapter.iter_all(batch_size=30))) == 100
+    assert spy.batches == [30, 30, 30, 10, 0]
+
+
+def test_iter_filter(adapter):
+    result = adapter.iter_filter(
+        adapter.filter_and(valor__gte=10, valor__lt=20), batch_size=3)
+
+    assert sorted(obj.valor for obj in result) == list(range(10, 20))
+
+
+def test_iter_filter_matches_filter(adapter):
+    expected = {obj.entity_id for obj in adapter.filter(valor__gt=90)}
+
+    assert {obj.entity_id
+            for obj in adapter.iter_filter(valor__gt=90)} == expected
@@ -0,0 +1,210 @@
+from sqlite3 import OperationalError
+from unittest.mock import patch
+
+import pytest
+
+from iss_kml.adapters.basic_sqlite_adapter.exceptions import \
+    SQLiteAdapterSaveException
+from iss_kml.adapters.iss_track_adapter import IssTrackAdapter
+from iss_kml.domain.iss_track.iss_track import IssPos, IssTrack
+
+
+def make_pos(timestamp):
+    return IssPos(latitude=timestamp / 10,
+                  longitude=timestamp / 20,
+                  altitude=420000.0,
+                  speed=27600.0,
+                  footprint=4500.0,
+                  timestamp=timestamp)
+
+
+def test_append_and_tail(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+
+    for timestamp in range(100, 110):
+        adapter.append_position('1', make_pos(timestamp))
+
+    track = adapter.get_track('1', max_points=3)
+
+    assert isinstance(track, IssTrack)
+    assert track.entity_id == '1'
+    assert track.adapter == adapter
+    assert [p.timestamp for p in track.positions] == [107, 108, 109]
+    assert track.positions[-1] == make_pos(109)
+
+
+def test_append_is_idempotent(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+
+    adapter.append_position('1', make_pos(100))
+    adapter.append_position('1', make_pos(100))
+
+    assert len(adapter.get_track('1').positions) == 1
+
+
+def test_tail_since(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+    for timestamp in range(100, 110):
+        adapter.append_position('1', make_pos(timestamp))
+    adapter.append_position('2', make_pos(200))
+
+    track = adapter.get_track('1', since=105)
+
+    assert [p.timestamp for p in track.positions] == [105, 106, 107, 108,
+                                                      109]
+
+
+def test_tail_until(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+    for timestamp in range(100, 110):
+        adapter.append_position('1', make_pos(timestamp))
+
+    track = adapter.get_track('1', max_points=3, until=105)
+    columnar = adapter.get_track('1', since=103, until=105, columnar=True)
+
+    assert [p.timestamp for p in track.positions] == [103, 104, 105]
+    assert [p.timestamp for p in columnar.positions] == [103, 104, 105]
+    positions_adapter = adapter.positions_adapter
+    plan = positions_adapter.explain(positions_adapter.filter_and(
+        track_id__eq='1', timestamp__between=(0, 105)))
+    assert 'USING INDEX ndx_IssTrackPosition_track_id_timestamp' in plan[0]
+
+
+def test_get_track_empty(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+
+    assert adapter.get_track('1').positions == []
+
+
+def test_migrate_legacy_track(tmp_path):
+    db_path = str(tmp_path / 'iss.db')
+    adapter = IssTrackAdapter(db_path)
+    legacy = IssTrack(entity_id='1', positions=[make_pos(1), make_pos(2)])
+    legacy.set_adapter(adapter)
+    legacy.save()
+
+    track = adapter.get_track('1')
+
+    assert [p.timestamp for p in track.positions] == [1, 2]
+    assert adapter.get_by_id('1') is None
+
+
+def test_latest_timestamp(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+
+    assert adapter.latest_timestamp('1') is None
+
+    for timestamp in (100, 300, 200):
+        adapter.append_position('1', make_pos(timestamp))
+
+    assert adapter.latest_timestamp('1') == 300
+    assert adapter.latest_timestamp('1', until=250) == 200
+    assert adapter.latest_timestamp('1', since=150, until=250) == 200
+    assert adapter.latest_timestamp('1', since=350) is None
+
+
+def test_get_track_columnar(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+    for timestamp in range(100, 110):
+        adapter.append_position('1', make_pos(timestamp))
+
+    track = adapter.get_track('1', max_points=3, columnar=True)
+    track.positions.append(make_pos(110))
+
+    assert len(track.positions) == 3
+    assert list(track.positions) == [make_pos(108), make_pos(109),
+                                     make_pos(110)]
+
+
+def test_history_pages(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+    positions = adapter.positions_adapter
+    positions.append_many('1', [make_pos(t) for t in range(100, 110)])
+    positions.append_many('2', [make_pos(t) for t in range(100, 105)])
+
+    timestamps, cursor = [], None
+    while True:
+        page = positions.history('1', limit=4, cursor=cursor)
+        timestamps.extend(p.timestamp for p in page)
+        cursor = page.cursor
+        if cursor is None:
+            break
+
+    assert timestamps == list(range(100, 110))
+
+    newest = positions.history('1', limit=3, newest_first=True)
+    assert [p.timestamp for p in newest] == [109, 108, 107]
+
+
+def test_history_empty(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+
+    page = adapter.positions_adapter.history('1')
+
+    assert page.items == []
+    assert page.cursor is None
+
+
+def test_count_positions(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+    positions = adapter.positions_adapter
+
+    assert positions.count_positions('1') == 0
+
+    positions.append_many('1', [make_pos(t) for t in range(100, 110)])
+    positions.append_many('2', [make_pos(t) for t in range(100, 105)])
+
+    assert positions.count_positions('1') == 10
+    assert positions.count_positions('2') == 5
+
+
+def test_iter_track(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+    adapter.positions_adapter.append_many(
+        '1', [make_pos(t) for t in range(100, 120)])
+
+    batches = list(adapter.iter_track('1', max_points=10, until=117,
+                                      batch_size=4))
+
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    assert [p.timestamp for batch in batches for p in batch] == \
+        list(range(108, 118))
+    expected = IssTrack([make_pos(t) for t in range(108, 118)])
+    assert ''.join(batch.coordinates_kml() for batch in batches) == \
+        expected.get_track_coordinates_kml()
+
+
+def test_iter_track_without_limits(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+
+    assert list(adapter.iter_track('1')) == []
+
+    adapter.positions_adapter.append_many(
+        '1', [make_pos(t) for t in range(100, 103)])
+
+    batches = list(adapter.iter_track('1'))
+    assert [p.timestamp for batch in batches for p in batch] == \
+        [100, 101, 102]
+
+
+def test_append_reports_insert_failures(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+    positions_adapter = adapter.positions_adapter
+
+    with patch.object(positions_adapter, '_insert_rows',
+                      side_effect=OperationalError('no such table: x')), \
+            patch.object(positions_adapter, '_create_table'):
+        with pytest.raises(SQLiteAdapterSaveException,
+                           match='Error inserting 1 positions into'):
+            adapter.append_position('1', make_pos(100))
+
+
+def test_count_positions_in_range(tmp_path):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+    adapter.positions_adapter.append_many(
+        '1', [make_pos(t) for t in range(100, 110)])
+
+    assert adapter.count_positions('1') == 10
+    assert adapter.count_positions('1', since=103) == 7
+    assert adapter.count_positions('1', since=103, until=105) == 3
+    assert adapter.count_positions('1', until=99) == 0
@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+from marshmallow import ValidationError, fields, post_load, pre_load
+
+from iss_kml.domain.basic_domain import BasicEntity, BasicValue
+from iss_kml.domain.basic_domain.codec import get_codec
+from iss_kml.domain.iss_track.iss_track import IssPos, IssTrack
+
+
+def test_codec_is_cached_per_schema():
+    assert get_codec(IssPos.Schema) is get_codec(IssPos.Schema)
+    assert IssPos._codec is get_codec(IssPos.Schema)
+    assert IssTrack._codec.compiled
+
+
+def test_codec_matches_marshmallow():
+    track = IssTrack(entity_id='1',
+                     positions=[IssPos(1.5, 2, 3, 4, 5, 1684980256),
+                                IssPos(6, 7, 8, 9, 10, 1684980257)])
+    data = IssTrack.Schema().dump(track)
+
+    assert track.to_json() == data
+
+    loaded = IssTrack.from_json(data)
+    expected = IssTrack.Schema().load(data)
+
+    assert loaded.entity_id == expected.entity_id
+    assert loaded.positions == expected.positions
+    assert all(isinstance(p, IssPos) for p in loaded.positions)
+
+
+def test_codec_uses_load_default():
+    class DummyEntity(BasicEntity):
+        pass
+
+    loaded = DummyEntity.from_json({})
+
+    assert isinstance(loaded['entity_id'], str)
+
+
+def test_codec_falls_back_to_marshmallow_fields():
+    class DummyValue(BasicValue):
+        def __init__(self, nome, data, itens):
+            self.nome = nome
+            self.data = data
+            self.itens = itens
+
+        class Schema(BasicValue.Schema):
+            nome = fields.Str(allow_none=True)
+            data = fields.AwareDateTime()
+            itens = fields.List(fields.Int())
+
+            @post_load
+            def on_load(self, data, **_kwargs):
+                return DummyValue(**data)
+
+    value = DummyValue(None, datetime(2003, 8, 13, tzinfo=timezone.utc),
+                       [1, 2])
+
+    data = value.to_json()
+
+    assert data == DummyValue.Schema().dump(value)
+    assert DummyValue.from_json(data) == value
+
+
+def test_codec_not_compiled_with_pre_load():
+    class DummyValue(BasicValue):
+        class Schema(BasicValue.Schema):
+            nome = fields.Str()
+
+            @pre_load
+            def upper(self, data, **_kwargs):
+                return {'nome': data['nome'].upper()}
+
+    assert not DummyValue._codec.compiled
+    assert DummyValue.from_json({'nome': 'iss'}) == {'nome': 'ISS'}
+
+
+def test_validate_on_request():
+    data = {'latitude': 'not a float', 'longitude': 2, 'altitude': 3,
+            'speed': 4, 'footprint': 5, 'timestamp': 6}
+
+    with pytest.raises(ValidationError):
+        IssPos.from_json(data, validate=True)
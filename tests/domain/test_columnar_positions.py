@@ -0,0 +1,87 @@
+import pytest
+
+from iss_kml.domain.iss_track.columnar_positions import ColumnarPositions
+from iss_kml.domain.iss_track.iss_track import IssPos, IssTrack
+
+
+def make_pos(timestamp):
+    return IssPos(latitude=timestamp / 10,
+                  longitude=timestamp / 20,
+                  altitude=420000.5,
+                  speed=27600.0,
+                  footprint=4500.0,
+                  timestamp=timestamp)
+
+
+def test_behaves_like_list():
+    expected = [make_pos(t) for t in range(10)]
+    positions = ColumnarPositions(expected)
+
+    assert len(positions) == 10
+    assert list(positions) == expected
+    assert positions[0] == expected[0]
+    assert positions[-1] == expected[-1]
+    assert positions[-3:] == expected[-3:]
+    assert positions[:4] == expected[:4]
+    with pytest.raises(IndexError):
+        positions[10]
+
+
+def test_ring_buffer_drops_oldest():
+    positions = ColumnarPositions(capacity=4)
+
+    for t in range(10):
+        positions.append(make_pos(t))
+
+    assert len(positions) == 4
+    assert [p.timestamp for p in positions] == [6, 7, 8, 9]
+    assert positions[0] == make_pos(6)
+    assert positions[-1] == make_pos(9)
+    assert list(positions.column('timestamp')) == [6, 7, 8, 9]
+    assert list(positions.column('timestamp', 3)) == [7, 8, 9]
+    assert list(positions.column('timestamp', 1)) == [9]
+
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        ColumnarPositions(capacity=0)
+
+
+@pytest.mark.parametrize('max_points', [None, 0, 1, 3, 5, 100])
+def test_coordinates_kml_matches_list_track(max_points):
+    expected = [make_pos(t) for t in range(13)]
+    positions = ColumnarPositions(capacity=7)
+    positions.extend(expected)
+
+    columnar_track = IssTrack(positions=positions)
+    list_track = IssTrack(positions=expected[-7:])
+
+    assert columnar_track.get_track_coordinates_kml(max_points) == \
+        list_track.get_track_coordinates_kml(max_points)
+
+
+def test_serialize_columnar_track():
+    positions = ColumnarPositions([make_pos(1), make_pos(2)])
+    track = IssTrack(positions=positions)
+
+    loaded = IssTrack.from_json(track.to_json())
+
+    assert loaded.positions == [make_pos(1), make_pos(2)]
+
+
+@pytest.mark.parametrize('max_points', [None, 0, 2, 5])
+def test_coordinates_kml_keeps_int_values(max_points):
+    expected = [IssPos(latitude=t, longitude=2 * t + 0.5, altitude=420000,
+                       speed=27600.0, footprint=4500.0, timestamp=t)
+                for t in range(9)]
+    positions = ColumnarPositions(expected[:2], capacity=5)
+    positions.extend(make_pos(t) for t in range(2, 4))
+    positions.extend(expected[4:])
+
+    list_track = IssTrack(positions=[*[make_pos(t) for t in range(4)],
+                                     *expected[4:]][-5:])
+
+    assert positions.coordinates_kml(max_points) == \
+        list_track.get_track_coordinates_kml(max_points)
+    assert '420000 ' in positions.coordinates_kml()
+    assert positions._flagged == 5
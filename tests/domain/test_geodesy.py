@@ -0,0 +1,62 @@
+import numpy as np
+from latloncalc.latlon import LatLon
+from pytest import approx
+
+from iss_kml.domain.geodesy import (destination_points, footprint_rings,
+                                    format_kml_coordinates)
+
+
+def latloncalc_offset(latitude, longitude, bearing, distance):
+    p = LatLon(latitude, longitude).offset(bearing, distance, ellipse='sphere')
+    return p.lat.decimal_degree, p.lon.decimal_degree
+
+
+def test_destination_points_matches_latloncalc():
+    rng = np.random.default_rng(42)
+    latitudes = rng.uniform(-52, 52, 200)
+    longitudes = rng.uniform(-180, 180, 200)
+    bearings = rng.uniform(0, 360, 200)
+    distances = rng.uniform(0, 2500, 200)
+
+    result_lat, result_lon = destination_points(latitudes, longitudes,
+                                                bearings, distances)
+
+    for i in range(200):
+        lat, lon = latloncalc_offset(latitudes[i], longitudes[i],
+                                     bearings[i], distances[i])
+        delta_lon = abs(result_lon[i] - lon)
+        assert result_lat[i] == approx(lat, abs=1e-9)
+        assert min(delta_lon, 360 - delta_lon) == approx(0, abs=1e-9)
+
+
+def test_footprint_rings_batch():
+    latitudes = [1, -45.5, 51.6]
+    longitudes = [2, 179.9, -120]
+    radii = [1, 2250, 2200]
+
+    result_lat, result_lon = footprint_rings(latitudes, longitudes, radii, 8)
+
+    assert result_lat.shape == (3, 9)
+    assert result_lon.shape == (3, 9)
+    for i in range(3):
+        for j in range(9):
+            lat, lon = latloncalc_offset(latitudes[i], longitudes[i],
+                                         45 * j, radii[i])
+            delta_lon = abs(result_lon[i, j] - lon)
+            assert result_lat[i, j] == approx(lat, abs=1e-9)
+            assert min(delta_lon, 360 - delta_lon) == approx(0, abs=1e-9)
+
+
+def test_footprint_rings_single_position():
+    result_lat, result_lon = footprint_rings(1, 2, 1, 4)
+
+    assert result_lat.shape == (1, 5)
+    assert result_lat[0, 0] == approx(result_lat[0, -1])
+    assert result_lon[0, 0] == approx(result_lon[0, -1])
+
+
+def test_format_kml_coordinates():
+    result = format_kml_coordinates(np.array([2.0, 3.5]),
+                                    np.array([1.0, -4.25]))
+
+    assert result == '2.0,1.0,0 3.5,-4.25,0 '
@@ -1,5 +1,11 @@
+from unittest.mock import patch
+
+import pytest
+
 from iss_kml.domain.basic_domain.util import generic_serialize_roundtrip_test
-from iss_kml.domain.iss_track.iss_track import IssPos, IssTrack
+from iss_kml.domain.iss_track.columnar_positions import ColumnarPositions
+from iss_kml.domain.iss_track.iss_track import (IssPos, IssTrack,
+                                                kml_coordinate)
 
 
 def test_iss_pos():
@@ -11,3 +17,69 @@ def test_iss_track():
     iss_pos = IssPos(1, 2, 3, 4, 5, 1684980256)
     iss_track = IssTrack([iss_pos])
     generic_serialize_roundtrip_test(IssTrack, iss_track)
+
+
+def legacy_coordinates_kml(positions, max_points=None):
+    coordinates = ''
+    if max_points is None:
+        max_points = len(positions)
+    for pos in positions[-max_points:]:
+        coordinates += f'{pos.longitude},{pos.latitude},{pos.altitude} '
+    return coordinates
+
+
+def make_pos(timestamp):
+    return IssPos(timestamp / 7, -timestamp / 3, 420000.125, 27600.0,
+                  4500.0, timestamp)
+
+
+@pytest.mark.parametrize('max_points', [None, 0, 1, 5, 50])
+def test_track_coordinates_kml(max_points):
+    positions = [make_pos(t) for t in range(20)]
+    iss_track = IssTrack(positions)
+
+    assert iss_track.get_track_coordinates_kml(max_points) == \
+        legacy_coordinates_kml(positions, max_points)
+
+
+def test_track_coordinates_kml_is_incremental():
+    iss_track = IssTrack([make_pos(t) for t in range(5)])
+    iss_track.get_track_coordinates_kml()
+
+    iss_track.positions.append(make_pos(5))
+
+    with patch('iss_kml.domain.iss_track.iss_track.kml_coordinate',
+               wraps=kml_coordinate) as encode:
+        result = iss_track.get_track_coordinates_kml(3)
+
+    assert encode.call_count == 1
+    assert result == legacy_coordinates_kml(iss_track.positions, 3)
+
+
+def test_track_coordinates_kml_after_changes():
+    iss_track = IssTrack([make_pos(t) for t in range(5)])
+    iss_track.get_track_coordinates_kml()
+
+    iss_track.positions[-1] = make_pos(100)
+    assert iss_track.get_track_coordinates_kml() == \
+        legacy_coordinates_kml(iss_track.positions)
+
+    iss_track.positions = iss_track.positions[:2]
+    assert iss_track.get_track_coordinates_kml() == \
+        legacy_coordinates_kml(iss_track.positions)
+
+    iss_track.positions.pop()
+    assert iss_track.get_track_coordinates_kml() == \
+        legacy_coordinates_kml(iss_track.positions)
+
+
+@pytest.mark.parametrize('timestamp, size', [(-1, 0), (0, 0), (10, 5),
+                                             (11, 6), (100, 20)])
+def test_positions_until(timestamp, size):
+    positions = [make_pos(t * 2) for t in range(20)]
+
+    for track_positions in (positions, ColumnarPositions(positions)):
+        iss_track = IssTrack(track_positions)
+        assert iss_track.positions_until(timestamp) == positions[:size]
+        assert iss_track.positions_until(timestamp, 2) == \
+            positions[max(0, size - 2):size]
@@ -0,0 +1,103 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from pytest import approx
+
+from iss_kml.domain.orbit import (MICROSECONDS, KeplerPropagator, Tle,
+                                  parse_tles)
+
+LINE1 = '1 25544U 98067A   08264.51782528 -.00002182  00000-0 -11606-4 0  2927'
+LINE2 = '2 25544  51.6416 247.4627 0006703 130.5360 325.0288 15.72125391563537'
+
+
+@pytest.fixture(scope='module')
+def tle():
+    return Tle.parse(LINE1, LINE2, 'ISS (ZARYA)')
+
+
+def test_parse_tle(tle):
+    assert tle.name == 'ISS (ZARYA)'
+    assert tle.catalog_number == 25544
+    epoch = datetime(2008, 9, 20, 12, 25, 40, 104192, tzinfo=timezone.utc)
+    assert tle.epoch == int(epoch.timestamp() * MICROSECONDS)
+    assert tle.mean_motion_dot == -0.00002182
+    assert tle.inclination == 51.6416
+    assert tle.eccentricity == 0.0006703
+    assert tle.mean_motion == 15.72125391
+
+
+@pytest.mark.parametrize('line1, line2', [
+    (LINE1[:-1] + '8', LINE2),
+    (LINE1, LINE2[:-1]),
+    (LINE2, LINE1),
+    (LINE1, LINE2.replace('25544', '25545')),
+])
+def test_parse_invalid_tle(line1, line2):
+    with pytest.raises(ValueError):
+        Tle.parse(line1, line2)
+
+
+def test_parse_tles():
+    text = f'ISS (ZARYA)\n{LINE1}\n{LINE2}\n\n{LINE1}\n{LINE2}\n'
+
+    tles = parse_tles(text)
+
+    assert [tle.name for tle in tles] == ['ISS (ZARYA)', None]
+
+
+def orbits(tle, count, step_seconds=10):
+    period = 86400 / tle.mean_motion
+    seconds = np.arange(0, count * period, step_seconds)
+    timestamps = tle.epoch + (seconds * MICROSECONDS).astype(np.int64)
+    return timestamps, KeplerPropagator(tle).propagate(timestamps)
+
+
+def test_propagated_orbit(tle):
+    timestamps, positions = orbits(tle, 3)
+
+    assert positions.latitude.max() == approx(51.8, abs=0.1)
+    assert positions.latitude.min() == approx(-51.8, abs=0.1)
+    assert 340_000 < positions.altitude.min() < positions.altitude.max() \
+        < 380_000
+    assert positions.speed == approx(27_700, rel=0.01)
+    assert positions.footprint == approx(4_200, rel=0.05)
+    assert positions.longitude.min() >= -180
+    assert positions.longitude.max() < 180
+
+
+def test_ascending_nodes(tle):
+    timestamps, positions = orbits(tle, 4, step_seconds=1)
+
+    latitude = positions.latitude
+    nodes = np.flatnonzero((latitude[:-1] < 0) & (latitude[1:] >= 0))
+    periods = np.diff(timestamps[nodes]) / MICROSECONDS
+    shifts = -np.diff(positions.longitude[nodes]) % 360
+
+    # período nodal e deslocamento para oeste a cada volta: rotação da
+    # Terra no período (22,96°) mais a regressão do nó pelo J2 (~0,32°)
+    assert periods == approx(86400 / tle.mean_motion, rel=0.002)
+    assert shifts == approx(22.96 + 0.32, abs=0.05)
+
+
+def test_batch_matches_scalar(tle):
+    propagator = KeplerPropagator(tle)
+    timestamps = tle.epoch + np.array([0, 1, 3_600_000_000, -7_200_000_000])
+
+    batch = propagator.propagate(timestamps)
+
+    for index, timestamp in enumerate(timestamps):
+        single = propagator.propagate(int(timestamp))
+        for field, column in zip(single, batch):
+            assert float(field) == column[index]
+
+
+def test_microsecond_resolution(tle):
+    propagator = KeplerPropagator(tle)
+
+    first = propagator.propagate(tle.epoch)
+    second = propagator.propagate(tle.epoch + 1000)
+
+    # 7,6 km/s: ~8 m em 1 ms
+    assert 0 < abs(second.latitude - first.latitude) + \
+        abs(second.longitude - first.longitude) < 1e-3
@@ -0,0 +1,163 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from iss_kml.domain.iss_track.columnar_positions import ColumnarPositions
+from iss_kml.domain.iss_track.iss_track import IssPos, IssTrack
+from iss_kml.domain.simplification import (douglas_peucker_importance,
+                                           quantize_tolerance,
+                                           select_points,
+                                           simplification_cache,
+                                           tolerance_from_view)
+from iss_kml.domain.version_cache import VersionCache
+
+
+def orbit(size, start=0):
+    t = (np.arange(size) + start) * 5.0
+    latitudes = 51.6 * np.sin(t / 5550 * 2 * np.pi)
+    longitudes = (t * 0.0667 + 180) % 360 - 180
+    return latitudes, longitudes
+
+
+def make_track(size, start=0):
+    latitudes, longitudes = orbit(size, start)
+    return [IssPos(float(lat), float(lon), 420000.0, 27600.0, 4500.0,
+                   1684980256 + (start + i) * 5)
+            for i, (lat, lon) in enumerate(zip(latitudes, longitudes))]
+
+
+def test_importance_keeps_corners():
+    latitudes = [0, 0, 0, 0, 5, 10]
+    longitudes = [0, 1, 2, 3, 3, 3]
+
+    importance = douglas_peucker_importance(latitudes, longitudes)
+
+    assert np.isinf(importance[0]) and np.isinf(importance[-1])
+    assert list(select_points(importance, max_points=3)) == [0, 3, 5]
+    assert importance[1] == pytest.approx(0, abs=1e-6)
+
+
+def test_importance_is_monotonic_with_tolerance():
+    importance = douglas_peucker_importance(*orbit(3000))
+
+    previous = None
+    for tolerance in (10.0, 1.0, 0.1, 0.01):
+        selected = set(select_points(importance, tolerance=tolerance))
+        assert {0, 2999} <= selected
+        if previous is not None:
+            assert previous <= selected
+        previous = selected
+
+
+def test_select_points_budget():
+    importance = douglas_peucker_importance(*orbit(3000))
+
+    selected = select_points(importance, max_points=100)
+
+    assert len(selected) == 100
+    assert list(selected) == sorted(selected)
+    assert selected[0] == 0 and selected[-1] == 2999
+    assert len(select_points(importance, max_points=1)) == 2
+    assert len(select_points(importance, max_points=5000)) == 3000
+
+
+def test_antimeridian_crossing_is_a_short_segment():
+    latitudes = [10.0, 10.0, 10.0]
+    longitudes = [179.0, -180.0, -179.0]
+
+    importance = douglas_peucker_importance(latitudes, longitudes)
+
+    assert importance[1] < 1
+
+
+def test_tolerance_from_view():
+    assert tolerance_from_view(0, 1000) == 0
+    assert tolerance_from_view(1_000_000, 1000) == quantize_tolerance(
+        2 * 1_000_000 * np.tan(np.radians(30)) / 1000 / 1000)
+    assert quantize_tolerance(1.1) == 1.0
+    assert quantize_tolerance(3.5) == 4.0
+
+
+def test_version_cache():
+    cache = VersionCache(max_entries=2)
+    calls = []
+
+    def build(value):
+        calls.append(value)
+        return np.array([value])
+
+    cache.get('a', lambda: build(1))
+    cache.get('a', lambda: build(2))
+    cache.get('b', lambda: build(3))
+    cache.get('c', lambda: build(4))
+    cache.get('a', lambda: build(5))
+
+    assert calls == [1, 3, 4, 5]
+
+
+def test_version_cache_builds_outside_the_lock():
+    cache = VersionCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_build():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'slow'
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        slow = executor.submit(cache.get, 'a', slow_build)
+        started.wait(5)
+        waiting = executor.submit(cache.get, 'a', slow_build)
+
+        assert cache.get('b', lambda: 'fast') == 'fast'
+        assert not slow.done() and not waiting.done()
+        release.set()
+        assert slow.result(5) == waiting.result(5) == 'slow'
+
+    assert len(calls) == 1
+
+
+def test_version_cache_does_not_keep_build_errors():
+    cache = VersionCache()
+
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        cache.get('a', fail)
+    assert cache.get('a', lambda: 'built') == 'built'
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_simplified_track(columnar):
+    simplification_cache.clear()
+    positions = make_track(500)
+    if columnar:
+        positions = ColumnarPositions(positions)
+    iss_track = IssTrack(positions, entity_id='1')
+
+    full = iss_track.get_track_coordinates_kml(200)
+    simplified = iss_track.get_simplified_coordinates_kml(200, max_points=50)
+
+    assert len(simplified.split()) == 50
+    assert set(simplified.split()) <= set(full.split())
+    assert simplified.split()[-1] == full.split()[-1]
+    assert iss_track.get_simplified_coordinates_kml(200, tolerance=0) == full
+
+
+def test_simplified_track_is_cached_per_version():
+    simplification_cache.clear()
+    iss_track = IssTrack(make_track(300), entity_id='1')
+
+    first = iss_track.get_simplified_coordinates_kml(max_points=20)
+    iss_track.positions.append(make_track(1, start=300)[0])
+    second = iss_track.get_simplified_coordinates_kml(max_points=20)
+
+    assert first != second
+    assert len(simplification_cache._entries) == 2
+    assert iss_track.get_simplified_coordinates_kml(max_points=20) == second
+    assert len(simplification_cache._entries) == 2
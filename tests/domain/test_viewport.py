@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from iss_kml.domain.iss_track.columnar_positions import ColumnarPositions
+from iss_kml.domain.iss_track.iss_track import IssPos, IssTrack
+from iss_kml.domain.viewport import (BBox, SegmentIndex, unwrap_longitudes,
+                                     viewport_cache)
+
+
+def make_index(longitudes, latitudes):
+    return SegmentIndex(longitudes, latitudes, [400.0] * len(longitudes))
+
+
+def test_parse_bbox():
+    assert BBox.parse('-10,-5.5,20,30') == BBox(-10, -5.5, 20, 30)
+    assert BBox.parse('170,-10,-170,10').unwrapped_east == 190
+    assert BBox.parse('-180,-90,180,90') == BBox(-180, -90, 180, 90)
+    for text in ('', '1,2,3', 'a,b,c,d', '0,10,5,-10', '0,0,nan,1', None,
+                 '-1e7,-1e7,1e7,1e7', '-181,0,10,10', '0,-91,10,10',
+                 '0,0,10,90.5'):
+        with pytest.raises(ValueError):
+            BBox.parse(text)
+
+
+def test_unwrap_longitudes():
+    unwrapped = unwrap_longitudes([170, 179, -179, -170, 179, 170])
+
+    assert list(unwrapped) == [170, 179, 181, 190, 179, 170]
+
+
+def test_clip_interpolates_at_the_edges():
+    index = make_index([0, 10, 20, 30], [0, 0, 10, 10])
+
+    pieces = index.clip(BBox(5, -1, 15, 8))
+
+    assert len(pieces) == 1
+    assert pieces[0].tolist() == [[5, 0, 400], [10, 0, 400], [15, 5, 400]]
+
+
+def test_clip_splits_into_pieces():
+    index = make_index([0, 10, 20, 10, 0], [0, 0, 5, 0, 0])
+
+    pieces = index.clip(BBox(5, -1, 15, 1))
+
+    assert [piece.tolist() for piece in pieces] == [
+        [[5, 0, 400], [10, 0, 400], [12, 1, 400]],
+        [[12, 1, 400], [10, 0, 400], [5, 0, 400]]]
+
+
+def test_clip_across_the_antimeridian():
+    index = make_index([170, 175, 179, -179, -175, -170], [0, 1, 2, 3, 4, 5])
+
+    crossing = index.clip(BBox(178, -10, -178, 10))
+    east = index.clip(BBox(-176, -10, -171, 10))
+    outside = index.clip(BBox(0, -10, 10, 10))
+
+    assert [point[0] for point in crossing[0].tolist()] == \
+        [178, 179, -179, -178]
+    assert east[0][:, 0].tolist() == [-176, -175, -171]
+    assert outside == []
+
+
+def test_whole_world_keeps_original_positions():
+    longitudes = [170, 175, 179, -179, -175, -170]
+    index = make_index(longitudes, [0, 1, 2, 3, 4, 5])
+
+    pieces = index.clip(BBox(-180, -90, 180, 90))
+
+    exact = [point for piece in pieces for point in piece[:, 0].tolist()]
+    assert set(longitudes) <= set(exact)
+
+
+def test_candidates_only_cover_the_bbox():
+    longitudes = np.linspace(-180, 180, 10001)
+    index = make_index(longitudes, np.zeros(len(longitudes)))
+
+    candidates = index.candidates(0, -1, 5, 1)
+
+    assert 0 < len(candidates) < len(index) / 10
+    assert len(index.clip(BBox(0, -1, 5, 1))) == 1
+
+
+def test_candidates_of_a_huge_region():
+    index = make_index([0, 10, 20], [0, 5, 0])
+
+    candidates = index.candidates(-1e7, -1e7, 1e7, 1e7)
+
+    assert candidates.tolist() == [0, 1]
+    assert make_index([0], [0]).candidates(-1e7, -1e7, 1e7, 1e7).size == 0
+
+
+@pytest.mark.parametrize('columnar', [False, True])
+def test_clipped_track(columnar):
+    viewport_cache.clear()
+    positions = [IssPos(0.0, float(lon), 420000.0, 27600.0, 4500.0,
+                        1684980256 + i * 5)
+                 for i, lon in enumerate(range(-20, 21))]
+    if columnar:
+        positions = ColumnarPositions(positions)
+    iss_track = IssTrack(positions, entity_id='1')
+
+    pieces = iss_track.get_clipped_coordinates_kml(BBox(-5.5, -1, 5.5, 1))
+
+    assert len(pieces) == 1
+    assert pieces[0].split()[0] == '-5.5,0.0,420000.0'
+    assert pieces[0].split()[1:-1] == \
+        iss_track.get_track_coordinates_kml().split()[15:26]
+    assert iss_track.get_clipped_coordinates_kml(BBox(50, -1, 60, 1)) == []
+    assert len(viewport_cache._entries) == 1
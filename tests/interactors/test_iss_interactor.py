@@ -1,15 +1,23 @@
 from unittest.mock import patch, MagicMock
 
-from iss_kml.interactors import IssInteractor
+import pytest
+from pytest import approx
+
+from iss_kml.adapters.iss_track_adapter import IssTrackAdapter
+from iss_kml.domain.viewport import BBox
+from iss_kml.interactors import IssInteractor, KmlTemplate, Segments
 from iss_kml.services.basic_iss_pos_service import IssPos
+from iss_kml.services.dead_reckoning import extrapolate
 
 
+@patch.object(IssInteractor, '_get_yt_iss_live_coordinates')
 @patch.object(IssInteractor, '_get_footprint_coordinates')
 @patch.object(IssInteractor, '_get_current_track')
 @patch.object(IssInteractor, '_make_kml')
 def test_iss_interactor(mock_make_kml,
                         mock_get_current_track,
-                        mock_get_footprint_coordinates):
+                        mock_get_footprint_coordinates,
+                        mock_get_yt_iss_live_coordinates):
     mock_iss_track_adapter = MagicMock()
     mock_iss_pos_service = MagicMock()
     kml_template = MagicMock()
@@ -26,11 +34,18 @@ def test_iss_interactor(mock_make_kml,
     mock_coordinates = mock_get_footprint_coordinates.return_value
     mock_get_current_track.assert_called_once()
     mock_track = mock_get_current_track.return_value
-    mock_track.get_track_coordinates_kml.assert_called_once()
+    mock_track.positions.append.assert_called_once_with(mock_pos)
+    mock_iss_track_adapter.append_position.assert_called_once_with(
+        mock_track.entity_id, mock_pos)
+    mock_track.get_track_coordinates_kml.assert_called_once_with(
+        IssInteractor.MAX_TRACK_POINTS)
     mock_track_coords = mock_track.get_track_coordinates_kml.return_value
+    mock_yt_iss_live = mock_get_yt_iss_live_coordinates.return_value
     mock_make_kml.assert_called_once_with(mock_pos,
                                           mock_coordinates,
-                                          mock_track_coords)
+                                          mock_track_coords,
+                                          mock_yt_iss_live,
+                                          '')
 
     assert result == mock_make_kml.return_value
 
@@ -44,21 +59,40 @@ def test_make_kml():
     mock_iss_pos = MagicMock()
     mock_coordinates = MagicMock()
     mock_track = MagicMock()
+    mock_yt_iss_live = MagicMock()
 
     result = iss_interactor._make_kml(mock_iss_pos,
                                       mock_coordinates,
-                                      mock_track)
+                                      mock_track,
+                                      mock_yt_iss_live)
 
     mock_kml_template.format.assert_called_once_with(
         latitude=mock_iss_pos.latitude,
         longitude=mock_iss_pos.longitude,
         altitude=mock_iss_pos.altitude,
         footprint=mock_coordinates,
-        track=mock_track)
+        track=mock_track,
+        yt_iss_live=mock_yt_iss_live,
+        predicted_track='')
 
     assert result == mock_kml_template.format.return_value
 
 
+def test_get_current_track():
+    mock_adapter = MagicMock()
+    iss_interactor = IssInteractor(iss_track_adapter=mock_adapter,
+                                   iss_pos_service_instance=None,
+                                   kml_template=None)
+
+    result = iss_interactor._get_current_track()
+
+    mock_adapter.get_track.assert_called_once_with(
+        IssInteractor.TRACK_ID, IssInteractor.MAX_TRACK_POINTS, None, None,
+        columnar=IssInteractor.COLUMNAR_TRACK)
+
+    assert result == mock_adapter.get_track.return_value
+
+
 def test_get_footprint_coordinates():
     mock_iss_pos = IssPos(latitude=1,
                           longitude=2,
@@ -69,9 +103,325 @@ def test_get_footprint_coordinates():
 
     result = IssInteractor._get_footprint_coordinates(mock_iss_pos, 4)
 
-    # !assert do tipo "snapshot"
-    assert result == '2.0,1.0089932202939478,0 ' \
-                     '2.0089945902135753,0.9999999876803236,0 ' \
-                     '2.0,0.991006779706052,0 ' \
-                     '1.9910054097864247,0.9999999876803236,0 ' \
-                     '2.0,1.0089932202939478,0 '
+    # !snapshot gerado com latloncalc (LatLon.offset, ellipse='sphere')
+    snapshot = '2.0,1.0089932202939478,0 ' \
+               '2.0089945902135753,0.9999999876803236,0 ' \
+               '2.0,0.991006779706052,0 ' \
+               '1.9910054097864247,0.9999999876803236,0 ' \
+               '2.0,1.0089932202939478,0 '
+
+    assert result.endswith(' ')
+    points = [p.split(',') for p in result.split()]
+    expected = [p.split(',') for p in snapshot.split()]
+    assert len(points) == len(expected)
+    for point, expected_point in zip(points, expected):
+        assert float(point[0]) == approx(float(expected_point[0]), abs=1e-12)
+        assert float(point[1]) == approx(float(expected_point[1]), abs=1e-12)
+        assert point[2] == '0'
+
+
+@patch.object(IssInteractor, '_render')
+@patch.object(IssInteractor, '_get_current_track')
+def test_render_latest(mock_get_current_track, mock_render):
+    mock_service = MagicMock()
+    iss_interactor = IssInteractor(iss_track_adapter=MagicMock(),
+                                   iss_pos_service_instance=mock_service,
+                                   kml_template=None)
+
+    result = iss_interactor.render_latest()
+
+    mock_service.get_pos.assert_not_called()
+    mock_track = mock_get_current_track.return_value
+    mock_render.assert_called_once_with(mock_track,
+                                        mock_track.positions[-1])
+
+    assert result == mock_render.return_value
+
+
+@patch.object(IssInteractor, 'run')
+@patch.object(IssInteractor, '_get_current_track')
+def test_render_latest_empty_track(mock_get_current_track, mock_run):
+    mock_get_current_track.return_value.positions = []
+    iss_interactor = IssInteractor(iss_track_adapter=MagicMock(),
+                                   iss_pos_service_instance=MagicMock(),
+                                   kml_template=None)
+
+    result = iss_interactor.render_latest()
+
+    mock_run.assert_called_once_with()
+
+    assert result == mock_run.return_value
+
+
+def test_ingest():
+    mock_adapter = MagicMock()
+    mock_iss_pos = MagicMock()
+    iss_interactor = IssInteractor(iss_track_adapter=mock_adapter,
+                                   iss_pos_service_instance=None,
+                                   kml_template=None)
+
+    result = iss_interactor.ingest(mock_iss_pos)
+
+    mock_adapter.append_position.assert_called_once_with(
+        IssInteractor.TRACK_ID, mock_iss_pos)
+
+    assert result == mock_adapter.append_position.return_value
+
+
+def test_make_kml_with_compiled_template():
+    template = '<p>{longitude},{latitude},{altitude}</p>' \
+               '<f>{footprint}</f><t>{track}</t><t>{track}</t>' \
+               '<y>{yt_iss_live}</y>'
+    iss_pos = IssPos(latitude=1.5, longitude=2.5, altitude=3.0, speed=4.0,
+                     footprint=5.0, timestamp=6)
+    plain = IssInteractor(MagicMock(), None, template)
+    compiled = IssInteractor(MagicMock(), None, KmlTemplate(template))
+
+    expected = plain._make_kml(iss_pos, 'f', 'track', 'yt')
+
+    assert compiled._make_kml(iss_pos, 'f', 'track', 'yt') == \
+        expected.encode('utf-8')
+
+
+def make_stored_track(tmp_path, size):
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+    adapter.positions_adapter.append_many(
+        IssInteractor.TRACK_ID,
+        [IssPos(latitude=-50 + t * 0.01, longitude=-170 + t * 0.05,
+                altitude=420000.0, speed=27600.0, footprint=4500.0,
+                timestamp=1684980256 + t * 5)
+         for t in range(size)])
+    return adapter
+
+
+@patch.object(IssInteractor, 'STREAM_BATCH_SIZE', 7)
+@patch.object(IssInteractor, 'MAX_TRACK_POINTS', 30)
+def test_stream_latest_matches_render_latest(tmp_path):
+    with open('templates/iss_kml_template.kml', 'r') as f:
+        template = KmlTemplate(f.read())
+    adapter = make_stored_track(tmp_path, 100)
+    iss_interactor = IssInteractor(adapter, MagicMock(), template)
+
+    chunks = list(iss_interactor.stream_latest())
+
+    assert b''.join(chunks) == iss_interactor.render_latest()
+    # track (duas vezes) em lotes de até 7 posições
+    track_chunks = [c for c in chunks if c.count(b' ') == 7]
+    assert len(track_chunks) == 8
+
+
+@patch.object(IssInteractor, 'render_latest')
+def test_stream_latest_empty_track(mock_render_latest, tmp_path):
+    adapter = make_stored_track(tmp_path, 0)
+    mock_render_latest.return_value = 'kml'
+    iss_interactor = IssInteractor(adapter, MagicMock(), '{track}')
+
+    assert list(iss_interactor.stream_latest()) == [b'kml']
+
+
+def test_simplified_track_coordinates():
+    mock_track = MagicMock()
+    iss_interactor = IssInteractor(MagicMock(), None, None, max_points=10,
+                                   tolerance=0.5)
+
+    result = iss_interactor._get_track_coordinates(mock_track)
+
+    mock_track.get_simplified_coordinates_kml.assert_called_once_with(
+        IssInteractor.MAX_TRACK_POINTS, 10, 0.5)
+    mock_track.get_track_coordinates_kml.assert_not_called()
+    assert result == mock_track.get_simplified_coordinates_kml.return_value
+
+
+def test_clipped_track_coordinates():
+    mock_track = MagicMock()
+    mock_track.get_clipped_coordinates_kml.return_value = ['1,2,3 ', '4,5,6 ']
+    bbox = BBox(-10, -10, 10, 10)
+    iss_interactor = IssInteractor(MagicMock(), None,
+                                   '<LineString>{track}</LineString>',
+                                   bbox=bbox)
+
+    result = iss_interactor._get_track_coordinates(mock_track)
+
+    assert iss_interactor.simplified
+    mock_track.get_clipped_coordinates_kml.assert_called_once_with(
+        bbox, IssInteractor.MAX_TRACK_POINTS, None, None)
+    assert result == Segments(['1,2,3 ', '4,5,6 '])
+    assert iss_interactor._make_kml(IssPos(1, 2, 3, 4, 5, 6), '', result,
+                                    '') == \
+        '<LineString>1,2,3 </LineString>\n<LineString>4,5,6 </LineString>'
+
+
+@patch.object(IssInteractor, 'MAX_TRACK_POINTS', 30)
+def test_render_at_timestamp(tmp_path):
+    adapter = make_stored_track(tmp_path, 100)
+    mock_service = MagicMock()
+    until = 1684980256 + 50 * 5 + 2
+    iss_interactor = IssInteractor(adapter, mock_service,
+                                   '{latitude} {track}', until=until)
+
+    kml = iss_interactor.run()
+
+    mock_service.get_pos.assert_not_called()
+    expected = adapter.get_track(IssInteractor.TRACK_ID, 30, until=until)
+    assert len(expected.positions) == 30
+    assert expected.positions[-1].timestamp == until - 2
+    assert kml == f'{expected.positions[-1].latitude} ' \
+        f'{expected.get_track_coordinates_kml()}'
+    assert adapter.latest_timestamp(IssInteractor.TRACK_ID) == \
+        1684980256 + 99 * 5
+
+
+@patch.object(IssInteractor, 'STREAM_BATCH_SIZE', 7)
+@patch.object(IssInteractor, 'MAX_TRACK_POINTS', 30)
+def test_stream_range_matches_render(tmp_path):
+    with open('templates/iss_kml_template.kml', 'r') as f:
+        template = KmlTemplate(f.read())
+    adapter = make_stored_track(tmp_path, 100)
+    iss_interactor = IssInteractor(adapter, MagicMock(), template,
+                                   since=1684980256 + 40 * 5,
+                                   until=1684980256 + 60 * 5)
+
+    kml = b''.join(iss_interactor.stream_latest())
+
+    assert kml == iss_interactor.render_latest()
+    assert kml.count(b'420000.0 ') == 2 * 21
+
+
+def test_render_empty_range(tmp_path):
+    adapter = make_stored_track(tmp_path, 10)
+    mock_service = MagicMock()
+    iss_interactor = IssInteractor(adapter, mock_service, '{track}',
+                                   until=1000)
+
+    assert iss_interactor.render_latest() is None
+    mock_service.get_pos.assert_not_called()
+
+
+def test_predicted_track():
+    mock_predictor = MagicMock()
+    iss_pos = IssPos(1, 2, 3, 4, 5, 1684980256)
+    iss_interactor = IssInteractor(MagicMock(), None, '{predicted_track}',
+                                   track_predictor=mock_predictor)
+
+    result = iss_interactor._get_predicted_coordinates(iss_pos)
+
+    mock_predictor.coordinates_kml.assert_called_once_with(1684980256)
+    assert result == mock_predictor.coordinates_kml.return_value
+
+    mock_predictor.coordinates_kml.side_effect = FileNotFoundError('tle')
+    assert iss_interactor._get_predicted_coordinates(iss_pos) == ''
+
+    iss_interactor.until = 1684980256
+    assert iss_interactor._get_predicted_coordinates(iss_pos) == ''
+
+
+@patch.object(IssInteractor, 'MAX_TRACK_POINTS', 30)
+@patch.object(IssInteractor, 'MAX_WINDOW_POINTS', 80)
+@pytest.mark.parametrize('max_points, window, rendered', [
+    (None, 30, 30), (10, 30, 10), (50, 50, 50), (1000, 80, 80)])
+def test_window_follows_max_points(tmp_path, max_points, window, rendered):
+    adapter = make_stored_track(tmp_path, 100)
+    iss_interactor = IssInteractor(adapter, MagicMock(), '{track}',
+                                   max_points=max_points)
+
+    kml = iss_interactor.render_latest()
+
+    assert iss_interactor.window == window
+    assert kml.count(' ') == rendered
+
+
+@patch.object(IssInteractor, 'STREAM_BATCH_SIZE', 7)
+@patch.object(IssInteractor, 'MAX_TRACK_POINTS', 30)
+@patch.object(IssInteractor, 'MAX_WINDOW_POINTS', 80)
+@pytest.mark.parametrize('max_points, streamed', [(50, 50), (1000, 80)])
+def test_stream_requested_window(tmp_path, max_points, streamed):
+    with open('templates/iss_kml_template.kml', 'r') as f:
+        template = KmlTemplate(f.read())
+    adapter = make_stored_track(tmp_path, 100)
+    iss_interactor = IssInteractor(adapter, MagicMock(), template,
+                                   max_points=max_points)
+
+    chunks = list(iss_interactor.stream_latest())
+
+    assert not iss_interactor.simplified
+    assert len(chunks) > 3
+    assert b''.join(chunks) == iss_interactor.render_latest()
+    assert b''.join(chunks).count(b'420000.0 ') == 2 * streamed
+
+
+@patch.object(IssInteractor, 'MAX_TRACK_POINTS', 30)
+@patch.object(IssInteractor, 'MAX_WINDOW_POINTS', 80)
+@pytest.mark.parametrize('since, rendered', [(1684980256, 80),
+                                             (1684980256 + 50 * 5, 50)])
+def test_range_reads_the_whole_range(tmp_path, since, rendered):
+    adapter = make_stored_track(tmp_path, 100)
+    iss_interactor = IssInteractor(adapter, MagicMock(), '{track}',
+                                   since=since)
+
+    kml = iss_interactor.render_latest()
+
+    assert iss_interactor.window == 80
+    assert kml.count(' ') == rendered
+
+
+@patch.object(IssInteractor, 'MAX_TRACK_POINTS', 30)
+def test_render_as_of_ignores_newer_positions(tmp_path):
+    adapter = make_stored_track(tmp_path, 100)
+    mock_predictor = MagicMock()
+    mock_predictor.coordinates_kml.return_value = 'predicted'
+    as_of = adapter.latest_timestamp(IssInteractor.TRACK_ID)
+    iss_interactor = IssInteractor(adapter, MagicMock(),
+                                   '{latitude} {predicted_track}',
+                                   as_of=as_of,
+                                   track_predictor=mock_predictor)
+    expected = iss_interactor.render_latest()
+    # o poller grava uma posição depois de o ETag ser calculado
+    adapter.append_position(
+        IssInteractor.TRACK_ID,
+        IssPos(latitude=10.0, longitude=20.0, altitude=420000.0,
+               speed=27600.0, footprint=4500.0, timestamp=as_of + 5))
+
+    assert iss_interactor.render_latest() == expected
+    assert b''.join(iss_interactor.stream_latest()) == expected.encode()
+    assert expected.endswith(' predicted')
+    mock_predictor.coordinates_kml.assert_called_with(as_of)
+
+
+@patch.object(IssInteractor, 'MAX_TRACK_POINTS', 30)
+def test_render_extrapolated_position(tmp_path):
+    with open('templates/iss_kml_template.kml', 'r') as f:
+        template = KmlTemplate(f.read())
+    adapter = make_stored_track(tmp_path, 100)
+    last = adapter.get_track(IssInteractor.TRACK_ID, 2).positions
+    iss_interactor = IssInteractor(adapter, MagicMock(), '{latitude} {track}',
+                                   extrapolate_to=last[-1].timestamp + 10)
+
+    latitude, track = iss_interactor.render_latest().split(' ', 1)
+
+    expected = extrapolate(last[-2], last[-1], last[-1].timestamp + 10)
+    assert float(latitude) == approx(expected.latitude)
+    assert float(latitude) > last[-1].latitude
+    assert track == adapter.get_track(
+        IssInteractor.TRACK_ID, 30).get_track_coordinates_kml()
+    assert adapter.latest_timestamp(IssInteractor.TRACK_ID) == \
+        last[-1].timestamp
+
+    iss_interactor.kml_template = template
+    assert b''.join(iss_interactor.stream_latest()) == \
+        iss_interactor.render_latest()
+
+    iss_interactor.kml_template = '{latitude}'
+    iss_interactor.until = last[-1].timestamp
+    assert float(iss_interactor.render_latest()) == last[-1].latitude
+
+
+@pytest.mark.parametrize('size, ring', [(5, True), (1, False)])
+def test_yt_iss_live_of_a_short_range(tmp_path, size, ring):
+    adapter = make_stored_track(tmp_path, 100)
+    since = 1684980256 + 50 * 5
+    iss_interactor = IssInteractor(adapter, MagicMock(), '{yt_iss_live}',
+                                   since=since, until=since + (size - 1) * 5)
+
+    kml = iss_interactor.render_latest()
+
+    assert kml.count(',0 ') == (5 if ring else 0)
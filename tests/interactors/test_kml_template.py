@@ -0,0 +1,101 @@
+from io import BytesIO
+
+import pytest
+
+from iss_kml.interactors import KmlTemplate, Segments
+from iss_kml.interactors.kml_template import Slot
+
+VALUES = dict(latitude=-23.5,
+              longitude=-46.625,
+              altitude=420000.0,
+              footprint='1.0,2.0,0 3.0,4.0,0 ',
+              track='-46.6,-23.5,420000.0 -46.5,-23.4,420000.0 ',
+              yt_iss_live='5.0,6.0,0 ',
+              predicted_track='7.0,8.0,0 9.0,10.0,0 ')
+
+
+@pytest.fixture(scope='module')
+def template():
+    with open('templates/iss_kml_template.kml', 'r') as f:
+        return f.read()
+
+
+def test_render_matches_str_format(template):
+    kml_template = KmlTemplate(template)
+
+    assert kml_template.render(**VALUES) == \
+        template.format(**VALUES).encode('utf-8')
+    assert kml_template.format(**VALUES) == template.format(**VALUES)
+
+
+def test_compile_segments(template):
+    kml_template = KmlTemplate(template)
+
+    assert kml_template.fields == set(VALUES)
+    assert kml_template.segments.count(Slot('track')) == 2
+    for first, second in zip(kml_template.segments,
+                             kml_template.segments[1:]):
+        assert not (isinstance(first, bytes) and isinstance(second, bytes))
+
+
+def test_track_is_encoded_once(template):
+    kml_template = KmlTemplate(template)
+    encoded = []
+
+    class Track(str):
+        def __format__(self, format_spec):
+            encoded.append(format_spec)
+            return super().__format__(format_spec)
+
+    kml_template.render(**dict(VALUES, track=Track(VALUES['track'])))
+
+    assert len(encoded) == 1
+
+
+def test_render_into_buffer():
+    buffer = BytesIO(b'<?xml?>')
+    buffer.seek(0, 2)
+
+    KmlTemplate('<a>{x}</a>').render_into(buffer, x=b'bytes')
+
+    assert buffer.getvalue() == b'<?xml?><a>bytes</a>'
+
+
+@pytest.mark.parametrize('template', [
+    '{{literal}} {x} {x!r} {y:>6.2f} çã',
+    'sem campos',
+    '{x}{y}',
+])
+def test_format_semantics(template):
+    values = dict(x='valor', y=3.14159)
+
+    assert KmlTemplate(template).format(**values) == template.format(**values)
+
+
+@pytest.mark.parametrize('template', ['{}', '{0}', '{a.b}', '{a[0]}',
+                                      '{a:{b}}'])
+def test_unsupported_fields(template):
+    with pytest.raises(ValueError):
+        KmlTemplate(template)
+
+
+def test_missing_value():
+    with pytest.raises(KeyError):
+        KmlTemplate('{x}').render()
+
+
+def test_segments_repeat_the_line_string(template):
+    values = dict(VALUES, track=Segments(['1,2,3 ', '4,5,6 ']))
+
+    kml = KmlTemplate(template).format(**values)
+
+    single = template.format(**dict(VALUES, track='1,2,3 '))
+    assert kml.count('<LineString>') == single.count('<LineString>') + 2
+    assert kml.count('<coordinates>') == single.count('<coordinates>') + 2
+    assert '\t\t\t\t\t4,5,6 \n\t\t\t\t</coordinates>\n\t\t\t</LineString>' \
+        '\n\t\t</MultiGeometry>' in kml
+
+
+def test_segments_outside_an_element():
+    with pytest.raises(ValueError):
+        KmlTemplate('<a>{track}</a>').render(track=Segments(['1', '2']))
@@ -0,0 +1,64 @@
+import math
+
+import numpy as np
+import pytest
+from pytest import approx
+
+from iss_kml.domain.geodesy import SPHERE_RADIUS_KM, final_bearings
+from iss_kml.services.basic_iss_pos_service import IssPos
+from iss_kml.services.dead_reckoning import (EARTH_ROTATION_RAD_PER_HOUR,
+                                             extrapolate)
+
+PERIOD_SECONDS = 5560.0
+ALTITUDE_KM = 420.0
+SPEED = 2 * math.pi * (SPHERE_RADIUS_KM + ALTITUDE_KM) / PERIOD_SECONDS * 3600
+
+
+def orbit(timestamp):
+    """
+    Posição de uma órbita circular com a inclinação da ISS, sob a Terra em
+    rotação
+    """
+    u = 2 * math.pi * timestamp / PERIOD_SECONDS + 1.0
+    inclination = math.radians(51.6)
+    latitude = math.degrees(math.asin(math.sin(inclination) * math.sin(u)))
+    longitude = math.degrees(math.atan2(math.cos(inclination) * math.sin(u),
+                                        math.cos(u)))
+    longitude -= math.degrees(EARTH_ROTATION_RAD_PER_HOUR * timestamp / 3600)
+    return IssPos(latitude, (longitude + 180) % 360 - 180,
+                  ALTITUDE_KM * 1000, SPEED, 4500.0, timestamp)
+
+
+def distance_km(a: IssPos, b: IssPos):
+    phi1, phi2 = math.radians(a.latitude), math.radians(b.latitude)
+    cos_angle = math.sin(phi1) * math.sin(phi2) + \
+        math.cos(phi1) * math.cos(phi2) * \
+        math.cos(math.radians(a.longitude - b.longitude))
+    return SPHERE_RADIUS_KM * math.acos(min(1.0, cos_angle))
+
+
+def test_final_bearings():
+    assert final_bearings(0, 0, 0, 10) == approx(90)
+    assert final_bearings(0, 10, 0, 0) == approx(270)
+    assert final_bearings(-10, 0, 10, 0) == approx(0)
+    assert np.shape(final_bearings([0, 0], [0, 0], [1, 0], [0, 1])) == (2,)
+
+
+@pytest.mark.parametrize('elapsed, tolerance_km', [(5, 0.05), (30, 0.5)])
+def test_extrapolate_follows_the_orbit(elapsed, tolerance_km):
+    for start in range(0, 5560, 500):
+        previous, last = orbit(start), orbit(start + 5)
+
+        estimated = extrapolate(previous, last, start + 5 + elapsed)
+
+        assert estimated.timestamp == start + 5 + elapsed
+        assert distance_km(estimated, orbit(start + 5 + elapsed)) < \
+            tolerance_km
+
+
+def test_extrapolate_without_heading():
+    last = orbit(5)
+
+    assert extrapolate(None, last, 10) is last
+    assert extrapolate(orbit(0), last, 5) is last
+    assert extrapolate(last, last, 10) is last
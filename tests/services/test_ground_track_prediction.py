@@ -0,0 +1,67 @@
+import shutil
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from iss_kml.domain.orbit import MICROSECONDS, KeplerPropagator
+from iss_kml.services import GroundTrackPredictor, TlePropagationService
+from iss_kml.services.ground_track_prediction import PredictedTrack
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+TLE_EPOCH = 1221913540
+
+
+@pytest.fixture
+def tle_service(tmp_path):
+    path = tmp_path / 'iss_tle.txt'
+    shutil.copy(FIXTURES / 'iss_tle.txt', path)
+    return TlePropagationService(str(path))
+
+
+def points(coordinates):
+    return [tuple(map(float, point.split(',')))
+            for point in coordinates.split()]
+
+
+def test_predicted_track_covers_the_orbits(tle_service):
+    predictor = GroundTrackPredictor(tle_service, orbits=2, step_seconds=30,
+                                     epoch_seconds=600)
+    epoch = TLE_EPOCH - TLE_EPOCH % 600
+
+    coordinates = predictor.coordinates_kml(epoch + 45)
+
+    period = 86400 / tle_service.tle.mean_motion
+    predicted = points(coordinates)
+    assert len(predicted) == predictor.points(tle_service.tle)
+    assert (len(predicted) - 1) * 30 >= 2 * period
+    first = KeplerPropagator(tle_service.tle).propagate(
+        (epoch + 60) * MICROSECONDS)
+    assert predicted[0] == (float(first.longitude), float(first.latitude),
+                            0.0)
+
+
+def test_predicted_track_is_cached_per_epoch(tle_service):
+    predictor = GroundTrackPredictor(tle_service, step_seconds=30,
+                                     epoch_seconds=600)
+    epoch = TLE_EPOCH - TLE_EPOCH % 600
+
+    with patch.object(predictor, '_predict',
+                      wraps=predictor._predict) as mock_predict:
+        first = predictor.coordinates_kml(epoch)
+        later = predictor.coordinates_kml(epoch + 90)
+        next_epoch = predictor.coordinates_kml(epoch + 600)
+
+    assert mock_predict.call_count == 2
+    assert points(later) == points(first)[3:] + points(later)[-3:]
+    assert points(next_epoch)[:5] == points(first)[20:25]
+
+
+def test_predicted_track_slice():
+    track = PredictedTrack(start=100, step=10, text='a b c d ',
+                           offsets=[0, 2, 4, 6, 8])
+
+    assert track.coordinates_kml(100, 2) == 'a b '
+    assert track.coordinates_kml(101, 2) == 'b c '
+    assert track.coordinates_kml(50, 10) == 'a b c d '
+    assert track.coordinates_kml(500, 2) == ''
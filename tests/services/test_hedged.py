@@ -0,0 +1,235 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from pytest import approx
+
+from iss_kml.services import HedgedIssPosService, LatencyHistogram
+from iss_kml.services.basic_iss_pos_service import (BasicIssPosService,
+                                                    IssPos)
+from iss_kml.services.hedged import InvalidPositionError
+
+
+def iss_pos(latitude=10.0, longitude=20.0, timestamp=1000):
+    return IssPos(latitude, longitude, 420000.0, 27600.0, 4500.0, timestamp)
+
+
+class Provider(BasicIssPosService):
+    def __init__(self, result=None, delay=0.0, error=None):
+        super().__init__()
+        self.result = result if result is not None else iss_pos()
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def get_pos(self):
+        self.calls += 1
+        self.release.wait(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class Slow(Provider):
+    pass
+
+
+class Fast(Provider):
+    pass
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(0.5) is None
+
+    for _ in range(90):
+        histogram.record(0.010)
+    for _ in range(10):
+        histogram.record(1.0)
+
+    assert histogram.percentile(0.5) == approx(0.010)
+    assert histogram.percentile(0.9) == approx(0.010)
+    assert histogram.percentile(0.95) == approx(1.0)
+    assert histogram.percentile(1.0) == approx(1.0)
+
+
+def test_latency_histogram_bucket_upper_bound_and_limits():
+    histogram = LatencyHistogram()
+
+    histogram.record(0.0105)
+    assert 0.0105 <= histogram.percentile(0.5) < 0.0105 * 10 ** 0.1
+
+    histogram.record(1000)
+    assert histogram.percentile(1.0) == approx(LatencyHistogram.MAX_SECONDS)
+
+
+def test_latency_histogram_decays_old_samples():
+    histogram = LatencyHistogram()
+    for _ in range(LatencyHistogram.DECAY_SAMPLES - 1):
+        histogram.record(1.0)
+
+    histogram.record(1.0)
+
+    assert histogram.count == LatencyHistogram.DECAY_SAMPLES // 2
+    for _ in range(histogram.count + 1):
+        histogram.record(0.010)
+    assert histogram.percentile(0.5) == approx(0.010)
+
+
+def test_hedged_returns_the_first_provider_when_it_is_fast():
+    first, second = Fast(iss_pos(1.0)), Slow(iss_pos(2.0))
+    service = HedgedIssPosService([first, second], default_hedge_delay=1.0)
+
+    assert service.get_pos().latitude == 1.0
+    assert second.calls == 0
+    assert service.stats()['Fast'].wins == 1
+
+
+def test_hedged_calls_the_next_provider_after_the_hedge_delay():
+    first, second = Slow(iss_pos(1.0), delay=5), Fast(iss_pos(2.0))
+    service = HedgedIssPosService([first, second], default_hedge_delay=0.05)
+
+    start = time.monotonic()
+    result = service.get_pos()
+    elapsed = time.monotonic() - start
+    first.release.set()
+
+    assert result.latitude == 2.0
+    assert 0.05 <= elapsed < 1
+    stats = service.stats()
+    assert stats['Fast'].wins == 1
+    assert stats['Slow'].wins == 0
+
+
+def test_hedged_calls_the_next_provider_as_soon_as_one_fails():
+    first = Slow(error=ConnectionError('down'))
+    second = Fast(iss_pos(2.0))
+    service = HedgedIssPosService([first, second], default_hedge_delay=5)
+
+    start = time.monotonic()
+    assert service.get_pos().latitude == 2.0
+    assert time.monotonic() - start < 1
+    assert service.stats()['Slow'].errors == 1
+
+
+def test_hedged_uses_the_latency_percentile_as_hedge_delay():
+    first, second = Fast(delay=0.02), Slow(iss_pos(2.0))
+    service = HedgedIssPosService([first, second], default_hedge_delay=5,
+                                  hedge_percentile=0.9)
+    for _ in range(HedgedIssPosService.MIN_SAMPLES - 1):
+        service.get_pos()
+    assert service.stats()['Fast'].hedge_delay == 5
+
+    service.get_pos()
+
+    assert 0.02 <= service.stats()['Fast'].hedge_delay < 0.1
+    assert second.calls == 0
+
+
+def test_hedged_late_answers_still_feed_the_histogram():
+    first, second = Slow(iss_pos(1.0), delay=5), Fast(iss_pos(2.0))
+    service = HedgedIssPosService([first, second], default_hedge_delay=0.01)
+
+    service.get_pos()
+    first.release.set()
+    service._executor.shutdown(wait=True)
+
+    stats = service.stats()
+    assert stats['Slow'].calls == 1
+    assert stats['Slow'].p50 is not None
+
+
+def test_hedged_routes_failing_providers_to_the_end():
+    first = Slow(error=ConnectionError('down'))
+    second = Fast(iss_pos(2.0))
+    service = HedgedIssPosService([first, second])
+    for _ in range(HedgedIssPosService.FAILURE_THRESHOLD):
+        service.get_pos()
+
+    service.get_pos()
+
+    assert first.calls == HedgedIssPosService.FAILURE_THRESHOLD
+    assert second.calls == HedgedIssPosService.FAILURE_THRESHOLD + 1
+
+
+@pytest.mark.parametrize('invalid', [iss_pos(latitude=float('nan')),
+                                     iss_pos(longitude=200.0),
+                                     iss_pos(timestamp=100)])
+def test_hedged_skips_invalid_positions(invalid):
+    first, second = Fast(invalid), Slow(iss_pos(2.0))
+    service = HedgedIssPosService([first, second], max_age=60,
+                                  clock=lambda: 1000)
+
+    assert service.get_pos().latitude == 2.0
+    assert service.stats()['Fast'].errors == 1
+
+
+def test_hedged_raises_the_last_error_when_every_provider_fails():
+    service = HedgedIssPosService([Slow(error=ConnectionError('slow')),
+                                   Fast(error=TimeoutError('fast'))])
+
+    with pytest.raises(TimeoutError, match='fast'):
+        service.get_pos()
+
+
+def test_hedged_raises_timeout_when_no_provider_answers():
+    providers = [Slow(delay=5), Fast(delay=5)]
+    service = HedgedIssPosService(providers, default_hedge_delay=0.01,
+                                  timeout=0.1)
+
+    with pytest.raises(TimeoutError, match='no position'):
+        service.get_pos()
+    for provider in providers:
+        provider.release.set()
+
+
+def test_hedged_invalid_position_error():
+    service = HedgedIssPosService([MagicMock()])
+
+    with pytest.raises(InvalidPositionError):
+        service._validate(iss_pos(latitude=91.0))
+
+
+def test_hedged_requires_providers():
+    with pytest.raises(ValueError):
+        HedgedIssPosService([])
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_hedged_probes_demoted_providers_until_they_recover():
+    first = Slow(iss_pos(1.0), error=ConnectionError('down'))
+    second = Fast(iss_pos(2.0))
+    service = HedgedIssPosService([first, second], probe_interval=0.05)
+    for _ in range(HedgedIssPosService.FAILURE_THRESHOLD):
+        service.get_pos()
+
+    first.error = None
+    assert service.get_pos().latitude == 2.0
+    assert first.calls == HedgedIssPosService.FAILURE_THRESHOLD
+
+    time.sleep(0.06)
+    assert service.get_pos().latitude == 2.0
+    wait_until(lambda: service.stats()['Slow'].consecutive_errors == 0)
+
+    assert service.get_pos().latitude == 1.0
+    assert first.calls == HedgedIssPosService.FAILURE_THRESHOLD + 2
+
+
+def test_hedged_probes_at_most_once_per_interval():
+    first = Slow(error=ConnectionError('down'))
+    service = HedgedIssPosService([first, Fast()], probe_interval=60)
+    for _ in range(HedgedIssPosService.FAILURE_THRESHOLD):
+        service.get_pos()
+
+    for _ in range(20):
+        service.get_pos()
+
+    assert first.calls == HedgedIssPosService.FAILURE_THRESHOLD
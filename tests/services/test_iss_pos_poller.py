@@ -0,0 +1,77 @@
+import time
+from unittest.mock import MagicMock
+
+from iss_kml.services import IssPosPoller
+
+
+def test_poll_once_notifies_listeners():
+    mock_service = MagicMock()
+    mock_listener = MagicMock()
+    poller = IssPosPoller(mock_service, interval=1)
+    poller.add_listener(mock_listener)
+
+    result = poller.poll_once()
+
+    mock_service.get_pos.assert_called_once_with()
+    mock_listener.assert_called_once_with(mock_service.get_pos.return_value)
+
+    assert result == mock_service.get_pos.return_value
+    assert poller.latest == mock_service.get_pos.return_value
+    assert poller.last_poll_time is not None
+
+
+def test_poll_once_keeps_last_position_on_error():
+    mock_service = MagicMock()
+    mock_logger = MagicMock()
+    poller = IssPosPoller(mock_service, interval=1, logger=mock_logger)
+    first = poller.poll_once()
+    mock_service.get_pos.side_effect = ValueError('boom')
+
+    result = poller.poll_once()
+
+    mock_logger.error.assert_called_once_with(
+        'Error polling position: ValueError(boom)')
+
+    assert result is None
+    assert poller.latest == first
+
+
+def test_listener_error_does_not_stop_others():
+    mock_service = MagicMock()
+    failing_listener = MagicMock(side_effect=ValueError('boom'))
+    mock_listener = MagicMock()
+    poller = IssPosPoller(mock_service, interval=1, logger=MagicMock())
+    poller.add_listener(failing_listener)
+    poller.add_listener(mock_listener)
+
+    poller.poll_once()
+
+    mock_listener.assert_called_once_with(mock_service.get_pos.return_value)
+
+
+def test_start_and_stop():
+    mock_service = MagicMock()
+    poller = IssPosPoller(mock_service, interval=0.01)
+
+    poller.start()
+    deadline = time.monotonic() + 2
+    while mock_service.get_pos.call_count < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    poller.stop(timeout=2)
+
+    assert mock_service.get_pos.call_count >= 3
+    assert not poller.is_running
+
+
+def test_single_leader_per_lock(tmp_path):
+    lock_path = str(tmp_path / 'poller.lock')
+    leader = IssPosPoller(MagicMock(), interval=1, lock_path=lock_path)
+    follower = IssPosPoller(MagicMock(), interval=1, lock_path=lock_path)
+
+    assert leader.is_leader()
+    assert not follower.is_leader()
+
+    leader._release_leadership()
+
+    assert follower.is_leader()
+    follower._release_leadership()
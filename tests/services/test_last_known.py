@@ -0,0 +1,39 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from iss_kml.services import LastKnownIssPosService
+from iss_kml.services.basic_iss_pos_service import IssPos
+
+
+def iss_pos(timestamp=1000):
+    return IssPos(10.0, 20.0, 420000.0, 27600.0, 4500.0, timestamp)
+
+
+def test_last_known_remembers_positions(tmp_path):
+    path = str(tmp_path / 'last.json')
+    iss_pos_service = MagicMock()
+    iss_pos_service.get_pos.return_value = iss_pos()
+    service = LastKnownIssPosService(iss_pos_service, path)
+
+    assert service.get_pos() == iss_pos()
+    assert LastKnownIssPosService(path=path).get_pos() == iss_pos()
+
+
+def test_last_known_falls_back_on_any_error(tmp_path):
+    path = str(tmp_path / 'last.json')
+    iss_pos_service = MagicMock()
+    service = LastKnownIssPosService(iss_pos_service, path)
+    iss_pos_service.get_pos.return_value = iss_pos()
+    service.get_pos()
+
+    iss_pos_service.get_pos.side_effect = OSError('read timed out')
+
+    assert service.get_pos() == iss_pos()
+
+
+def test_last_known_without_position(tmp_path):
+    service = LastKnownIssPosService(path=str(tmp_path / 'last.json'))
+
+    with pytest.raises(FileNotFoundError):
+        service.get_pos()
@@ -0,0 +1,79 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from iss_kml.services import SingleFlightIssPosService
+from iss_kml.services.single_flight import SingleFlight, SingleFlightStats
+
+
+def test_concurrent_calls_share_one_execution():
+    single_flight = SingleFlight()
+    release = threading.Event()
+    fn = MagicMock(side_effect=lambda: release.wait() and 42)
+    results = []
+
+    def worker():
+        results.append(single_flight.do('key', fn))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while single_flight.stats()['key'].calls < 5:
+        pass
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    fn.assert_called_once_with()
+
+    assert results == [42] * 5
+    assert single_flight.stats() == {
+        'key': SingleFlightStats(calls=5, executions=1, coalesced=4)}
+
+
+def test_result_shared_within_window():
+    single_flight = SingleFlight(window=60)
+    fn = MagicMock(return_value=42)
+
+    assert single_flight.do('key', fn) == 42
+    assert single_flight.do('key', fn) == 42
+    assert single_flight.do('other', fn) == 42
+
+    assert fn.call_count == 2
+    assert single_flight.stats()['key'].coalesced == 1
+
+
+def test_result_not_shared_after_window():
+    single_flight = SingleFlight(window=0)
+    fn = MagicMock(return_value=42)
+
+    single_flight.do('key', fn)
+    single_flight.do('key', fn)
+
+    assert fn.call_count == 2
+    assert single_flight.stats()['key'].coalesced == 0
+
+
+def test_errors_are_not_cached():
+    single_flight = SingleFlight(window=60)
+    fn = MagicMock(side_effect=[ValueError('boom'), 42])
+
+    with pytest.raises(ValueError):
+        single_flight.do('key', fn)
+
+    assert single_flight.do('key', fn) == 42
+
+
+def test_single_flight_iss_pos_service():
+    mock_service = MagicMock()
+    service = SingleFlightIssPosService(mock_service, window=60)
+
+    first = service.get_pos()
+    second = service.get_pos()
+
+    mock_service.get_pos.assert_called_once_with()
+
+    assert first == second == mock_service.get_pos.return_value
+    assert service.stats() == {
+        'MagicMock': SingleFlightStats(calls=2, executions=1, coalesced=1)}
@@ -0,0 +1,181 @@
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from iss_kml.domain.orbit import MICROSECONDS
+from iss_kml.services import TlePropagationService, WhereTheIssAt
+from iss_kml.services.basic_iss_pos_service import IssPos
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+TLE_EPOCH = 1221913540.104192
+
+
+@pytest.fixture
+def tle_path(tmp_path):
+    path = tmp_path / 'iss_tle.txt'
+    shutil.copy(FIXTURES / 'iss_tle.txt', path)
+    return str(path)
+
+
+def test_get_pos(tle_path):
+    service = TlePropagationService(tle_path, clock=lambda: TLE_EPOCH + 60)
+
+    iss_pos = service.get_pos()
+
+    assert isinstance(iss_pos, IssPos)
+    assert iss_pos.timestamp == int(TLE_EPOCH + 60)
+    assert -52 < iss_pos.latitude < 52
+    assert 340_000 < iss_pos.altitude < 380_000
+    assert service.tle.catalog_number == 25544
+
+
+def test_get_positions_in_batch(tle_path):
+    service = TlePropagationService(tle_path)
+    timestamps = int(TLE_EPOCH * MICROSECONDS) + \
+        np.arange(0, 600) * 1_500_000
+
+    positions = service.get_positions(timestamps)
+    columns = service.propagate(timestamps)
+
+    assert len(positions) == 600
+    assert [p.timestamp for p in positions[:3]] == \
+        [int(TLE_EPOCH), int(TLE_EPOCH) + 1, int(TLE_EPOCH) + 3]
+    assert [p.latitude for p in positions] == columns.latitude.tolist()
+    assert positions[10] == service.get_positions(timestamps[10])[0]
+
+
+def test_missing_tle(tmp_path):
+    service = TlePropagationService(str(tmp_path / 'missing.txt'))
+
+    with pytest.raises(FileNotFoundError):
+        service.get_pos()
+
+
+def test_refresh_from_source(tmp_path):
+    tle_path = str(tmp_path / 'iss_tle.txt')
+    text = (FIXTURES / 'iss_tle.txt').read_text()
+    tle_source = MagicMock(return_value=text)
+    clock = MagicMock(return_value=TLE_EPOCH)
+    service = TlePropagationService(tle_path, tle_source=tle_source,
+                                    refresh_interval=3600, clock=clock)
+
+    service.get_pos()
+    clock.return_value = TLE_EPOCH + 1800
+    service.get_pos()
+
+    assert tle_source.call_count == 1
+    assert Path(tle_path).read_text() == text
+
+    clock.return_value = TLE_EPOCH + 3600
+    service.get_pos()
+    service.wait_for_refresh()
+
+    assert tle_source.call_count == 2
+
+
+def test_refresh_error_keeps_cached_tle(tle_path):
+    os.utime(tle_path, (0, 0))
+    tle_source = MagicMock(side_effect=[ValueError('boom'), 'garbage'])
+    clock = MagicMock(return_value=TLE_EPOCH)
+    service = TlePropagationService(tle_path, tle_source=tle_source,
+                                    refresh_interval=3600, clock=clock)
+
+    first = service.get_pos()
+    service.wait_for_refresh()
+    clock.return_value = TLE_EPOCH + 3600
+    second = service.get_pos()
+    service.wait_for_refresh()
+
+    assert tle_source.call_count == 2
+    assert first.timestamp < second.timestamp
+    assert 'ISS (ZARYA)' in Path(tle_path).read_text()
+
+
+def test_first_fetch_failure_is_retried(tmp_path):
+    tle_path = str(tmp_path / 'iss_tle.txt')
+    text = (FIXTURES / 'iss_tle.txt').read_text()
+    tle_source = MagicMock(side_effect=[OSError('timeout'), text])
+    clock = MagicMock(return_value=TLE_EPOCH)
+    service = TlePropagationService(tle_path, tle_source=tle_source,
+                                    retry_interval=60, clock=clock)
+
+    with pytest.raises(FileNotFoundError):
+        service.get_pos()
+    clock.return_value = TLE_EPOCH + 60
+
+    assert service.get_pos().timestamp == int(TLE_EPOCH + 60)
+    assert tle_source.call_count == 2
+
+
+def test_no_fetch_before_retry_interval_without_cache(tmp_path):
+    tle_source = MagicMock(side_effect=OSError('timeout'))
+    clock = MagicMock(return_value=TLE_EPOCH)
+    service = TlePropagationService(str(tmp_path / 'iss_tle.txt'),
+                                    tle_source=tle_source,
+                                    retry_interval=60, clock=clock)
+
+    for elapsed in (0, 1, 59, 60, 61):
+        clock.return_value = TLE_EPOCH + elapsed
+        with pytest.raises(FileNotFoundError):
+            service.get_pos()
+        with pytest.raises(FileNotFoundError):
+            service.propagate(0)
+
+    assert tle_source.call_count == 2
+
+
+def test_failed_refresh_is_retried_after_retry_interval(tle_path):
+    os.utime(tle_path, (0, 0))
+    tle_source = MagicMock(side_effect=OSError('timeout'))
+    clock = MagicMock(return_value=TLE_EPOCH)
+    service = TlePropagationService(tle_path, tle_source=tle_source,
+                                    retry_interval=60, clock=clock)
+
+    for elapsed in (0, 30, 59, 60):
+        clock.return_value = TLE_EPOCH + elapsed
+        service.get_pos()
+        service.wait_for_refresh()
+
+    assert tle_source.call_count == 2
+
+
+def test_refresh_does_not_block_positions(tle_path):
+    os.utime(tle_path, (0, 0))
+    release = threading.Event()
+    text = (FIXTURES / 'iss_tle.txt').read_text()
+
+    def slow_source():
+        release.wait(5)
+        return text
+
+    service = TlePropagationService(tle_path, tle_source=slow_source,
+                                    clock=lambda: TLE_EPOCH)
+
+    start = time.monotonic()
+    service.get_pos()
+    assert service.tle.catalog_number == 25544
+    elapsed = time.monotonic() - start
+    release.set()
+    service.wait_for_refresh()
+
+    assert elapsed < 1
+    assert os.path.getmtime(tle_path) > 0
+
+
+@patch('iss_kml.services.wheretheiss.requests')
+def test_where_the_iss_tle(mock_requests, tle_path):
+    response = json.loads((FIXTURES / 'wheretheiss_tle.json').read_text())
+    mock_requests.get.return_value.json.return_value = response
+
+    text = WhereTheIssAt().get_tle()
+
+    mock_requests.get.assert_called_once_with(WhereTheIssAt.TLE_URL,
+                                              timeout=5)
+    assert text == Path(tle_path).read_text()
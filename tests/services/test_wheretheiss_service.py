@@ -1,5 +1,7 @@
 from unittest.mock import patch
 
+import pytest
+
 from iss_kml.services import WhereTheIssAt
 from iss_kml.services.basic_iss_pos_service import IssPos
 
@@ -33,3 +35,12 @@ def test_where_the_iss_service(mock_api_data_cls, mock_iss_pos, mock_requests):
     )
 
     assert result == mock_iss_pos.return_value
+
+
+@patch(prefixed('requests'))
+def test_where_the_iss_service_raises_request_errors(mock_requests):
+    mock_requests.get.return_value.raise_for_status.side_effect = \
+        OSError('503 Service Unavailable')
+
+    with pytest.raises(OSError):
+        WhereTheIssAt().get_pos()
@@ -0,0 +1,107 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import app
+from iss_kml.adapters.iss_track_adapter import IssTrackAdapter
+from iss_kml.compression import RenderCache
+from iss_kml.interactors import IssInteractor
+from iss_kml.services.basic_iss_pos_service import IssPos
+from iss_kml.settings import Settings
+
+
+@pytest.fixture
+def track_start(tmp_path):
+    """
+    Track de 100 posições, a cada 5 s, terminando agora, num banco novo
+    """
+    start = int(time.time()) - 99 * 5
+    adapter = IssTrackAdapter(str(tmp_path / 'iss.db'))
+    adapter.positions_adapter.append_many(
+        IssInteractor.TRACK_ID,
+        [IssPos(latitude=-50 + t * 0.01, longitude=-170 + t * 0.05,
+                altitude=420000.0, speed=27600.0, footprint=4500.0,
+                timestamp=start + t * 5)
+         for t in range(100)])
+    return start
+
+
+@pytest.fixture
+def client(tmp_path, track_start):
+    predictor = MagicMock()
+    predictor.coordinates_kml.return_value = '1.5,2.5,420000.0 '
+    with patch.object(Settings, 'DB_PATH', str(tmp_path / 'iss.db')), \
+            patch.object(Settings, 'STREAM_KML', False), \
+            patch.object(Settings, 'DEAD_RECKONING_STEP_SECONDS', None), \
+            patch.object(app, 'get_poller'), \
+            patch.object(app, 'get_track_predictor',
+                         return_value=predictor), \
+            patch.object(app, 'get_render_cache',
+                         return_value=RenderCache(max_entries=8)):
+        yield app.app.test_client()
+
+
+def test_historical_render_does_not_answer_live(client, track_start):
+    future = track_start + 99 * 5 + 1000
+
+    historical = client.get(f'/iss?at={future}')
+    live = client.get('/iss')
+
+    assert b'1.5,2.5,420000.0' not in historical.data
+    assert b'1.5,2.5,420000.0' in live.data
+    assert live.headers['ETag'] != historical.headers['ETag']
+    revalidated = client.get('/iss', headers={
+        'If-None-Match': historical.headers['ETag']})
+    assert revalidated.status_code == 200
+
+
+def test_short_range(client, track_start):
+    since = track_start + 90 * 5
+
+    response = client.get(f'/iss?from={since}&to={since + 20}')
+
+    assert response.status_code == 200
+    assert response.headers['X-Track-Positions'] == '5'
+    assert b'<kml' in response.data
+
+
+@pytest.mark.parametrize('path', ['/iss', '/iss?at={at}', '/iss.kmz'])
+def test_failed_render(client, track_start, path):
+    with patch.object(app, 'render_kml', return_value=None):
+        response = client.get(path.format(at=track_start))
+
+    assert response.status_code == 503
+    assert 'ETag' not in response.headers
+
+
+@pytest.mark.parametrize('query', ['', '?stream=1', '?from=0'])
+def test_vary_accept_encoding(client, query):
+    first = client.get(f'/iss{query}', headers={'Accept-Encoding': 'gzip'})
+    revalidated = client.get(f'/iss{query}', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+
+    assert first.status_code == 200
+    assert revalidated.status_code == 304
+    for response in (first, revalidated):
+        assert 'Accept-Encoding' in response.headers['Vary']
+
+
+@pytest.mark.parametrize('elapsed, extrapolated', [(12.5, True),
+                                                   (200, False)])
+def test_live_position_is_extrapolated(client, track_start, elapsed,
+                                       extrapolated):
+    last = track_start + 99 * 5
+    with patch.object(Settings, 'DEAD_RECKONING_STEP_SECONDS', 5), \
+            patch('time.time', return_value=last + elapsed):
+        response = client.get('/iss')
+
+    # o primeiro <coordinates> é o do marcador da ISS
+    placemark = response.data.split(b'<coordinates>', 1)[1]
+    longitude = float(placemark.split(b',', 1)[0])
+    assert (longitude > -170 + 99 * 0.05) == extrapolated
+    if extrapolated:
+        # a estimativa muda no próximo passo de 5 s
+        assert response.cache_control.max_age <= 5
+    stored = IssTrackAdapter(Settings.DB_PATH)
+    assert stored.latest_timestamp(IssInteractor.TRACK_ID) == last
@@ -0,0 +1,161 @@
+import gzip
+import io
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+from werkzeug.datastructures import Accept
+
+from iss_kml import compression
+from iss_kml.compression import (RenderCache, compress, make_kmz,
+                                 negotiate_encoding)
+
+KML = b'<kml>' + b'-46.6,-23.5,420000.0 ' * 1000 + b'</kml>'
+
+
+def accept(*values):
+    return Accept(list(values))
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding(accept(('gzip', 1), ('deflate', 1))) == 'gzip'
+    assert negotiate_encoding(accept(('*', 1))) == 'gzip'
+    assert negotiate_encoding(accept(('gzip', 0))) is None
+    assert negotiate_encoding(accept()) is None
+
+
+def test_negotiate_encoding_prefers_brotli():
+    with patch.object(compression, 'brotli', MagicMock()):
+        assert negotiate_encoding(accept(('gzip', 1), ('br', 1))) == 'br'
+        assert negotiate_encoding(accept(('gzip', 1), ('br', 0.5))) == \
+            'gzip'
+
+    with patch.object(compression, 'brotli', None):
+        assert negotiate_encoding(accept(('br', 1))) is None
+
+
+def test_compress_gzip_is_deterministic():
+    data = compress(KML, 'gzip')
+
+    assert gzip.decompress(data) == KML
+    assert data == compress(KML, 'gzip')
+    assert len(data) < len(KML) / 10
+
+
+def test_compress_brotli():
+    fake_brotli = MagicMock()
+    with patch.object(compression, 'brotli', fake_brotli):
+        result = compress(KML, 'br')
+
+    fake_brotli.compress.assert_called_once_with(
+        KML, quality=compression.BROTLI_QUALITY)
+    assert result == fake_brotli.compress.return_value
+
+
+def test_compress_identity_and_invalid():
+    assert compress(KML, None) is KML
+    with pytest.raises(ValueError):
+        compress(KML, 'zstd')
+
+
+def test_make_kmz():
+    kmz = make_kmz(KML)
+
+    with zipfile.ZipFile(io.BytesIO(kmz)) as archive:
+        assert archive.namelist() == ['doc.kml']
+        assert archive.read('doc.kml') == KML
+    assert kmz == make_kmz(KML)
+    assert compress(KML, 'kmz') == kmz
+
+
+def test_render_cache_renders_and_compresses_once():
+    cache = RenderCache()
+    render = MagicMock(return_value=KML)
+
+    with patch.object(compression, 'compress',
+                      wraps=compression.compress) as mock_compress:
+        for _ in range(3):
+            assert cache.get('etag-1', None, render) == KML
+            assert gzip.decompress(cache.get('etag-1', 'gzip', render)) == \
+                KML
+            cache.get('etag-1', 'kmz', render)
+
+    render.assert_called_once_with()
+    assert mock_compress.call_count == 2
+
+
+def test_render_cache_keys():
+    cache = RenderCache(max_entries=2)
+    cache.get('etag-1', 'gzip', lambda: b'old')
+
+    result = cache.get('etag-2', 'gzip', lambda: b'new')
+
+    assert gzip.decompress(result) == b'new'
+    assert cache.get('etag-2', None, lambda: b'unused') == b'new'
+    assert cache.get('etag-1', None, lambda: b'unused') == b'old'
+
+    cache.get('etag-3', None, lambda: b'newest')
+
+    assert cache.get('etag-2', None, lambda: b'again') == b'again'
+
+
+def test_render_cache_does_not_store_failures():
+    cache = RenderCache()
+
+    assert cache.get('etag-1', 'gzip', lambda: None) is None
+    assert cache.get('etag-1', 'gzip', lambda: b'kml') == \
+        compress(b'kml', 'gzip')
+
+
+def test_render_cache_coalesces_concurrent_renders():
+    cache = RenderCache()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def render():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return KML
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        first = executor.submit(cache.get, 'etag-1', None, render)
+        started.wait(5)
+        others = [executor.submit(cache.get, 'etag-1', variant, render)
+                  for variant in (None, 'gzip', 'kmz')]
+        release.set()
+        results = [future.result(5) for future in [first, *others]]
+
+    assert len(calls) == 1
+    assert results[0] == results[1] == KML
+    assert gzip.decompress(results[2]) == KML
+
+
+def test_render_cache_does_not_block_other_keys():
+    cache = RenderCache()
+    started, release = threading.Event(), threading.Event()
+
+    def slow_render():
+        started.set()
+        release.wait(5)
+        return b'slow'
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        slow = executor.submit(cache.get, 'etag-1', None, slow_render)
+        started.wait(5)
+
+        assert cache.get('etag-2', None, lambda: b'fast') == b'fast'
+        assert not slow.done()
+        release.set()
+        assert slow.result(5) == b'slow'
+
+
+def test_render_cache_shares_render_errors():
+    cache = RenderCache()
+
+    with pytest.raises(RuntimeError):
+        cache.get('etag-1', 'gzip', MagicMock(side_effect=RuntimeError))
+    assert cache.get('etag-1', 'gzip', lambda: b'kml') == \
+        compress(b'kml', 'gzip')
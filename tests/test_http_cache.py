@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+from flask import Response
+
+from iss_kml.http_cache import apply_cache_headers, get_max_age, make_etag
+
+
+def test_make_etag():
+    etag = make_etag(1684980256, 2000, None)
+
+    assert etag.startswith('1684980256-')
+    assert etag == make_etag(1684980256, 2000, None)
+    assert etag != make_etag(1684980257, 2000, None)
+    assert etag != make_etag(1684980256, 500, None)
+
+
+def test_get_max_age():
+    assert get_max_age(100, 5, now=101.5) == 4
+    assert get_max_age(100, 5, now=105) == 0
+    assert get_max_age(100, 5, now=200) == 0
+
+
+def test_apply_cache_headers():
+    response = Response('kml')
+
+    result = apply_cache_headers(response, 'some-etag', 4, now=100)
+
+    assert result is response
+    assert response.headers['ETag'] == '"some-etag"'
+    assert response.cache_control.public
+    assert response.cache_control.max_age == 4
+    assert response.expires == datetime.fromtimestamp(104, tz=timezone.utc)